@@ -0,0 +1,111 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from faq_light_engine import load_light_engine
+
+
+DEFAULT_CSV_PATH = "faq_data.csv"
+DEFAULT_RUNS = 5
+DEFAULT_QUESTION = "환불은 어떻게 하나요"
+HEAVY_MODULES = ("pandas", "scipy", "sklearn")
+CHATBOT_DIR = Path(__file__).resolve().parent.parent
+
+# 새 파이썬 프로세스에서 import, 색인 준비, 첫 답변까지 각각 걸린 시간을 재는 코드입니다. 경로마다 앞부분만 다릅니다.
+PATH_SCRIPTS = {
+    "faq_chatbot": """
+from faq_chatbot import get_chatbot_response, initialize_chatbot_engine
+imported_at = time.perf_counter()
+faq_df, vectorizer, question_matrix = initialize_chatbot_engine(csv_path)
+loaded_at = time.perf_counter()
+get_chatbot_response(question, faq_df, vectorizer, question_matrix)
+""",
+    "faq_light_engine": """
+from faq_light_engine import load_light_engine
+imported_at = time.perf_counter()
+engine = load_light_engine(csv_path)
+loaded_at = time.perf_counter()
+engine.respond(question)
+""",
+}
+SCRIPT_HEADER = """
+import json, sys, time
+csv_path, question = sys.argv[1], sys.argv[2]
+started_at = time.perf_counter()
+"""
+SCRIPT_FOOTER = """
+answered_at = time.perf_counter()
+print(json.dumps({
+    "import": imported_at - started_at,
+    "load": loaded_at - imported_at,
+    "first_answer": answered_at - loaded_at,
+    "heavy_modules": sorted(name for name in %r if name in sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+# 이 함수는 python -X importtime의 표준 오류 출력에서 entry_module이 직접 불러온 모듈별 누적 import 시간(마이크로초)을 뽑습니다.
+# importtime은 하위 모듈을 먼저, 불러온 쪽을 나중에 찍고 깊이만큼 두 칸씩 들여쓰므로, entry_module 줄 바로 앞의 한 단계 아래 줄들이 대상입니다.
+def parse_direct_imports(importtime_output, entry_module):
+    direct_imports = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module_name = line.split("|")
+        depth = (len(module_name) - len(module_name.lstrip()) - 1) // 2
+        if depth == 0:
+            if module_name.strip() == entry_module:
+                return direct_imports
+            direct_imports = {}
+        elif depth == 1:
+            direct_imports[module_name.strip()] = int(cumulative_us)
+    return {}
+
+
+# 이 함수는 새 프로세스 하나에서 경로 하나를 실행하고, 단계별 시간과 import 시간 기록을 돌려줍니다.
+def run_cold_start(path_name, csv_path, question):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT_HEADER + PATH_SCRIPTS[path_name] + SCRIPT_FOOTER, csv_path, question],
+        cwd=CHATBOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings["imports"] = parse_direct_imports(completed.stderr, path_name)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="faq_chatbot(pandas, scikit-learn)과 faq_light_engine(NumPy만)의 import 시간과 첫 답변까지의 시간을 새 프로세스에서 비교합니다."
+    )
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH, help="저장 색인이 옆에 있는 FAQ CSV 경로")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="경로마다 새 프로세스를 띄울 횟수")
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    args = parser.parse_args()
+
+    csv_path = str(Path(args.csv).resolve())
+    # 두 경로 모두 저장 색인을 읽는 상황을 재도록, 색인이 없으면 여기에서 먼저 만들어 둡니다.
+    load_light_engine(csv_path)
+    print(f"{args.csv}, 경로마다 새 프로세스 {args.runs}번 (중앙값)")
+    for path_name in PATH_SCRIPTS:
+        runs = [run_cold_start(path_name, csv_path, args.question) for _ in range(args.runs)]
+        import_ms = statistics.median(run["import"] for run in runs) * 1000
+        load_ms = statistics.median(run["load"] for run in runs) * 1000
+        answer_ms = statistics.median(run["first_answer"] for run in runs) * 1000
+        print(
+            f"  {path_name:16s} import {import_ms:8.1f}ms  색인 준비 {load_ms:7.1f}ms  "
+            f"첫 답변 {answer_ms:6.2f}ms  합계 {import_ms + load_ms + answer_ms:8.1f}ms",
+            flush=True,
+        )
+        slowest_imports = sorted(runs[-1]["imports"].items(), key=lambda item: item[1], reverse=True)[:5]
+        print("    " + ", ".join(f"{module_name} {cumulative_us / 1000:.1f}ms" for module_name, cumulative_us in slowest_imports))
+        print(f"    불러온 무거운 모듈: {', '.join(runs[-1]['heavy_modules']) or '없음'}")
+
+
+if __name__ == "__main__":
+    main()
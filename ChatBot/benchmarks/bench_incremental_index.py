@@ -0,0 +1,149 @@
+import argparse
+import random
+import time
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from faq_chatbot import build_vectorizer_and_matrix, select_top_k
+from faq_incremental_index import IncrementalFaqIndex
+
+
+TOP_K = 5
+SCORE_TOLERANCE = 1e-6
+
+
+# 이 함수는 살아 있는 문서만으로 TF-IDF를 새로 학습해, 같은 질문의 (문서 id, 유사도) 상위 k개를 구합니다.
+def fresh_fit_search(live_documents, queries, k):
+    doc_ids = list(live_documents)
+    vectorizer, question_matrix = build_vectorizer_and_matrix([live_documents[doc_id][0] for doc_id in doc_ids])
+    query_matrix = normalize(vectorizer.transform(queries))
+    score_table = (query_matrix @ question_matrix.T).toarray()
+    return [
+        [(doc_ids[row], float(scores[row])) for row in select_top_k(scores, k)]
+        for scores in score_table
+    ]
+
+
+# 이 함수는 증분 색인의 결과가 새로 학습한 결과와 허용 오차 안에서 같은지 확인합니다.
+# 점수가 같은 문서끼리는 순서가 달라도 되므로, 점수 목록과 "확실히 더 높은" 문서 집합을 비교합니다.
+def assert_equivalent(index, live_documents, queries, k):
+    expected_results = fresh_fit_search(live_documents, queries, k)
+    for query, expected in zip(queries, expected_results):
+        actual = index.search(query, k)
+        expected_scores = np.array([score for _, score in expected])
+        actual_scores = np.array([score for _, score in actual])
+        if expected_scores.shape != actual_scores.shape or not np.allclose(
+            expected_scores, actual_scores, atol=SCORE_TOLERANCE
+        ):
+            raise SystemExit(f"점수가 다릅니다: {query!r}\n새 학습: {expected}\n증분: {actual}")
+        if len(expected) == 0:
+            continue
+        boundary_score = expected_scores[-1]
+        strictly_above = {doc_id for doc_id, score in expected if score > boundary_score + SCORE_TOLERANCE}
+        if not strictly_above <= {doc_id for doc_id, _ in actual}:
+            raise SystemExit(f"상위 문서가 다릅니다: {query!r}\n새 학습: {expected}\n증분: {actual}")
+
+
+# 이 함수는 백그라운드 압축이 도는 동안 삭제와 add_many(끝에서 동기 압축)를 함께 실행해도 결과가 새 학습과 같은지 확인합니다.
+# 두 압축이 겹치면 압축 중 삭제가 사라지거나 행 번호가 어긋나므로, 앞선 압축이 끝난 뒤 다음 압축이 시작되어야 합니다.
+def check_add_many_during_compaction(rows, corpus, queries, seed):
+    rng = random.Random(seed)
+    live_documents = {doc_id: corpus[doc_id] for doc_id in range(rows)}
+    index = IncrementalFaqIndex(background_compaction=True)
+    index.add_many(list(live_documents.items()))
+    index.wait_for_compaction()
+
+    # 백그라운드 압축이 시작될 때까지 지우고, 시작되자마자 나머지 작업을 이어서 합니다.
+    for doc_id in rng.sample(list(live_documents), rows // 2):
+        del live_documents[doc_id]
+        index.delete(doc_id)
+        if index._compaction_thread is not None and index._compaction_thread.is_alive():
+            break
+    overlapped = index._compaction_thread is not None and index._compaction_thread.is_alive()
+
+    # 작은 묶음을 곧바로 넣어, add_many의 동기 압축이 백그라운드 압축과 최대한 겹치게 합니다.
+    next_doc_id = rows
+    for batch_size in (8, rows // 2):
+        new_documents = [(next_doc_id + offset, rng.choice(corpus)) for offset in range(batch_size)]
+        next_doc_id += batch_size
+        live_documents.update(new_documents)
+        index.add_many(new_documents)
+        for doc_id in rng.sample(list(live_documents), rows // 20):
+            del live_documents[doc_id]
+            index.delete(doc_id)
+
+    index.wait_for_compaction()
+    assert_equivalent(index, live_documents, queries, TOP_K)
+    return overlapped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="증분 색인이 새 학습과 같은 결과를 내는지 확인하고 갱신 비용을 비교합니다.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--check-every", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--overlap-rounds", type=int, default=5, help="백그라운드 압축 중 add_many 검사를 반복할 횟수")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus_df = generate_faq_df(args.rows * 2, seed=args.seed)
+    corpus = list(zip(corpus_df["Question"], corpus_df["Answer"]))
+    queries = generate_queries(40, seed=args.seed)
+
+    live_documents = {doc_id: corpus[doc_id] for doc_id in range(args.rows)}
+    started_at = time.perf_counter()
+    index = IncrementalFaqIndex.from_faq_df(corpus_df.iloc[: args.rows])
+    print(f"초기 색인 {args.rows}건: {time.perf_counter() - started_at:.2f}s")
+    assert_equivalent(index, live_documents, queries, TOP_K)
+
+    next_doc_id = args.rows
+    operation_seconds = []
+    for operation_number in range(1, args.operations + 1):
+        operation = rng.choice(("add", "update", "delete"))
+        started_at = time.perf_counter()
+        if operation == "add" or len(live_documents) < 10:
+            live_documents[next_doc_id] = rng.choice(corpus)
+            index.add(next_doc_id, *live_documents[next_doc_id])
+            next_doc_id += 1
+        elif operation == "update":
+            doc_id = rng.choice(list(live_documents))
+            live_documents[doc_id] = rng.choice(corpus)
+            index.update(doc_id, *live_documents[doc_id])
+        else:
+            doc_id = rng.choice(list(live_documents))
+            del live_documents[doc_id]
+            index.delete(doc_id)
+        operation_seconds.append(time.perf_counter() - started_at)
+
+        if operation_number % args.check_every == 0:
+            index.wait_for_compaction()
+            assert_equivalent(index, live_documents, queries, TOP_K)
+
+    index.wait_for_compaction()
+    assert_equivalent(index, live_documents, queries, TOP_K)
+    print(f"동등성 검사 통과: 작업 {args.operations}건, 상태 {index.stats()}")
+
+    # 겹치는 시점은 스레드 전환에 달려 있어, 시드를 바꿔 여러 번 돌립니다.
+    overlapped_rounds = sum(
+        check_add_many_during_compaction(args.rows, corpus, queries, args.seed + overlap_round)
+        for overlap_round in range(args.overlap_rounds)
+    )
+    print(f"백그라운드 압축 중 add_many 동등성 검사 통과: {args.overlap_rounds}번 중 {overlapped_rounds}번 압축과 겹침")
+
+    started_at = time.perf_counter()
+    index.search(queries[0], TOP_K)
+    first_search_ms = (time.perf_counter() - started_at) * 1000
+    started_at = time.perf_counter()
+    build_vectorizer_and_matrix([question for question, _ in live_documents.values()])
+    refit_ms = (time.perf_counter() - started_at) * 1000
+
+    print(f"증분 작업 평균   {np.mean(operation_seconds) * 1000:8.3f}ms (p99 {np.percentile(operation_seconds, 99) * 1000:.3f}ms)")
+    print(f"갱신 후 첫 검색  {first_search_ms:8.3f}ms (IDF/행 길이 재계산 포함)")
+    print(f"전체 재학습      {refit_ms:8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
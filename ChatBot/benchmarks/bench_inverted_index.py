@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from faq_chatbot import EXHAUSTIVE_BACKEND, FaqSearchEngine, build_vectorizer_and_matrix
+
+
+SCORE_TOLERANCE = 1e-5
+
+
+# 이 함수는 두 검색 결과가 같은지 봅니다. 점수가 허용 오차 안에서 같고, 점수가 다른 구간의 순서가 같으면 같다고 봅니다.
+def same_ranking(expected, actual):
+    if len(expected) != len(actual):
+        return False
+    for (expected_row, expected_score), (actual_row, actual_score) in zip(expected, actual):
+        if abs(expected_score - actual_score) > SCORE_TOLERANCE:
+            return False
+        if expected_row != actual_row:
+            tied_rows = {row for row, score in expected if abs(score - expected_score) <= SCORE_TOLERANCE}
+            if actual_row not in tied_rows:
+                return False
+    return True
+
+
+# 이 함수는 질문마다 검색 시간을 재서 밀리초 단위 목록으로 돌려줍니다.
+def time_backend(engine, queries, k, backend):
+    latencies = []
+    for query in queries:
+        started_at = time.perf_counter()
+        engine.search(query, k, backend=backend)
+        latencies.append((time.perf_counter() - started_at) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="역색인 MaxScore 검색과 전체 행 검색을 합성 말뭉치 크기별로 비교합니다.")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = generate_queries(args.queries)
+    for size in (int(value) for value in args.sizes.split(",")):
+        faq_df = generate_faq_df(size)
+        started_at = time.perf_counter()
+        vectorizer, question_matrix = build_vectorizer_and_matrix(faq_df["Question"].tolist())
+        fit_seconds = time.perf_counter() - started_at
+
+        engine = FaqSearchEngine(vectorizer, question_matrix, faq_df)
+        started_at = time.perf_counter()
+        engine.get_retriever("inverted")
+        index_seconds = time.perf_counter() - started_at
+
+        for query in queries:
+            expected = engine.search(query, args.top_k)
+            actual = engine.search(query, args.top_k, backend="inverted")
+            if not same_ranking(expected, actual):
+                raise SystemExit(f"상위 {args.top_k}개가 다릅니다 ({size}건): {query!r}\n전체: {expected}\n역색인: {actual}")
+
+        exhaustive_ms = time_backend(engine, queries, args.top_k, EXHAUSTIVE_BACKEND)
+        inverted_ms = time_backend(engine, queries, args.top_k, "inverted")
+        print(
+            f"{size:>9,}건  학습 {fit_seconds:6.1f}s  역색인 {index_seconds:5.2f}s  "
+            f"전체 p50 {np.percentile(exhaustive_ms, 50):7.2f}ms p95 {np.percentile(exhaustive_ms, 95):7.2f}ms  "
+            f"역색인 p50 {np.percentile(inverted_ms, 50):7.2f}ms p95 {np.percentile(inverted_ms, 95):7.2f}ms  "
+            f"(상위 {args.top_k}개 일치)"
+        )
+
+
+if __name__ == "__main__":
+    main()
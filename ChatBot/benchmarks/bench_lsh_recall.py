@@ -0,0 +1,87 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from faq_chatbot import FaqSearchEngine, build_vectorizer_and_matrix
+from faq_lsh_index import LshFaqIndex
+
+
+# 이 함수는 근사 결과가 정확한 상위 k개 중 몇 개를 찾았는지 비율로 돌려줍니다.
+# 유사도 0인 결과는 아무 행이나 들어갈 수 있으므로 비교에서 뺍니다.
+def recall_at_k(exact, approximate):
+    relevant_rows = {row for row, score in exact if score > 0}
+    if not relevant_rows:
+        return 1.0
+    return len(relevant_rows & {row for row, _ in approximate}) / len(relevant_rows)
+
+
+# 이 함수는 LSH 설정 하나로 모든 질문을 검색해 평균 재현율, 평균 재계산 행 수, 지연 시간을 구합니다.
+def evaluate_config(lsh_index, query_vectors, exact_results, k):
+    recalls = []
+    probed_rows = []
+    latencies = []
+    for (term_ids, weights), exact in zip(query_vectors, exact_results):
+        started_at = time.perf_counter()
+        approximate, probed = lsh_index.top_k_with_stats(term_ids, weights, k)
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        recalls.append(recall_at_k(exact, approximate))
+        probed_rows.append(probed)
+    return np.mean(recalls), np.mean(probed_rows), np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LSH 근사 검색의 재현율과 비용을 정확한 검색과 비교한 보고서를 출력합니다.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--tables", default="4,8,16")
+    parser.add_argument("--bits", default="8,12")
+    parser.add_argument("--probe-bits", default="0,2,4")
+    parser.add_argument("--max-candidates", type=int, default=20000)
+    args = parser.parse_args()
+
+    faq_df = generate_faq_df(args.rows)
+    vectorizer, question_matrix = build_vectorizer_and_matrix(faq_df["Question"].tolist())
+    engine = FaqSearchEngine(vectorizer, question_matrix, faq_df)
+    inverted_index = engine.get_retriever("inverted")
+
+    queries = generate_queries(args.queries)
+    query_vectors = []
+    exact_results = []
+    exact_latencies = []
+    for query in queries:
+        user_vector = engine.transform_query(query)
+        query_vectors.append((user_vector.indices, user_vector.data))
+        started_at = time.perf_counter()
+        exact_results.append(inverted_index.top_k(user_vector.indices, user_vector.data, args.top_k))
+        exact_latencies.append((time.perf_counter() - started_at) * 1000)
+
+    print(f"말뭉치 {args.rows:,}건, 질문 {len(queries)}개, recall@{args.top_k}")
+    print(f"정확한 검색(역색인): p50 {np.percentile(exact_latencies, 50):.2f}ms p95 {np.percentile(exact_latencies, 95):.2f}ms")
+    print(f"{'tables':>6} {'bits':>4} {'probe':>5} {'recall':>7} {'rows probed':>12} {'p50 ms':>7} {'p95 ms':>7} {'build s':>7}")
+    for table_count, bits_per_table in itertools.product(
+        (int(value) for value in args.tables.split(",")),
+        [int(value) for value in args.bits.split(",")],
+    ):
+        started_at = time.perf_counter()
+        lsh_index = LshFaqIndex(
+            engine.question_matrix,
+            table_count=table_count,
+            bits_per_table=bits_per_table,
+            max_candidates=args.max_candidates,
+        )
+        build_seconds = time.perf_counter() - started_at
+        for probe_bits in (int(value) for value in args.probe_bits.split(",")):
+            lsh_index.probe_bits = probe_bits
+            recall, probed, p50, p95 = evaluate_config(lsh_index, query_vectors, exact_results, args.top_k)
+            print(
+                f"{table_count:>6} {bits_per_table:>4} {probe_bits:>5} {recall:>7.3f} "
+                f"{probed:>12,.0f} {p50:>7.2f} {p95:>7.2f} {build_seconds:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from faq_batch_scheduler import MicroBatchScheduler
+from faq_chatbot import FaqSearchEngine, build_vectorizer_and_matrix
+
+
+DEFAULT_SIZES = "1000,100000"
+DEFAULT_CONCURRENCY = "1,8,32"
+DEFAULT_WINDOWS_MS = "0.5,2,5"
+DEFAULT_DURATION_SECONDS = 3.0
+
+
+# 이 함수는 concurrency개의 스레드가 정해진 시간 동안 쉬지 않고 질문을 보내게 하고, 처리량과 지연 시간 분위수를 반환합니다.
+def run_clients(answer, queries, concurrency, duration):
+    latencies_ms = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        local_latencies = []
+        query_index = offset
+        while time.perf_counter() < deadline:
+            started_at = time.perf_counter()
+            answer(queries[query_index % len(queries)])
+            local_latencies.append((time.perf_counter() - started_at) * 1000)
+            query_index += 1
+        with lock:
+            latencies_ms.extend(local_latencies)
+
+    threads = [threading.Thread(target=client, args=(index * 97,)) for index in range(concurrency)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+    latencies = np.asarray(latencies_ms)
+    return latencies.size / elapsed, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="질문마다 따로 점수 매기는 방식과 마이크로 배치 스케줄러의 처리량/지연 시간을 동시 요청 수별로 비교합니다."
+    )
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--windows-ms", default=DEFAULT_WINDOWS_MS, help="비교할 모으기 창 길이(ms) 목록")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_SECONDS)
+    args = parser.parse_args()
+
+    queries = generate_queries(2000, seed=7)
+    for size in (int(value) for value in args.sizes.split(",")):
+        faq_df = generate_faq_df(size)
+        engine = FaqSearchEngine(*build_vectorizer_and_matrix(faq_df["Question"].tolist()), faq_df)
+        engine.respond(queries[0])
+        print(f"\nFAQ {size:,}행")
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            throughput, p50, p99 = run_clients(engine.respond, queries, concurrency, args.duration)
+            print(
+                f"  동시 {concurrency:3d} 질문별 처리          {throughput:9.1f} q/s p50 {p50:8.3f}ms p99 {p99:8.3f}ms",
+                flush=True,
+            )
+            for window_ms in (float(value) for value in args.windows_ms.split(",")):
+                scheduler = MicroBatchScheduler(
+                    engine, max_batch_size=args.max_batch_size, max_wait=window_ms / 1000
+                )
+                try:
+                    throughput, p50, p99 = run_clients(
+                        lambda query: scheduler.respond(query, use_cache=False), queries, concurrency, args.duration
+                    )
+                finally:
+                    scheduler.close()
+                stats = scheduler.stats()
+                print(
+                    f"  동시 {concurrency:3d} 배치 창 {window_ms:4.1f}ms       {throughput:9.1f} q/s "
+                    f"p50 {p50:8.3f}ms p99 {p99:8.3f}ms 평균 배치 {stats['mean_batch_size']:5.1f} "
+                    f"평균 대기 {stats['mean_queue_wait_ms']:6.3f}ms",
+                    flush=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import gc
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import generate_faq_df
+from faq_chatbot import initialize_chatbot_engine, load_chatbot_index, load_faq_data
+from faq_index_store import RECORD_FILE_NAMES, compute_file_sha256
+from faq_shared_index import read_process_memory
+
+
+DEFAULT_SIZE = 50000
+DEFAULT_ANSWER_REPEAT = 8
+DEFAULT_MESSAGES = 2000
+# 답변 한 번에 화면에 그리는 행 수입니다. 추천 후보 3개와 가장 비슷한 질문 1개의 질문/답변, 즉 조회 8번입니다.
+ROWS_PER_MESSAGE = 4
+SMAPS_PATH = "/proc/self/smaps"
+
+
+# 이 함수는 이 프로세스에서 file_name으로 끝나는 파일 매핑이 실제로 물고 있는 메모리(KB)를 /proc/self/smaps에서 더합니다.
+# 커널은 한 곳을 읽을 때 주변까지 함께 매핑합니다(최근 커널의 ext4는 최대 2MB 단위). 그래서 임의 행을 수백 개만 읽어도 파일 대부분이 잡힐 수 있습니다.
+# 이 페이지들은 디스크 내용 그대로인 페이지 캐시라서 프로세스끼리 나눠 쓰고, 메모리가 부족하면 커널이 바로 회수합니다.
+def read_mapped_file_rss_kb(file_name):
+    total_kb = 0
+    in_target = False
+    for line in Path(SMAPS_PATH).read_text().splitlines():
+        fields = line.split()
+        if "-" in fields[0] and not fields[0].endswith(":"):
+            in_target = fields[-1].endswith(file_name)
+        elif in_target and fields[0] == "Rss:":
+            total_kb += int(fields[1])
+    return total_kb
+
+
+# 이 함수는 작업 프로세스 하나에서 FAQ 기록을 한 방식으로 읽고, 메시지 message_count개에 필요한 질문/답변을 꺼냅니다.
+# "dataframe"은 CSV를 데이터프레임으로 읽어 .loc으로, "record_store"는 저장 색인의 메모리 매핑된 열로 꺼냅니다.
+def run_worker(mode, csv_path, message_count, result_queue):
+    started_memory = read_process_memory()
+    if mode == "dataframe":
+        faq_df = load_faq_data(csv_path)
+
+        def read_row(row_id):
+            return faq_df.loc[row_id, "Question"], faq_df.loc[row_id, "Answer"]
+
+        row_count = len(faq_df)
+    else:
+        records = load_chatbot_index(csv_path, compute_file_sha256(csv_path))[0]
+
+        def read_row(row_id):
+            return records.questions[row_id], records.answers[row_id]
+
+        row_count = len(records)
+    gc.collect()
+    loaded_memory = read_process_memory()
+
+    row_ids = random.Random(7).choices(range(row_count), k=message_count * ROWS_PER_MESSAGE)
+    started_at = time.perf_counter()
+    served_bytes = 0
+    for row_id in row_ids:
+        question, answer = read_row(row_id)
+        served_bytes += len(answer.encode("utf-8"))
+    elapsed = time.perf_counter() - started_at
+    served_memory = read_process_memory()
+
+    result_queue.put(
+        {
+            "load_rss_kb": loaded_memory["rss_kb"] - started_memory["rss_kb"],
+            "load_uss_kb": loaded_memory.get("uss_kb", 0) - started_memory.get("uss_kb", 0),
+            "served_rss_kb": served_memory["rss_kb"] - started_memory["rss_kb"],
+            "message_us": elapsed / message_count * 1_000_000,
+            "answers_mapped_kb": read_mapped_file_rss_kb(RECORD_FILE_NAMES["answers"][1]),
+            "distinct_rows": len(set(row_ids)),
+        }
+    )
+
+
+def measure(mode, csv_path, message_count):
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    worker = context.Process(target=run_worker, args=(mode, csv_path, message_count, result_queue))
+    worker.start()
+    try:
+        return result_queue.get()
+    finally:
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="FAQ 질문/답변을 데이터프레임(.loc)으로 꺼내는 방식과 메모리 매핑된 열 저장소로 꺼내는 방식의 메모리와 조회 시간을 비교합니다."
+    )
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
+    parser.add_argument("--answer-repeat", type=int, default=DEFAULT_ANSWER_REPEAT, help="긴 답변을 흉내 내려고 답변 문장을 반복할 횟수")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="작업 프로세스마다 처리할 답변 메시지 수")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        faq_df = generate_faq_df(args.size)
+        faq_df["Answer"] = faq_df["Answer"].map(lambda answer: " ".join([answer] * args.answer_repeat))
+        csv_path = str(Path(temp_dir) / "faq_long_answers.csv")
+        faq_df.to_csv(csv_path, index=False)
+        answer_bytes = sum(len(answer.encode("utf-8")) for answer in faq_df["Answer"])
+        del faq_df
+        initialize_chatbot_engine(csv_path)
+
+        print(f"FAQ {args.size:,}행, 답변 합계 {answer_bytes / (1024 * 1024):.1f}MB, 메시지 {args.messages:,}개 (메시지당 조회 {ROWS_PER_MESSAGE * 2}번)")
+        for mode in ("dataframe", "record_store"):
+            result = measure(mode, csv_path, args.messages)
+            print(
+                f"  {mode:12s} 읽은 뒤 RSS +{result['load_rss_kb'] / 1024:7.1f}MB  USS +{result['load_uss_kb'] / 1024:7.1f}MB  "
+                f"답한 뒤 RSS +{result['served_rss_kb'] / 1024:7.1f}MB  "
+                f"메시지당 {result['message_us']:6.1f}us  답변 파일 매핑 {result['answers_mapped_kb'] / 1024:6.1f}MB "
+                f"(서로 다른 행 {result['distinct_rows']:,}개)",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import time
+
+import numpy as np
+
+from faq_chatbot import (
+    BM25_SCORER,
+    DEFAULT_THRESHOLD,
+    TFIDF_SCORER,
+    get_search_engine,
+    initialize_chatbot_engine,
+)
+
+
+# faq_data.csv의 질문을 사람이 바꿔 말한 질문과, 정답 FAQ 질문의 쌍입니다. 순위 비교의 기준으로 씁니다.
+LABELED_QUESTIONS = (
+    ("가이드는 어떻게 매칭돼요", "가이드 매칭은 어떻게 진행되나요?"),
+    ("제가 가이드를 고를 수 있어요?", "가이드를 직접 선택할 수 있나요?"),
+    ("매칭되는 데 시간이 얼마나 걸려요", "매칭까지 얼마나 걸리나요?"),
+    ("오늘 바로 예약할 수 있나요", "당일 예약도 가능한가요?"),
+    ("영어 하는 가이드 있나요", "원하는 언어를 구사하는 가이드를 찾을 수 있나요?"),
+    ("결제 방법은 뭐가 있나요", "어떤 결제 수단을 사용할 수 있나요?"),
+    ("하루 전에 취소해도 환불 받을 수 있어요?", "투어 전날 취소하면 환불이 되나요?"),
+    ("예약을 취소하고 싶어요", "예약 취소는 어디에서 하나요?"),
+    ("환불까지 며칠 걸려요", "환불은 며칠 안에 처리되나요?"),
+    ("환불 방법 알려주세요", "환불은 어떻게 하나요?"),
+    ("영수증 발급 되나요", "영수증이나 결제 내역서를 받을 수 있나요?"),
+    ("비가 와서 투어가 취소되면요?", "우천이나 천재지변으로 투어가 취소되면 어떻게 되나요?"),
+    ("예약 날짜 바꿀 수 있나요", "결제 후 날짜를 변경할 수 있나요?"),
+    ("가이드 신원 확인은 하나요", "가이드 신원 인증은 어떻게 하나요?"),
+    ("가이드 신고하고 싶어요", "문제가 있었던 가이드는 신고할 수 있나요?"),
+    ("비밀번호가 기억이 안 나요", "비밀번호를 분실했어요."),
+    ("이메일 바꾸고 싶어요", "이메일 주소를 변경할 수 있나요?"),
+    ("전화번호 변경", "휴대폰 번호를 수정하고 싶어요."),
+    ("탈퇴하려면 어떻게 해요", "회원 탈퇴는 어디서 하나요?"),
+    ("로그인이 안 돼요", "로그인이 계속 실패해요."),
+    ("내 예약 확인은 어디서 해요", "예약 내역은 어디에서 확인하나요?"),
+    ("알림이 안 와요", "알림 메시지가 오지 않아요."),
+    ("가이드가 약속 장소에 안 왔어요", "약속 장소에 가이드가 안 나타나요."),
+    ("투어 중에 물건을 잃어버렸어요", "투어 도중 분실물이 생겼어요."),
+    ("가이드가 추가 요금을 달라고 해요", "현장에서 추가 비용을 요구받았어요."),
+    ("후기 작성은 어디서 하나요", "후기는 어디에 남길 수 있나요?"),
+    ("고객센터 몇 시까지 해요", "고객센터 운영 시간은 언제인가요?"),
+)
+
+
+# 이 함수는 점수 방식 하나로 바꿔 말한 질문들을 검색해 정답 순위 지표를 구합니다.
+# top1: 1위가 정답인 비율, mrr: 정답 순위 역수의 평균(상위 k 밖이면 0), answered: 기준 점수를 넘은 비율입니다.
+def evaluate_ranking(engine, k):
+    reciprocal_ranks = []
+    answered_count = 0
+    for user_question, expected_question in LABELED_QUESTIONS:
+        ranked_matches = engine.search(user_question, k)
+        ranked_questions = [engine.questions[index] for index, _ in ranked_matches]
+        if expected_question in ranked_questions:
+            reciprocal_ranks.append(1 / (ranked_questions.index(expected_question) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+        answered_count += ranked_matches[0][1] >= DEFAULT_THRESHOLD
+    return {
+        "top1": float(np.mean([rank == 1.0 for rank in reciprocal_ranks])),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "answered": answered_count / len(LABELED_QUESTIONS),
+    }
+
+
+# 이 함수는 답변 캐시를 거치지 않고 질문 1개당 검색 시간(마이크로초)을 잽니다.
+def measure_latencies(engine, questions, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for user_question in questions:
+            started_at = time.perf_counter()
+            engine.respond(user_question)
+            latencies.append((time.perf_counter() - started_at) * 1_000_000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TF-IDF 코사인과 BM25 점수 방식의 순위 품질과 지연 시간을 비교합니다.")
+    parser.add_argument("--csv", default="faq_data.csv")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    engines = {}
+    for scorer in (TFIDF_SCORER, BM25_SCORER):
+        started_at = time.perf_counter()
+        faq_df, vectorizer, question_matrix = initialize_chatbot_engine(args.csv, use_index_cache=False, scorer=scorer)
+        build_ms = (time.perf_counter() - started_at) * 1000
+        engines[scorer] = get_search_engine(vectorizer, question_matrix, faq_df)
+
+        ranking = evaluate_ranking(engines[scorer], args.top_k)
+        latencies = measure_latencies(engines[scorer], [question for question, _ in LABELED_QUESTIONS], args.repeat)
+        print(
+            f"{scorer:6s} 학습 {build_ms:6.1f}ms  "
+            f"top1 {ranking['top1']:.3f}  MRR@{args.top_k} {ranking['mrr']:.3f}  "
+            f"기준 통과 {ranking['answered']:.3f}  "
+            f"p50 {np.percentile(latencies, 50):7.1f}us p95 {np.percentile(latencies, 95):7.1f}us"
+        )
+
+    print(f"\n1위가 다른 질문 (기준 점수 {DEFAULT_THRESHOLD}):")
+    for user_question, expected_question in LABELED_QUESTIONS:
+        tfidf_index, tfidf_score = engines[TFIDF_SCORER].search(user_question, 1)[0]
+        bm25_index, bm25_score = engines[BM25_SCORER].search(user_question, 1)[0]
+        if tfidf_index != bm25_index:
+            print(f"  {user_question!r} (정답: {expected_question})")
+            print(f"    tfidf {tfidf_score:.3f} {engines[TFIDF_SCORER].questions[tfidf_index]}")
+            print(f"    bm25  {bm25_score:.3f} {engines[BM25_SCORER].questions[bm25_index]}")
+
+
+if __name__ == "__main__":
+    main()
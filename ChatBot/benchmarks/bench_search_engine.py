@@ -0,0 +1,117 @@
+import argparse
+import statistics
+import time
+
+from sklearn.metrics.pairwise import cosine_similarity
+
+from faq_chatbot import (
+    DEFAULT_THRESHOLD,
+    get_chatbot_response,
+    initialize_chatbot_engine,
+    load_faq_data,
+    response_cache,
+)
+from faq_light_engine import FALLBACK_ANSWER
+
+
+SAMPLE_QUESTIONS = (
+    "환불은 언제 되나요",
+    "가이드 예약은 어떻게 하나요?",
+    "투어 전날 취소하면 환불이 되나요?",
+    "약속 장소에 가이드가 안 나타나요.",
+    "고객센터 이메일이 어떻게 되나요?",
+    "결제 수단 알려주세요",
+    "hello",
+)
+
+
+# 이 함수는 FaqSearchEngine 도입 전의 답변 경로를 그대로 재현합니다.
+# find_top_matches와 find_best_match가 각각 transform과 cosine_similarity를 한 번씩 호출하던 방식입니다.
+def legacy_get_chatbot_response(user_question, faq_df, vectorizer, question_matrix, threshold=DEFAULT_THRESHOLD):
+    user_vector = vectorizer.transform([user_question])
+    similarity_scores = cosine_similarity(user_vector, question_matrix).flatten()
+    sorted_indices = similarity_scores.argsort()[::-1][:3]
+    top_matches = [
+        {
+            "question": faq_df.loc[index, "Question"],
+            "answer": faq_df.loc[index, "Answer"],
+            "similarity_score": float(similarity_scores[index]),
+        }
+        for index in sorted_indices
+    ]
+
+    user_vector = vectorizer.transform([user_question])
+    similarity_scores = cosine_similarity(user_vector, question_matrix).flatten()
+    best_match_index = similarity_scores.argmax()
+    best_match_score = float(similarity_scores[best_match_index])
+
+    if best_match_score < threshold:
+        return {
+            "matched_question": None,
+            "similarity_score": best_match_score,
+            "top_matches": top_matches,
+            "answer": FALLBACK_ANSWER,
+        }
+    return {
+        "matched_question": faq_df.loc[best_match_index, "Question"],
+        "similarity_score": best_match_score,
+        "top_matches": top_matches,
+        "answer": faq_df.loc[best_match_index, "Answer"],
+    }
+
+
+# 이 함수는 답변 캐시를 거치지 않는 FaqSearchEngine 경로입니다.
+def uncached_get_chatbot_response(user_question, faq_df, vectorizer, question_matrix):
+    return get_chatbot_response(user_question, faq_df, vectorizer, question_matrix, use_cache=False)
+
+
+# 이 함수는 주어진 답변 함수를 여러 번 호출해 질문 1개당 지연 시간(마이크로초) 목록을 모읍니다.
+def measure_latencies(response_function, questions, faq_df, vectorizer, question_matrix, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for question in questions:
+            started_at = time.perf_counter()
+            response_function(question, faq_df, vectorizer, question_matrix)
+            latencies.append((time.perf_counter() - started_at) * 1_000_000)
+    return latencies
+
+
+# 이 함수는 두 경로가 같은 답을 내는지 먼저 확인하고, 지연 시간을 비교해 출력합니다.
+def main():
+    parser = argparse.ArgumentParser(description="기존 답변 경로와 FaqSearchEngine 경로의 지연 시간을 비교합니다.")
+    parser.add_argument("--csv", default="faq_data.csv")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    faq_df, vectorizer, question_matrix = initialize_chatbot_engine(args.csv)
+    # 예전 경로는 데이터프레임 .loc으로 질문/답변을 꺼내므로, 비교용 데이터프레임을 CSV에서 따로 읽습니다.
+    legacy_faq_df = load_faq_data(args.csv)
+
+    for question in SAMPLE_QUESTIONS:
+        legacy = legacy_get_chatbot_response(question, legacy_faq_df, vectorizer, question_matrix)
+        current = uncached_get_chatbot_response(question, faq_df, vectorizer, question_matrix)
+        if legacy["matched_question"] != current["matched_question"]:
+            raise SystemExit(f"답변이 달라졌습니다: {question!r}")
+        if abs(legacy["similarity_score"] - current["similarity_score"]) > 1e-5:
+            raise SystemExit(f"유사도 점수가 달라졌습니다: {question!r}")
+
+    for label, response_function, records in (
+        ("legacy (transform x2 + cosine_similarity x2)", legacy_get_chatbot_response, legacy_faq_df),
+        ("FaqSearchEngine (transform x1 + sparse dot)", uncached_get_chatbot_response, faq_df),
+        ("FaqSearchEngine + response_cache", get_chatbot_response, faq_df),
+    ):
+        response_cache.clear()
+        latencies = measure_latencies(
+            response_function, SAMPLE_QUESTIONS, records, vectorizer, question_matrix, args.repeat
+        )
+        latencies.sort()
+        print(
+            f"{label:48s} "
+            f"mean={statistics.fmean(latencies):8.1f}us "
+            f"p50={latencies[len(latencies) // 2]:8.1f}us "
+            f"p95={latencies[int(len(latencies) * 0.95)]:8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import gc
+import pickle
+import tracemalloc
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from chat_turns import assistant_text_turn, assistant_turn_from_response, user_turn
+from faq_chatbot import FaqSearchEngine, build_vectorizer_and_matrix
+from faq_shared_index import attach_shared_index, publish_shared_index
+
+
+DEFAULT_SIZE = 5000
+DEFAULT_SESSIONS = 200
+DEFAULT_TURNS = 30
+GREETING = "안녕하세요! GuideMatch FAQ 챗봇입니다. 예약, 환불, 계정, 현장 이슈를 편하게 질문해 주세요."
+
+
+# 이 함수는 ChatTurn 도입 전 streamlit_app이 세션에 쌓던 딕셔너리 형태 대화 기록을 그대로 만듭니다.
+def build_legacy_history(responses, questions):
+    history = [{"role": "assistant", "answer": GREETING, "top_matches": []}]
+    for question, response in zip(questions, responses):
+        history.append({"role": "user", "answer": question, "top_matches": []})
+        history.append(
+            {"role": "assistant", "answer": response["answer"], "top_matches": response.get("top_matches", [])}
+        )
+    return history
+
+
+def build_turn_history(responses, questions):
+    history = [assistant_text_turn(GREETING)]
+    for question, response in zip(questions, responses):
+        history.append(user_turn(question))
+        history.append(assistant_turn_from_response(response))
+    return history
+
+
+# 이 함수는 세션 session_count개의 대화 기록을 만들면서 늘어난 파이썬 힙 크기와, 세션 하나를 pickle했을 때의 크기를 잽니다.
+# 질문 문자열은 두 방식 모두 같으므로 미리 만들어 두고, 답변(검색 결과)부터 세션에 쌓이는 양만 셉니다.
+def measure(engine, build_history, session_count, turn_count):
+    session_questions = [generate_queries(turn_count, seed=session_index) for session_index in range(session_count)]
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sessions = [
+        build_history([engine.respond(question) for question in questions], questions)
+        for questions in session_questions
+    ]
+    gc.collect()
+    heap_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    pickled_bytes = sum(len(pickle.dumps(history, protocol=pickle.HIGHEST_PROTOCOL)) for history in sessions)
+    return heap_bytes / session_count, pickled_bytes / session_count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="세션당 대화 기록 메모리를 딕셔너리(질문/답변 문장 보관) 방식과 ChatTurn(행 번호 보관) 방식으로 비교합니다."
+    )
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="세션당 질문 수")
+    args = parser.parse_args()
+
+    faq_df = generate_faq_df(args.size)
+    vectorizer, question_matrix = build_vectorizer_and_matrix(faq_df["Question"].tolist())
+    print(f"FAQ {args.size:,}행, 세션 {args.sessions}개 x 질문 {args.turns}개")
+    with publish_shared_index(faq_df, vectorizer, question_matrix) as owner:
+        engines = {
+            "in-process": FaqSearchEngine(vectorizer, question_matrix, faq_df),
+            "shared-index": attach_shared_index(owner.descriptor).engine,
+        }
+        for engine_name, engine in engines.items():
+            for format_name, build_history in (("dict", build_legacy_history), ("ChatTurn", build_turn_history)):
+                heap_bytes, pickled_bytes = measure(engine, build_history, args.sessions, args.turns)
+                print(
+                    f"  {engine_name:12s} {format_name:8s} 세션당 힙 {heap_bytes / 1024:8.1f}KB  "
+                    f"pickle {pickled_bytes / 1024:8.1f}KB",
+                    flush=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
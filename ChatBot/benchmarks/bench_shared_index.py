@@ -0,0 +1,73 @@
+import argparse
+import multiprocessing
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from faq_chatbot import FaqSearchEngine, build_vectorizer_and_matrix
+from faq_shared_index import attach_shared_index, publish_shared_index, read_process_memory
+
+
+DEFAULT_SIZE = 200000
+DEFAULT_PROCESS_COUNT = 4
+
+
+# 이 함수는 작업 프로세스 하나입니다. 색인을 직접 만들거나 공유 색인에 붙은 뒤 질문 몇 개에 답하고 메모리를 보고합니다.
+def run_worker(mode, size, descriptor, ready_queue, release_event):
+    if mode == "shared":
+        shared_index = attach_shared_index(descriptor)
+        engine = shared_index.engine
+    else:
+        faq_df = generate_faq_df(size)
+        engine = FaqSearchEngine(*build_vectorizer_and_matrix(faq_df["Question"].tolist()), faq_df)
+    for query in generate_queries(20):
+        engine.respond(query)
+    ready_queue.put(read_process_memory())
+    release_event.wait()
+
+
+# 이 함수는 작업 프로세스 process_count개를 동시에 띄워 두고, 모두 답할 준비가 되었을 때의 메모리를 모읍니다.
+def measure(mode, size, process_count, descriptor=None):
+    context = multiprocessing.get_context("spawn")
+    ready_queue = context.Queue()
+    release_event = context.Event()
+    workers = [
+        context.Process(target=run_worker, args=(mode, size, descriptor, ready_queue, release_event))
+        for _ in range(process_count)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        return [ready_queue.get() for _ in workers]
+    finally:
+        release_event.set()
+        for worker in workers:
+            worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="작업 프로세스마다 색인을 따로 만드는 방식과 공유 메모리 색인에 붙는 방식의 프로세스별 메모리를 비교합니다."
+    )
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESS_COUNT)
+    args = parser.parse_args()
+
+    faq_df = generate_faq_df(args.size)
+    vectorizer, question_matrix = build_vectorizer_and_matrix(faq_df["Question"].tolist())
+    print(f"FAQ {args.size:,}행, 작업 프로세스 {args.processes}개")
+    with publish_shared_index(faq_df, vectorizer, question_matrix) as owner:
+        del faq_df, vectorizer, question_matrix
+        print(f"공유 색인 {owner.size_bytes / (1024 * 1024):.1f}MB")
+        for mode in ("private", "shared"):
+            reports = measure(mode, args.size, args.processes, owner.descriptor)
+            total_pss = sum(report.get("pss_kb", 0) for report in reports) / 1024
+            mean_uss = sum(report.get("uss_kb", 0) for report in reports) / len(reports) / 1024
+            mean_rss = sum(report["rss_kb"] for report in reports) / len(reports) / 1024
+            print(
+                f"  {mode:8s} 프로세스당 RSS {mean_rss:8.1f}MB USS {mean_uss:8.1f}MB  "
+                f"전체 PSS {total_pss:8.1f}MB",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
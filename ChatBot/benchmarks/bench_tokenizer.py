@@ -0,0 +1,114 @@
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from faq_tokenizer import expand_token, tokenize_korean_text
+
+
+GOLDEN_CSV_PATHS = ("faq_data.csv", "faq_data_english.csv")
+EXTRA_GOLDEN_TEXTS = (
+    "",
+    "   ",
+    "환불은 언제 되나요???",
+    "ABC123 가이드입니다!!",
+    "İstanbul 투어 가능한가요",
+    "예약\t취소\n환불",
+    "요",
+    "가요",
+    "이라도",
+    "카드로",
+    12345,
+    None,
+)
+
+
+# 이 함수는 사전 컴파일 토크나이저 도입 전의 preprocess_text를 그대로 옮겨 둔 기준 구현입니다.
+def legacy_preprocess_text(text):
+    normalized_text = str(text).lower().strip()
+    normalized_text = re.sub(r"[^0-9a-zA-Z가-힣\s]", " ", normalized_text)
+    normalized_text = re.sub(r"\s+", " ", normalized_text)
+    return normalized_text
+
+
+# 이 함수는 사전 컴파일 토크나이저 도입 전의 tokenize_korean_text를 그대로 옮겨 둔 기준 구현입니다.
+def legacy_tokenize_korean_text(text):
+    cleaned_text = legacy_preprocess_text(text)
+    raw_tokens = re.findall(r"[0-9a-zA-Z가-힣]+", cleaned_text)
+
+    suffixes = (
+        "입니다", "합니다", "해요", "해도", "되나요", "되죠", "인가요", "있어요", "없어요", "세요",
+        "까요", "나요", "군요", "이라", "라서", "에게", "에서", "으로", "부터", "까지",
+        "처럼", "라도", "보다", "이고", "이며", "이면", "이라", "에서", "에게", "한테",
+        "으로", "로", "은", "는", "이", "가", "을", "를", "에", "도",
+        "만", "와", "과", "요",
+    )
+
+    processed_tokens = []
+    for token in raw_tokens:
+        stripped_token = token
+        for suffix in suffixes:
+            if stripped_token.endswith(suffix) and len(stripped_token) > len(suffix) + 1:
+                stripped_token = stripped_token[: -len(suffix)]
+                break
+
+        if len(stripped_token) >= 2:
+            processed_tokens.append(stripped_token)
+            if re.search(r"[가-힣]", stripped_token) and len(stripped_token) >= 3:
+                processed_tokens.extend(
+                    stripped_token[index : index + 2]
+                    for index in range(len(stripped_token) - 1)
+                )
+
+    return processed_tokens
+
+
+# 이 함수는 두 CSV의 질문과 답변 전체, 그리고 경계 사례 문장을 골든 데이터로 모읍니다.
+def load_golden_texts():
+    texts = list(EXTRA_GOLDEN_TEXTS)
+    for csv_path in GOLDEN_CSV_PATHS:
+        faq_df = pd.read_csv(csv_path)
+        texts.extend(faq_df["Question"].tolist())
+        texts.extend(faq_df["Answer"].tolist())
+    return texts
+
+
+# 이 함수는 새 토크나이저가 기준 구현과 토큰 하나까지 같은 결과를 내는지 확인합니다.
+def check_golden_output(texts):
+    for text in texts:
+        expected_tokens = legacy_tokenize_korean_text(text)
+        actual_tokens = tokenize_korean_text(text)
+        if actual_tokens != expected_tokens:
+            raise SystemExit(f"토큰화 결과가 다릅니다: {text!r}\n기존: {expected_tokens}\n신규: {actual_tokens}")
+
+
+# 이 함수는 전체 문장 목록을 repeat번 토큰화하는 데 걸린 시간을 문장 1개당 마이크로초로 반환합니다.
+def time_tokenizer(tokenizer, texts, repeat):
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            tokenizer(text)
+    return (time.perf_counter() - started_at) * 1_000_000 / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="토크나이저 골든 검사와 마이크로벤치마크를 실행합니다.")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = load_golden_texts()
+    check_golden_output(texts)
+    print(f"골든 검사 통과: {len(texts)}개 문장이 기존 토크나이저와 같은 결과를 냈습니다.")
+
+    legacy_us = time_tokenizer(legacy_tokenize_korean_text, texts, args.repeat)
+    expand_token.cache_clear()
+    cold_us = time_tokenizer(tokenize_korean_text, texts, 1)
+    warm_us = time_tokenizer(tokenize_korean_text, texts, args.repeat)
+    print(f"legacy                 {legacy_us:8.2f}us/문장")
+    print(f"compiled (빈 캐시)      {cold_us:8.2f}us/문장")
+    print(f"compiled (캐시 적중)    {warm_us:8.2f}us/문장  x{legacy_us / warm_us:.1f}")
+
+
+if __name__ == "__main__":
+    main()
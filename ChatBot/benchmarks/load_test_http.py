@@ -0,0 +1,124 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import generate_queries
+from faq_http_server import create_server
+
+
+DEFAULT_CONCURRENCY = "1,4,16,64"
+DEFAULT_DURATION_SECONDS = 5.0
+DEFAULT_QUERY_COUNT = 500
+
+
+# 이 함수는 연결 하나를 끝까지 재사용하며(keep-alive) 정해진 시간 동안 요청을 보내고, 요청별 지연 시간(ms)과 상태 코드를 모읍니다.
+def run_client(host, port, path, bodies, deadline, start_index, latencies_ms, status_counts, lock):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    local_latencies = []
+    local_statuses = {}
+    request_index = start_index
+    try:
+        while time.perf_counter() < deadline:
+            body = bodies[request_index % len(bodies)]
+            request_index += 1
+            started_at = time.perf_counter()
+            connection.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            local_latencies.append((time.perf_counter() - started_at) * 1000)
+            local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+    finally:
+        connection.close()
+    with lock:
+        latencies_ms.extend(local_latencies)
+        for status, count in local_statuses.items():
+            status_counts[status] = status_counts.get(status, 0) + count
+
+
+# 이 함수는 동시 연결 수 하나에 대해 부하를 걸고 처리량과 지연 시간 분위수를 반환합니다.
+def run_load(host, port, path, bodies, concurrency, duration):
+    latencies_ms = []
+    status_counts = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    clients = [
+        threading.Thread(
+            target=run_client,
+            args=(host, port, path, bodies, deadline, client_index * 97, latencies_ms, status_counts, lock),
+        )
+        for client_index in range(concurrency)
+    ]
+    started_at = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started_at
+
+    latencies = np.asarray(latencies_ms)
+    return {
+        "concurrency": concurrency,
+        "requests": int(latencies.size),
+        "requests_per_second": latencies.size / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if latencies.size else 0.0,
+        "status_counts": status_counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="FAQ HTTP 서비스에 동시 연결 수별로 부하를 걸어 처리량과 지연 시간을 잽니다."
+    )
+    parser.add_argument("--url", help="이미 실행 중인 서비스 주소 (예: http://127.0.0.1:8765). 없으면 이 프로세스에서 서버를 띄웁니다.")
+    parser.add_argument("--path", default="/answer", choices=("/answer", "/search"))
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_SECONDS)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERY_COUNT)
+    parser.add_argument("--no-cache", action="store_true", help="답변 캐시를 끄고 매번 검색하게 합니다 (/answer만 해당)")
+    parser.add_argument("--workers", type=int, help="이 프로세스에서 띄우는 서버의 작업 스레드 수")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="이 프로세스에서 띄우는 서버의 마이크로 배치 창 길이(ms)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        server_options = {"max_workers": args.workers} if args.workers else {}
+        if args.batch_window_ms > 0:
+            server_options["batch_window"] = args.batch_window_ms / 1000
+        server = create_server("127.0.0.1", 0, **server_options)
+        host, port = server.server_address[:2]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    payload_options = {"use_cache": False} if args.no_cache and args.path == "/answer" else {}
+    bodies = [
+        json.dumps({"question": query, **payload_options}, ensure_ascii=False).encode("utf-8")
+        for query in generate_queries(args.queries)
+    ]
+
+    print(f"대상 http://{host}:{port}{args.path}, 질문 {len(bodies)}개, 연결당 {args.duration:.0f}초")
+    try:
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            result = run_load(host, port, args.path, bodies, concurrency, args.duration)
+            print(
+                f"동시 연결 {concurrency:4d}: {result['requests_per_second']:9.1f} req/s "
+                f"p50 {result['p50_ms']:8.2f}ms p95 {result['p95_ms']:8.2f}ms p99 {result['p99_ms']:8.2f}ms "
+                f"상태 {result['status_counts']}",
+                flush=True,
+            )
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
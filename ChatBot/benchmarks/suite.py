@@ -0,0 +1,202 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import scipy
+import sklearn
+
+from benchmarks.synthetic_corpus import generate_faq_df, generate_queries
+from faq_chatbot import (
+    build_vectorizer_and_matrix,
+    find_best_match,
+    find_top_matches,
+    get_chatbot_response,
+    tokenize_korean_text,
+)
+from faq_tokenizer import expand_token
+
+
+DEFAULT_SIZES = "50,1000,10000,100000,1000000"
+DEFAULT_LANGUAGES = "ko,en"
+DEFAULT_QUERY_COUNT = 200
+# 비교 모드에서 기준보다 이 비율 이상 느려지거나 메모리를 더 쓰면 회귀로 표시합니다.
+DEFAULT_TOLERANCE = 0.2
+# 아주 짧은 측정값은 잡음이 커서, 차이가 이 값(ms)보다 작으면 비율이 커도 회귀로 보지 않습니다.
+DEFAULT_MIN_DELTA_MS = 0.05
+DEFAULT_MIN_DELTA_MB = 1.0
+
+
+# 이 함수는 밀리초 단위 측정값 목록을 p50/p95/p99/평균으로 요약합니다.
+def summarize_latencies(latencies_ms):
+    latencies_ms = np.asarray(latencies_ms, dtype=np.float64)
+    return {
+        "samples": int(latencies_ms.size),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+# 이 함수는 호출마다 걸린 시간을 잽니다. 시간은 tracemalloc 없이 재야 정확하므로, 메모리는 measure_peak_memory로 따로 잽니다.
+def measure_latencies(operation, arguments_list):
+    latencies_ms = []
+    for arguments in arguments_list:
+        started_at = time.perf_counter()
+        operation(*arguments)
+        latencies_ms.append((time.perf_counter() - started_at) * 1000)
+    return latencies_ms
+
+
+# 이 함수는 같은 호출들을 tracemalloc을 켠 채 한 번 더 실행해, 그동안 파이썬이 할당한 메모리의 최고점(MB)을 구합니다.
+def measure_peak_memory(operation, arguments_list):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline_bytes, _ = tracemalloc.get_traced_memory()
+        for arguments in arguments_list:
+            operation(*arguments)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak_bytes - baseline_bytes) / (1024 * 1024)
+
+
+# 이 함수는 답변 캐시를 거치지 않는 get_chatbot_response입니다. 캐시 적중 시간을 재지 않으려는 것입니다.
+def uncached_get_chatbot_response(user_question, faq_df, vectorizer, question_matrix):
+    return get_chatbot_response(user_question, faq_df, vectorizer, question_matrix, use_cache=False)
+
+
+def tokenize_cold(text):
+    expand_token.cache_clear()
+    return tokenize_korean_text(text)
+
+
+# 이 함수는 말뭉치 하나(언어, 크기)에 대해 토큰화, 학습, 검색 함수들을 모두 측정합니다.
+def run_corpus(language, size, query_count, seed):
+    faq_df = generate_faq_df(size, seed=seed, language=language)
+    questions = faq_df["Question"].tolist()
+    queries = generate_queries(query_count, seed=seed + 1, language=language)
+    results = {}
+
+    def record(operation_name, operation, arguments_list, memory_arguments_list=None):
+        summary = summarize_latencies(measure_latencies(operation, arguments_list))
+        summary["peak_memory_mb"] = measure_peak_memory(operation, memory_arguments_list or arguments_list)
+        results[f"{language}/{size}/{operation_name}"] = summary
+        print(
+            f"{language} {size:>9,} {operation_name:24s} "
+            f"p50 {summary['p50_ms']:9.3f}ms p95 {summary['p95_ms']:9.3f}ms p99 {summary['p99_ms']:9.3f}ms "
+            f"peak {summary['peak_memory_mb']:9.2f}MB",
+            flush=True,
+        )
+
+    query_arguments = [(query,) for query in queries]
+    record("tokenize_korean_text", tokenize_korean_text, query_arguments)
+    record("tokenize_korean_text_cold", tokenize_cold, query_arguments)
+
+    # 큰 말뭉치는 학습 한 번이 오래 걸리므로, 작은 말뭉치만 여러 번 재서 분위수를 구합니다.
+    fit_repeat = max(1, min(20, 100_000 // size))
+    record("build_vectorizer_and_matrix", build_vectorizer_and_matrix, [(questions,)] * fit_repeat, [(questions,)])
+
+    vectorizer, question_matrix = build_vectorizer_and_matrix(questions)
+    # 검색 엔진 준비(행렬 정규화)는 첫 호출에서 한 번만 일어나므로 측정 전에 끝내 둡니다.
+    find_top_matches(queries[0], faq_df, vectorizer, question_matrix)
+    engine_arguments = [(query, vectorizer, question_matrix) for query in queries]
+    frame_arguments = [(query, faq_df, vectorizer, question_matrix) for query in queries]
+    record("find_best_match", find_best_match, engine_arguments)
+    record("find_top_matches", find_top_matches, frame_arguments)
+    record("get_chatbot_response", uncached_get_chatbot_response, frame_arguments)
+    return results
+
+
+def collect_metadata(args):
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "scikit_learn": sklearn.__version__,
+        "sizes": args.sizes,
+        "languages": args.languages,
+        "queries": args.queries,
+        "seed": args.seed,
+    }
+
+
+# 이 함수는 현재 결과를 기준 결과와 비교해, 느려졌거나 메모리를 더 쓰게 된 항목 목록을 돌려줍니다.
+# p50과 p95는 시간, peak_memory_mb는 메모리 기준으로 봅니다. 한쪽에만 있는 항목은 비교하지 않습니다.
+def find_regressions(baseline_results, current_results, tolerance, min_delta_ms, min_delta_mb):
+    regressions = []
+    for key in sorted(set(baseline_results) & set(current_results)):
+        baseline, current = baseline_results[key], current_results[key]
+        for metric, min_delta in (("p50_ms", min_delta_ms), ("p95_ms", min_delta_ms), ("peak_memory_mb", min_delta_mb)):
+            if metric not in baseline or metric not in current:
+                continue
+            delta = current[metric] - baseline[metric]
+            if delta > min_delta and current[metric] > baseline[metric] * (1 + tolerance):
+                regressions.append(
+                    {
+                        "key": key,
+                        "metric": metric,
+                        "baseline": baseline[metric],
+                        "current": current[metric],
+                        "ratio": current[metric] / baseline[metric] if baseline[metric] else float("inf"),
+                    }
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="합성 말뭉치 크기별로 토큰화/학습/검색 지연 시간(p50/p95/p99)과 최대 메모리를 재고, 기준 결과와 비교합니다."
+    )
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--languages", default=DEFAULT_LANGUAGES)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERY_COUNT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일 경로")
+    parser.add_argument("--compare", help="비교할 기준 결과 JSON 파일 경로. 회귀가 있으면 종료 코드 1로 끝납니다.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    parser.add_argument("--min-delta-mb", type=float, default=DEFAULT_MIN_DELTA_MB)
+    args = parser.parse_args()
+
+    results = {}
+    for language in args.languages.split(","):
+        for size in (int(value) for value in args.sizes.split(",")):
+            results.update(run_corpus(language, size, args.queries, args.seed))
+
+    report = {"metadata": collect_metadata(args), "results": results}
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n결과를 저장했습니다: {output_path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = find_regressions(
+            baseline["results"], results, args.tolerance, args.min_delta_ms, args.min_delta_mb
+        )
+        print(f"\n기준 결과와 비교 ({args.compare}, 허용 {args.tolerance:.0%}):")
+        if not regressions:
+            print("  회귀 없음")
+            return
+        for regression in regressions:
+            print(
+                f"  회귀 {regression['key']} {regression['metric']}: "
+                f"{regression['baseline']:.3f} -> {regression['current']:.3f} (x{regression['ratio']:.2f})"
+            )
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import random
+
+import pandas as pd
+
+from create_faq_data import build_faq_records
+
+
+REGIONS = (
+    "서울", "부산", "제주", "경주", "전주", "강릉", "여수", "속초", "인천", "대구",
+    "광주", "대전", "수원", "춘천", "통영", "안동", "포항", "목포", "울산", "남해",
+)
+THEMES = (
+    "맛집 투어", "역사 탐방", "야경 투어", "가족 여행", "사진 명소", "시장 투어", "트레킹",
+    "미술관 투어", "한옥 체험", "섬 여행", "템플스테이", "자전거 투어", "와이너리", "축제",
+)
+ENGLISH_REGIONS = (
+    "Seoul", "Busan", "Jeju", "Gyeongju", "Jeonju", "Gangneung", "Yeosu", "Sokcho", "Incheon", "Daegu",
+)
+ENGLISH_THEMES = (
+    "food tour", "history walk", "night view tour", "family trip", "photo spots", "market tour", "hiking",
+)
+# 파트너 코드 수를 제한해, 말뭉치가 커져도 어휘가 끝없이 늘어나지 않게 합니다.
+PARTNER_CODE_COUNT = 5000
+
+
+# 이 함수는 create_faq_data.build_faq_records의 50개 문답을 틀로 삼아, 지역/테마/파트너 코드를 붙인 합성 FAQ를 만듭니다.
+# 같은 seed면 항상 같은 말뭉치가 나오므로 벤치마크 결과를 서로 비교할 수 있습니다.
+def generate_korean_records(count, seed=0):
+    templates = build_faq_records()
+    rng = random.Random(seed)
+    records = []
+    for row_number in range(count):
+        template = templates[row_number % len(templates)]
+        region = rng.choice(REGIONS)
+        theme = rng.choice(THEMES)
+        partner_code = f"파트너{rng.randrange(PARTNER_CODE_COUNT)}"
+        records.append(
+            {
+                "Question": f"{region} {theme} {partner_code} {template['Question']}",
+                "Answer": f"[{region} {theme} / {partner_code}] {template['Answer']}",
+            }
+        )
+    return records
+
+
+# 이 함수는 faq_data_english.csv의 문답을 틀로 삼아 같은 방식의 영어 합성 FAQ를 만듭니다.
+def generate_english_records(count, seed=0, english_csv_path="faq_data_english.csv"):
+    templates = pd.read_csv(english_csv_path)[["Question", "Answer"]].dropna().to_dict("records")
+    rng = random.Random(seed)
+    records = []
+    for row_number in range(count):
+        template = templates[row_number % len(templates)]
+        region = rng.choice(ENGLISH_REGIONS)
+        theme = rng.choice(ENGLISH_THEMES)
+        partner_code = f"partner{rng.randrange(PARTNER_CODE_COUNT)}"
+        records.append(
+            {
+                "Question": f"{region} {theme} {partner_code} {template['Question']}",
+                "Answer": f"[{region} {theme} / {partner_code}] {template['Answer']}",
+            }
+        )
+    return records
+
+
+# 이 함수는 합성 FAQ를 챗봇 엔진이 읽는 것과 같은 Question/Answer 데이터프레임으로 돌려줍니다.
+def generate_faq_df(count, seed=0, language="ko"):
+    if language == "en":
+        records = generate_english_records(count, seed=seed)
+    else:
+        records = generate_korean_records(count, seed=seed)
+    return pd.DataFrame(records, columns=["Question", "Answer"])
+
+
+# 이 함수는 합성 말뭉치에 던질 질문 목록을 만듭니다. 원래 FAQ 질문 일부에 지역/테마를 섞어 실제 질문처럼 만듭니다.
+# language="en"이면 faq_data_english.csv 질문과 영어 지역 이름으로 만듭니다.
+def generate_queries(count, seed=1, language="ko", english_csv_path="faq_data_english.csv"):
+    if language == "en":
+        templates = pd.read_csv(english_csv_path)[["Question", "Answer"]].dropna().to_dict("records")
+        regions = ENGLISH_REGIONS
+    else:
+        templates = build_faq_records()
+        regions = REGIONS
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        template = rng.choice(templates)
+        words = template["Question"].split()
+        if len(words) > 2 and rng.random() < 0.5:
+            words = words[: rng.randrange(2, len(words) + 1)]
+        prefix = rng.choice(regions) + " " if rng.random() < 0.5 else ""
+        queries.append(prefix + " ".join(words))
+    return queries
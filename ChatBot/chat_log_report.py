@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import heapq
+import json
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from chat_log_store import iter_chat_events, merge_segment_events
+from faq_light_engine import DEFAULT_THRESHOLD
+from faq_tokenizer import preprocess_text
+
+
+DEFAULT_LOG_DIR = Path(__file__).resolve().parent / "chat_logs"
+DEFAULT_SKETCH_CAPACITY = 1000
+DEFAULT_TOP_COUNT = 20
+SCORE_HISTOGRAM_BINS = 20
+HYPERLOGLOG_PRECISION = 12
+
+
+# 이 클래스는 Space-Saving 방식의 빈도 상위 항목(heavy hitter) 요약입니다.
+# 항목을 최대 capacity개만 기억하고, 자리가 없으면 가장 적게 센 항목을 새 항목으로 바꿔 그 개수에 이어서 셉니다.
+# 전체 n건 중 n/capacity번보다 많이 나온 항목은 반드시 남고, 각 개수의 과대 추정은 error 이하입니다.
+# 가장 적게 센 항목은 (개수, 항목) 최소 힙으로 찾습니다. 개수가 늘 때마다 새 값을 넣고, 꺼낼 때 낡은 값은 버립니다.
+class SpaceSavingCounter:
+    def __init__(self, capacity=DEFAULT_SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        self._heap = []
+
+    def add(self, item):
+        self.total += 1
+        item_count = self._counts.get(item)
+        if item_count is not None:
+            self._counts[item] = item_count + 1
+            self._push(item_count + 1, item)
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[item] = 1
+            self._errors[item] = 0
+            self._push(1, item)
+            return
+
+        smallest_count, smallest_item = heapq.heappop(self._heap)
+        while self._counts.get(smallest_item) != smallest_count:
+            smallest_count, smallest_item = heapq.heappop(self._heap)
+        del self._counts[smallest_item]
+        del self._errors[smallest_item]
+        self._counts[item] = smallest_count + 1
+        self._errors[item] = smallest_count
+        self._push(smallest_count + 1, item)
+
+    # 힙에 낡은 값이 너무 쌓이면 현재 개수로 다시 만들어, 메모리를 capacity에 비례하게 유지합니다.
+    def _push(self, item_count, item):
+        heapq.heappush(self._heap, (item_count, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(current_count, current_item) for current_item, current_count in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    # 개수가 많은 순서로 (항목, 추정 개수, 최대 과대 추정치)를 반환합니다.
+    def most_common(self, count):
+        ranked_items = sorted(self._counts.items(), key=lambda entry: (-entry[1], str(entry[0])))
+        return [(item, item_count, self._errors[item]) for item, item_count in ranked_items[:count]]
+
+
+# 이 클래스는 서로 다른 값의 개수를 고정 크기 메모리(2^precision 바이트)로 추정하는 HyperLogLog입니다.
+# 사용자/세션 수처럼 값이 아주 많아질 수 있는 항목에 씁니다. 표준 오차는 약 1.04/sqrt(2^precision)입니다.
+class HyperLogLog:
+    def __init__(self, precision=HYPERLOGLOG_PRECISION):
+        self.precision = precision
+        self.register_count = 1 << precision
+        self.registers = bytearray(self.register_count)
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        register = hashed >> (64 - self.precision)
+        remaining_bits = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining_bits.bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.register_count)
+        raw_estimate = alpha * self.register_count ** 2 / sum(2.0 ** -rank for rank in self.registers)
+        empty_registers = self.registers.count(0)
+        if raw_estimate <= 2.5 * self.register_count and empty_registers:
+            return round(self.register_count * math.log(self.register_count / empty_registers))
+        return round(raw_estimate)
+
+
+# 이 클래스는 similarity_score의 분포를 0~1 구간을 고르게 나눈 칸으로 셉니다. 분위수는 칸 안에서 선형 보간해 추정합니다.
+class ScoreHistogram:
+    def __init__(self, bin_count=SCORE_HISTOGRAM_BINS):
+        self.bin_count = bin_count
+        self.bins = [0] * bin_count
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, score):
+        self.count += 1
+        self.total += score
+        self.minimum = score if self.minimum is None else min(self.minimum, score)
+        self.maximum = score if self.maximum is None else max(self.maximum, score)
+        self.bins[min(max(int(score * self.bin_count), 0), self.bin_count - 1)] += 1
+
+    def quantile(self, fraction):
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bin_index, bin_count in enumerate(self.bins):
+            if bin_count and seen + bin_count >= target:
+                return (bin_index + (target - seen) / bin_count) / self.bin_count
+            seen += bin_count
+        return 1.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.minimum,
+            "max": self.maximum,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "bins": [
+                {"from": bin_index / self.bin_count, "to": (bin_index + 1) / self.bin_count, "count": bin_count}
+                for bin_index, bin_count in enumerate(self.bins)
+            ],
+        }
+
+
+# 이 클래스는 이벤트를 하나씩 받아 보고서용 집계만 갱신합니다. 이벤트 자체는 저장하지 않으므로 로그 크기와 상관없이 메모리가 일정합니다.
+class ChatLogReport:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, capacity=DEFAULT_SKETCH_CAPACITY):
+        self.threshold = threshold
+        self.event_types = Counter()
+        self.score_histogram = ScoreHistogram()
+        self.unanswered_questions = SpaceSavingCounter(capacity)
+        self.top_users = SpaceSavingCounter(capacity)
+        self.top_sessions = SpaceSavingCounter(capacity)
+        self.distinct_users = HyperLogLog()
+        self.distinct_sessions = HyperLogLog()
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.chat_messages = 0
+        self.unanswered_messages = 0
+
+    def add(self, event):
+        self.event_types[str(event.get("event_type"))] += 1
+        timestamp = event.get("timestamp")
+        if timestamp:
+            self.first_timestamp = self.first_timestamp or timestamp
+            self.last_timestamp = timestamp
+
+        user_id = event.get("user_id")
+        if user_id is not None and user_id != "system":
+            self.top_users.add(user_id)
+            self.distinct_users.add(user_id)
+        session_id = event.get("session_id")
+        if session_id is not None:
+            self.top_sessions.add(session_id)
+            self.distinct_sessions.add(session_id)
+
+        if event.get("event_type") != "chat_message":
+            return
+        self.chat_messages += 1
+        similarity_score = event.get("similarity_score")
+        if isinstance(similarity_score, (int, float)):
+            self.score_histogram.add(float(similarity_score))
+        # 안내 문구로 답한 질문(matched_question 없음)이나 기준 점수보다 낮은 질문을 "답하지 못한 질문"으로 셉니다.
+        if event.get("matched_question") is None or (
+            isinstance(similarity_score, (int, float)) and similarity_score < self.threshold
+        ):
+            self.unanswered_messages += 1
+            normalized_question = preprocess_text(event.get("question", "")).strip()
+            if normalized_question:
+                self.unanswered_questions.add(normalized_question)
+
+    def to_dict(self, top_count=DEFAULT_TOP_COUNT):
+        def heavy_hitters(counter):
+            return [
+                {"value": item, "count": item_count, "max_overcount": error}
+                for item, item_count, error in counter.most_common(top_count)
+            ]
+
+        return {
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "events_by_type": dict(self.event_types.most_common()),
+            "chat_messages": self.chat_messages,
+            "unanswered_messages": self.unanswered_messages,
+            "similarity_score": self.score_histogram.summary(),
+            "top_unanswered_questions": heavy_hitters(self.unanswered_questions),
+            "distinct_users": self.distinct_users.estimate(),
+            "distinct_sessions": self.distinct_sessions.estimate(),
+            "top_users": heavy_hitters(self.top_users),
+            "top_sessions": heavy_hitters(self.top_sessions),
+        }
+
+
+def format_score(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+# 이 함수는 보고서 딕셔너리를 사람이 읽기 좋은 텍스트로 출력합니다.
+def print_report(report):
+    print(f"기간: {report['first_timestamp']} ~ {report['last_timestamp']}")
+    print("\n[이벤트 종류별 건수]")
+    for event_type, event_count in report["events_by_type"].items():
+        print(f"  {event_type:28s} {event_count:>10,}")
+
+    scores = report["similarity_score"]
+    print(f"\n[similarity_score 분포] {scores['count']:,}건")
+    print(
+        f"  평균 {format_score(scores['mean'])}  최소 {format_score(scores['min'])}  최대 {format_score(scores['max'])}  "
+        f"p50 {format_score(scores['p50'])}  p90 {format_score(scores['p90'])}  p99 {format_score(scores['p99'])}"
+    )
+    largest_bin = max((score_bin["count"] for score_bin in scores["bins"]), default=0) or 1
+    for score_bin in scores["bins"]:
+        bar = "#" * round(40 * score_bin["count"] / largest_bin)
+        print(f"  {score_bin['from']:.2f}-{score_bin['to']:.2f} {score_bin['count']:>9,} {bar}")
+
+    print(f"\n[답하지 못한 질문 상위] 전체 채팅 {report['chat_messages']:,}건 중 {report['unanswered_messages']:,}건")
+    for entry in report["top_unanswered_questions"]:
+        print(f"  {entry['count']:>8,} (±{entry['max_overcount']}) {entry['value']}")
+
+    print(f"\n[사용자] 약 {report['distinct_users']:,}명")
+    for entry in report["top_users"]:
+        print(f"  {entry['count']:>8,} (±{entry['max_overcount']}) {entry['value']}")
+    print(f"\n[세션] 약 {report['distinct_sessions']:,}개")
+    for entry in report["top_sessions"]:
+        print(f"  {entry['count']:>8,} (±{entry['max_overcount']}) {entry['value']}")
+
+
+def parse_since(value):
+    since = datetime.fromisoformat(value)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # 로그의 timestamp는 UTC로 남으므로, 예를 들어 +09:00으로 받은 시각도 UTC로 바꿔 둡니다.
+    return since.astimezone(timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대화 로그를 한 줄씩 읽으며 이벤트/유사도/미응답 질문/사용자 통계를 냅니다.")
+    parser.add_argument("--log-dir", default=str(DEFAULT_LOG_DIR), help="구간 로그 폴더 (기본: chat_logs)")
+    parser.add_argument("--file", action="append", default=[], help="특정 로그 파일만 읽기 (.jsonl, .jsonl.gz, 여러 번 지정 가능)")
+    parser.add_argument("--since", type=parse_since, help="이 시각 이후 이벤트만 집계 (ISO 8601, 예: 2026-01-01)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_COUNT)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_SKETCH_CAPACITY, help="빈도 요약이 기억할 최대 항목 수")
+    parser.add_argument("--json", action="store_true", help="JSON으로 출력")
+    args = parser.parse_args()
+
+    if args.file:
+        # 파일을 여러 개 주면 구간 폴더를 읽을 때처럼 timestamp 순서로 합칩니다. 보고서의 기간(첫/마지막 timestamp)이 읽은 순서에 기대기 때문입니다.
+        since_text = args.since.isoformat() if args.since else ""
+        events = (
+            event for event in merge_segment_events(args.file)
+            if str(event.get("timestamp", "")) >= since_text
+        )
+    else:
+        events = iter_chat_events(args.log_dir, since=args.since)
+
+    report = ChatLogReport(threshold=args.threshold, capacity=args.capacity)
+    for event in events:
+        report.add(event)
+
+    if args.json:
+        print(json.dumps(report.to_dict(args.top), ensure_ascii=False, indent=2))
+    else:
+        print_report(report.to_dict(args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+import glob
+import gzip
+import heapq
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # zstd 압축은 선택 사항입니다. 없으면 gzip을 씁니다.
+    zstandard = None
+
+
+SEGMENT_PREFIX = "guidematch_chat_log"
+# 구간 저장소 도입 전에 모든 이벤트를 쌓던 단일 파일입니다. 읽을 때는 함께 읽습니다.
+LEGACY_LOG_FILE_NAME = f"{SEGMENT_PREFIX}.jsonl"
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_SEGMENT_SECONDS = 3600
+DEFAULT_RETENTION_DAYS = 30
+GZIP_COMPRESSION = "gzip"
+ZSTD_COMPRESSION = "zstd"
+COMPRESSED_SUFFIXES = {GZIP_COMPRESSION: ".gz", ZSTD_COMPRESSION: ".zst"}
+
+# 예: guidematch_chat_log.20260101T120000Z.4242.0003.jsonl(.gz)
+SEGMENT_NAME_PATTERN = re.compile(
+    rf"^{SEGMENT_PREFIX}\.(?P<started>\d{{8}}T\d{{6}}Z)\.(?P<pid>\d+)\.(?P<sequence>\d+)\.jsonl(?P<suffix>\.gz|\.zst)?$"
+)
+SEGMENT_STARTED_FORMAT = "%Y%m%dT%H%M%SZ"
+# 압축하는 동안 잠깐 생기는 파일입니다. 주인 없는 구간을 맡은 표시(.claim-<pid>)와 쓰는 중인 압축 파일(.tmp-<pid>)입니다.
+# 예: guidematch_chat_log.20260101T120000Z.4242.0003.jsonl.claim-5151, ...0003.jsonl.gz.tmp-5151
+LEFTOVER_NAME_PATTERN = re.compile(r"^(?P<segment_name>.+)\.(?P<kind>claim|tmp)-(?P<pid>\d+)$")
+# /proc/stat의 부팅 시각과 구간 이름의 시작 시각은 초 단위로 잘려 있어, 이만큼은 앞뒤가 바뀌어도 같은 프로세스로 봅니다.
+PROCESS_START_TOLERANCE_SECONDS = 2
+
+
+# 이 함수는 /proc/<pid>/stat의 22번째 필드(부팅 후 시작까지의 클럭 틱)로 프로세스가 시작된 시각(epoch 초)을 구합니다.
+# /proc이 없는 운영체제이거나 프로세스가 사라졌으면 None을 돌려줍니다.
+def read_process_start_epoch(pid):
+    try:
+        stat_text = Path(f"/proc/{pid}/stat").read_text()
+        boot_epoch = next(
+            int(line.split()[1]) for line in Path("/proc/stat").read_text().splitlines() if line.startswith("btime ")
+        )
+        # 두 번째 필드(실행 파일 이름)에 공백이나 괄호가 들어갈 수 있어, 마지막 ")" 뒤부터 셉니다. 그 뒤 첫 필드가 3번째입니다.
+        start_ticks = int(stat_text.rsplit(")", 1)[1].split()[22 - 3])
+    except (OSError, StopIteration, ValueError, IndexError):
+        return None
+    return boot_epoch + start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+# 이 함수는 해당 pid의 프로세스가 아직 살아 있는지 확인합니다. 주인 없는 열린 구간을 정리할 때 씁니다.
+# pid는 재사용되므로(컨테이너에서는 재시작할 때마다 pid 1), started_before를 주면 그 프로세스가 그 시각 이전에 시작했는지도 봅니다.
+# 구간을 연 뒤에 시작한 프로세스는 그 구간의 주인일 수 없습니다.
+def is_process_alive(pid, started_before=None):
+    if pid != os.getpid():
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+    if started_before is None:
+        return True
+    process_started = read_process_start_epoch(pid)
+    return process_started is None or process_started <= started_before + PROCESS_START_TOLERANCE_SECONDS
+
+
+# 이 클래스는 로그 폴더 안의 구간 파일 하나를 나타냅니다. 이름에 시작 시각, 쓴 프로세스, 순번, 압축 여부가 들어 있습니다.
+class LogSegment:
+    __slots__ = ("path", "started", "pid", "sequence", "suffix")
+
+    def __init__(self, path, started, pid, sequence, suffix):
+        self.path = path
+        self.started = started
+        self.pid = pid
+        self.sequence = sequence
+        self.suffix = suffix
+
+    @classmethod
+    def parse(cls, path):
+        match = SEGMENT_NAME_PATTERN.match(path.name)
+        if match is None:
+            return None
+        return cls(
+            path,
+            started=match["started"],
+            pid=int(match["pid"]),
+            sequence=int(match["sequence"]),
+            suffix=match["suffix"] or "",
+        )
+
+    @property
+    def compressed(self):
+        return bool(self.suffix)
+
+    @property
+    def started_epoch(self):
+        return datetime.strptime(self.started, SEGMENT_STARTED_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+# 이 클래스는 대화 로그를 여러 구간 파일로 나눠 쌓는 저장소입니다.
+# - 프로세스마다 자기 구간 파일에만 쓰므로, Streamlit 프로세스가 여러 개여도 한 파일에 줄이 섞이지 않습니다.
+# - 구간이 max_segment_bytes를 넘거나 max_segment_seconds보다 오래되면 닫고 gzip(또는 zstd)으로 압축합니다.
+# - 압축된 구간 중 retention_days보다 오래된 것, max_total_bytes를 넘는 오래된 것은 지웁니다.
+# - 비정상 종료로 남은 다른 프로세스의 열린 구간은 다음에 저장소를 여는 프로세스가 압축해 둡니다.
+class ChatLogStore:
+    def __init__(
+        self,
+        log_dir,
+        max_segment_bytes=DEFAULT_MAX_SEGMENT_BYTES,
+        max_segment_seconds=DEFAULT_MAX_SEGMENT_SECONDS,
+        retention_days=DEFAULT_RETENTION_DAYS,
+        max_total_bytes=None,
+        compression=GZIP_COMPRESSION,
+    ):
+        if compression not in COMPRESSED_SUFFIXES:
+            raise ValueError(f"지원하지 않는 압축 방식입니다: {compression}")
+        if compression == ZSTD_COMPRESSION and zstandard is None:
+            warnings.warn("zstandard 패키지가 없어 로그 구간을 gzip으로 압축합니다.")
+            compression = GZIP_COMPRESSION
+
+        self.log_dir = Path(log_dir)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.compression = compression
+        self.rotated_segments = 0
+        self._lock = threading.Lock()
+        self._active_file = None
+        self._active_path = None
+        self._active_opened_at = None
+        self._active_bytes = 0
+        self._sequence = 0
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.compress_orphaned_segments()
+        self.apply_retention()
+
+    # 줄 묶음(이미 "\n"으로 끝나는 JSON Lines 문자열)을 현재 구간에 덧붙입니다. 필요하면 먼저 구간을 바꿉니다.
+    def append_lines(self, lines):
+        encoded_lines = lines.encode("utf-8")
+        with self._lock:
+            if self._active_file is not None and self.should_rotate():
+                self._rotate()
+            if self._active_file is None:
+                self._open_segment()
+            self._active_file.write(encoded_lines)
+            self._active_file.flush()
+            self._active_bytes += len(encoded_lines)
+
+    def should_rotate(self):
+        return (
+            self._active_bytes >= self.max_segment_bytes
+            or time.monotonic() - self._active_opened_at >= self.max_segment_seconds
+        )
+
+    # 새 구간 파일을 엽니다. 호출 전에 잠금을 잡고 있어야 합니다.
+    def _open_segment(self):
+        started = datetime.now(timezone.utc).strftime(SEGMENT_STARTED_FORMAT)
+        self._sequence += 1
+        self._active_path = self.log_dir / f"{SEGMENT_PREFIX}.{started}.{os.getpid()}.{self._sequence:04d}.jsonl"
+        self._active_file = self._active_path.open("ab")
+        self._active_opened_at = time.monotonic()
+        self._active_bytes = 0
+
+    # 현재 구간을 닫고 압축한 뒤, 보존 기간 정리를 합니다. 호출 전에 잠금을 잡고 있어야 합니다.
+    def _rotate(self):
+        self._active_file.close()
+        closed_path = self._active_path
+        self._active_file = None
+        self._active_path = None
+        self.compress_segment(closed_path)
+        self.rotated_segments += 1
+        self.apply_retention()
+
+    # 닫힌 구간 하나를 압축 파일로 바꿉니다. 임시 이름으로 다 쓴 뒤 이름을 바꾸므로, 읽는 쪽은 반쯤 압축된 파일을 보지 않습니다.
+    # segment_name을 주면 원본 파일 이름과 상관없이 그 구간 이름으로 압축 파일을 만듭니다.
+    def compress_segment(self, segment_path, segment_name=None):
+        segment_name = segment_name or segment_path.name
+        compressed_path = segment_path.with_name(segment_name + COMPRESSED_SUFFIXES[self.compression])
+        temporary_path = compressed_path.with_name(compressed_path.name + f".tmp-{os.getpid()}")
+        try:
+            with segment_path.open("rb") as source_file, temporary_path.open("wb") as target_file:
+                if self.compression == ZSTD_COMPRESSION:
+                    with zstandard.ZstdCompressor().stream_writer(target_file, closefd=False) as compressed_file:
+                        shutil.copyfileobj(source_file, compressed_file)
+                else:
+                    with gzip.GzipFile(fileobj=target_file, mode="wb") as compressed_file:
+                        shutil.copyfileobj(source_file, compressed_file)
+            os.replace(temporary_path, compressed_path)
+            segment_path.unlink()
+        except OSError as error:
+            temporary_path.unlink(missing_ok=True)
+            warnings.warn(f"로그 구간을 압축하지 못해 원본을 그대로 둡니다: {segment_path.name} ({error})")
+            return None
+        return compressed_path
+
+    # 죽은 프로세스가 남긴 열린 구간을 압축합니다.
+    # 여러 프로세스가 동시에 시작해도 하나만 처리하도록, 먼저 자기 pid가 붙은 이름으로 바꾸는 데 성공한 쪽이 맡습니다.
+    def compress_orphaned_segments(self):
+        self.recover_leftover_files()
+        for segment in self.list_segments():
+            if segment.compressed or is_process_alive(segment.pid, started_before=segment.started_epoch):
+                continue
+            claimed_path = segment.path.with_name(segment.path.name + f".claim-{os.getpid()}")
+            try:
+                segment.path.rename(claimed_path)
+            except OSError:
+                continue
+            self.compress_segment(claimed_path, segment_name=segment.path.name)
+
+    # 압축 도중 죽은 프로세스가 남긴 파일을 정리합니다. 이 파일들은 구간 목록에 나오지 않아 읽기, 압축, 보존 정책 모두에서 빠집니다.
+    # - .tmp-<pid>: 다 쓰지 못한 압축 파일입니다. 원본(구간이나 .claim 파일)은 압축을 마친 뒤에야 지우므로 그냥 지웁니다.
+    # - .claim-<pid>: 압축하려고 맡아 둔 원본입니다. 자기 pid로 다시 맡아 압축합니다.
+    # 이름을 바꾸면 ctime이 그 시각으로 바뀌므로, ctime 이후에 시작한 같은 pid의 프로세스는 주인이 아닌 것으로 봅니다.
+    def recover_leftover_files(self):
+        leftovers = []
+        for path in self.log_dir.iterdir():
+            match = LEFTOVER_NAME_PATTERN.match(path.name)
+            if match is None or not match["segment_name"].startswith(SEGMENT_PREFIX + "."):
+                continue
+            try:
+                created_at = path.stat().st_ctime
+            except OSError:
+                continue
+            if is_process_alive(int(match["pid"]), started_before=created_at):
+                continue
+            leftovers.append((match["kind"], match["segment_name"], path))
+
+        # 다 쓰지 못한 압축 파일을 먼저 지워야, 아래에서 같은 이름으로 다시 압축할 때 섞이지 않습니다.
+        for kind, segment_name, path in sorted(leftovers, key=lambda leftover: leftover[0] != "tmp"):
+            if kind == "tmp":
+                path.unlink(missing_ok=True)
+                continue
+            claimed_path = path.with_name(segment_name + f".claim-{os.getpid()}")
+            try:
+                path.rename(claimed_path)
+            except OSError:
+                continue
+            self.compress_segment(claimed_path, segment_name=segment_name)
+
+    # 보존 정책을 적용합니다. 압축된(닫힌) 구간만 지우며, 지금 쓰고 있는 구간은 건드리지 않습니다.
+    def apply_retention(self):
+        compressed_segments = []
+        for segment in self.list_segments():
+            if not segment.compressed:
+                continue
+            try:
+                segment_stat = segment.path.stat()
+            except OSError:
+                continue
+            compressed_segments.append((segment_stat.st_mtime, segment_stat.st_size, segment.path))
+        compressed_segments.sort()
+
+        if self.retention_days is not None:
+            cutoff = time.time() - self.retention_days * 86400
+            while compressed_segments and compressed_segments[0][0] < cutoff:
+                compressed_segments.pop(0)[2].unlink(missing_ok=True)
+
+        if self.max_total_bytes is not None:
+            total_bytes = sum(size for _, size, _ in compressed_segments)
+            while compressed_segments and total_bytes > self.max_total_bytes:
+                _, size, path = compressed_segments.pop(0)
+                path.unlink(missing_ok=True)
+                total_bytes -= size
+
+    # 로그 폴더의 구간 파일을 (시작 시각, pid, 순번) 순서로 나열합니다.
+    def list_segments(self):
+        segments = [
+            segment for segment in map(LogSegment.parse, self.log_dir.iterdir())
+            if segment is not None
+        ]
+        segments.sort(key=lambda segment: (segment.started, segment.pid, segment.sequence))
+        return segments
+
+    # 현재 구간을 닫습니다. compress=True면 정상 종료로 보고 바로 압축해 둡니다.
+    def close(self, compress=True):
+        with self._lock:
+            if self._active_file is None:
+                return
+            if compress:
+                self._rotate()
+            else:
+                self._active_file.close()
+                self._active_file = None
+                self._active_path = None
+
+
+# 이 함수는 구간 파일 하나를 읽으려 할 때 차례로 시도할 경로를 내보냅니다.
+# 목록을 만든 뒤 읽기 전에 구간이 닫혀 압축되면 원래 이름은 사라지고 압축 파일(.gz/.zst)이 생깁니다.
+# 주인 없는 구간은 압축하는 동안 ".claim-<pid>" 이름으로 잠시 바뀌어 있으므로, 그 파일과 그 뒤의 압축 파일도 다시 찾아봅니다.
+def iter_segment_path_candidates(segment_path):
+    yield segment_path
+    if segment_path.suffix != ".jsonl":
+        return
+    compressed_paths = [segment_path.with_name(segment_path.name + suffix) for suffix in COMPRESSED_SUFFIXES.values()]
+    yield from compressed_paths
+    yield from sorted(segment_path.parent.glob(glob.escape(segment_path.name) + ".claim-*"))
+    yield from compressed_paths
+
+
+# 이 함수는 경로 하나를 압축 방식에 맞게 텍스트로 엽니다. 파일이 없으면 FileNotFoundError를 그대로 냅니다.
+def open_segment_lines(segment_path):
+    if segment_path.suffix == ".gz":
+        return gzip.open(segment_path, "rt", encoding="utf-8")
+    if segment_path.suffix == ".zst":
+        raw_file = segment_path.open("rb")
+        if zstandard is None:
+            raw_file.close()
+            warnings.warn(f"zstandard 패키지가 없어 {segment_path.name}을 읽지 못했습니다.")
+            return None
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw_file, closefd=True), encoding="utf-8")
+    return segment_path.open("r", encoding="utf-8")
+
+
+# 이 함수는 구간 파일 하나(압축 여부 상관없이)를 줄 단위로 읽어 JSON 이벤트를 하나씩 내보냅니다.
+# 쓰는 중인 구간의 마지막 줄처럼 깨진 줄은 건너뜁니다.
+def iter_segment_events(segment_path):
+    line_file = None
+    for candidate_path in iter_segment_path_candidates(Path(segment_path)):
+        try:
+            line_file = open_segment_lines(candidate_path)
+        except FileNotFoundError:
+            continue
+        break
+    if line_file is None:
+        # 보존 정책으로 지워졌거나 zstd 구간을 읽을 수 없습니다.
+        return
+
+    with line_file:
+        for line in line_file:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield event
+
+
+# 이 함수는 로그 폴더의 모든 구간(예전 단일 파일 포함)을 timestamp 순서로 합쳐 이벤트를 하나씩 내보냅니다.
+# 구간마다 이미 시간 순서로 쌓여 있으므로, heapq.merge로 구간마다 한 줄씩만 메모리에 두고 합칩니다.
+# since를 주면 마지막 수정 시각이 그보다 이른 구간은 열지도 않습니다.
+def iter_chat_events(log_dir, since=None):
+    log_dir = Path(log_dir)
+    if not log_dir.exists():
+        return iter(())
+
+    segment_paths = []
+    legacy_path = log_dir / LEGACY_LOG_FILE_NAME
+    if legacy_path.exists():
+        segment_paths.append(legacy_path)
+    segment_paths.extend(
+        segment.path for segment in sorted(
+            filter(None, map(LogSegment.parse, log_dir.iterdir())),
+            key=lambda segment: (segment.started, segment.pid, segment.sequence),
+        )
+    )
+
+    since_text = None
+    if since is not None:
+        # 이벤트 timestamp는 UTC 문자열이므로, 다른 시간대로 받은 기준 시각도 UTC로 바꿔 문자열로 비교합니다.
+        since_text = since.astimezone(timezone.utc).isoformat()
+        since_epoch = since.timestamp()
+        segment_paths = [path for path in segment_paths if modified_after(path, since_epoch)]
+
+    merged_events = merge_segment_events(segment_paths)
+    if since_text is None:
+        return merged_events
+    return (event for event in merged_events if str(event.get("timestamp", "")) >= since_text)
+
+
+# 이 함수는 구간 파일 여러 개를 timestamp 순서로 합쳐 이벤트를 하나씩 내보냅니다. 파일마다 한 줄씩만 메모리에 둡니다.
+def merge_segment_events(segment_paths):
+    return heapq.merge(
+        *(iter_segment_events(path) for path in segment_paths),
+        key=lambda event: str(event.get("timestamp", "")),
+    )
+
+
+def modified_after(path, epoch_seconds):
+    for candidate_path in iter_segment_path_candidates(path):
+        try:
+            return candidate_path.stat().st_mtime >= epoch_seconds
+        except OSError:
+            continue
+    return False
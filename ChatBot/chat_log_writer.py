@@ -0,0 +1,168 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+from chat_log_store import ChatLogStore
+
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.5
+DEFAULT_CLOSE_TIMEOUT_SECONDS = 5.0
+
+# 쓰기 스레드에게 "남은 것을 모두 쓰고 끝내라"고 알리는 표시입니다.
+_STOP = object()
+
+
+# 이 클래스는 대화 로그를 백그라운드 스레드 하나가 모아서 로그 저장소(ChatLogStore)에 쓰는 기록기입니다.
+# 화면을 그리는 쪽은 enqueue로 큐에 넣기만 하고, 직렬화/쓰기/flush/구간 교체는 쓰기 스레드가 묶음 단위로 합니다.
+# 큐가 가득 차면 기다리지 않고 그 이벤트를 버린 뒤 dropped_events를 올립니다. 로그 때문에 답변이 늦어지지 않게 하기 위해서입니다.
+class ChatLogWriter:
+    def __init__(
+        self,
+        store,
+        max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+        batch_size=DEFAULT_BATCH_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueued_events = 0
+        self.written_events = 0
+        self.dropped_events = 0
+        self.flushed_batches = 0
+        self.write_errors = 0
+        self.invalid_events = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._counter_lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="chat-log-writer", daemon=True)
+        self._thread.start()
+
+    # 기록 하나를 큐에 넣습니다. 넣었으면 True, 큐가 가득 찼거나 닫힌 뒤라 버렸으면 False를 반환합니다.
+    def enqueue(self, record):
+        if self._closed:
+            with self._counter_lock:
+                self.dropped_events += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped_events += 1
+            return False
+        with self._counter_lock:
+            self.enqueued_events += 1
+        return True
+
+    # 큐를 비우며 묶음을 만들고, batch_size만큼 모이거나 flush_interval이 지나면 한 번에 씁니다.
+    def _write_loop(self):
+        batch = []
+        batch_started_at = None
+        stopping = False
+        while not stopping:
+            timeout = None
+            if batch:
+                timeout = max(0.0, batch_started_at + self.flush_interval - time.monotonic())
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                stopping = True
+            elif record is not None:
+                if not batch:
+                    batch_started_at = time.monotonic()
+                batch.append(record)
+
+            if batch and (
+                stopping
+                or len(batch) >= self.batch_size
+                or time.monotonic() - batch_started_at >= self.flush_interval
+            ):
+                self._write_batch(batch)
+                batch = []
+
+    # 묶음 하나를 쓰기 한 번으로 기록합니다. 실패하면 오류만 남기고 다음 묶음을 계속 받습니다.
+    # JSON으로 바꿀 수 없는 기록은 그 기록만 버리고 invalid_events를 올립니다. 나머지 기록은 그대로 씁니다.
+    def _write_batch(self, batch):
+        lines = []
+        serialize_error = None
+        for record in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            except (TypeError, ValueError) as error:
+                serialize_error = error
+        invalid_count = len(batch) - len(lines)
+        if invalid_count:
+            with self._counter_lock:
+                self.invalid_events += invalid_count
+                self.dropped_events += invalid_count
+                self.last_error = str(serialize_error)
+        if not lines:
+            return
+
+        try:
+            self.store.append_lines("".join(lines))
+        except OSError as error:
+            with self._counter_lock:
+                self.write_errors += 1
+                self.dropped_events += len(lines)
+                self.last_error = str(error)
+            return
+        with self._counter_lock:
+            self.written_events += len(lines)
+            self.flushed_batches += 1
+
+    # 새 이벤트를 더 받지 않고, 큐에 남은 이벤트를 모두 쓴 뒤 쓰기 스레드를 끝내고 현재 구간을 닫습니다.
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT_SECONDS):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # 큐가 가득 차 있어도 종료 표시는 반드시 넣어야 하므로, 여기서만 자리가 날 때까지 기다립니다.
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.store.close()
+
+    # 로그 기록 상태를 반환합니다. dropped_events가 늘고 있다면 큐 크기나 디스크 상태를 살펴봐야 합니다.
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "enqueued_events": self.enqueued_events,
+                "written_events": self.written_events,
+                "dropped_events": self.dropped_events,
+                "flushed_batches": self.flushed_batches,
+                "write_errors": self.write_errors,
+                "invalid_events": self.invalid_events,
+                "last_error": self.last_error,
+                "queued_events": self._queue.qsize(),
+                "closed": self._closed,
+            }
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+# 이 함수는 로그 폴더마다 프로세스 전체에서 기록기를 하나만 만들어 돌려줍니다.
+# Streamlit은 화면마다 스크립트를 다시 실행하므로, 기록기는 이 모듈에 붙여 두어야 한 번만 만들어집니다.
+# 프로세스가 끝날 때 큐에 남은 이벤트를 쓰고 구간을 압축하도록 종료 처리를 등록합니다.
+# store_options(max_segment_bytes, retention_days, compression 등)는 ChatLogStore로 넘깁니다.
+def get_chat_log_writer(log_dir, store_options=None, **writer_options):
+    writer_key = Path(log_dir).resolve()
+    with _writers_lock:
+        writer = _writers.get(writer_key)
+        if writer is None:
+            writer = ChatLogWriter(ChatLogStore(log_dir, **(store_options or {})), **writer_options)
+            _writers[writer_key] = writer
+            atexit.register(writer.close)
+        return writer
@@ -0,0 +1,336 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+from chat_turns import turn_from_row, turn_to_row
+from faq_metrics import registry
+
+
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+# 예산을 넘으면 상주 메모리가 예산의 이 비율 아래로 내려갈 때까지 내립니다. 예산 언저리에서 매번 한 세션씩 내리고 올리는 일을 막습니다.
+DEFAULT_LOW_WATERMARK = 0.8
+# 이만큼 조용했던 세션만 디스크로 내립니다. 지금 화면을 그리고 있는 세션의 기록을 건드리지 않기 위해서입니다.
+DEFAULT_MIN_IDLE_SECONDS = 30.0
+# 브라우저를 닫아 다시 돌아오지 않는 세션의 파일은 이 시간이 지나면 지웁니다.
+DEFAULT_MAX_SPILL_AGE_SECONDS = 24 * 60 * 60
+SPILL_FILE_SUFFIX = ".json.gz"
+SAFE_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+CHAT_SESSIONS = registry.gauge(
+    "faq_chat_sessions",
+    "Chat sessions known to the session memory governor, by state (resident or spilled).",
+    label_names=("state",),
+)
+CHAT_SESSION_RESIDENT_BYTES = registry.gauge(
+    "faq_chat_session_resident_bytes",
+    "Approximate bytes of chat history held in memory across all sessions.",
+)
+CHAT_SESSION_SPILLS_TOTAL = registry.counter(
+    "faq_chat_session_spills_total",
+    "Chat histories written to disk because the session memory budget was exceeded.",
+)
+CHAT_SESSION_REHYDRATIONS_TOTAL = registry.counter(
+    "faq_chat_session_rehydrations_total",
+    "Spilled chat histories read back from disk when their session became active again.",
+)
+
+
+# 이 함수는 대화 메시지 하나가 차지하는 메모리를 대략 셉니다. 공유 색인의 답변 문장은 세션 몫이 아니므로 넣지 않습니다.
+def estimate_turn_bytes(turn):
+    size = sys.getsizeof(turn)
+    if turn.text is not None:
+        size += sys.getsizeof(turn.text)
+    size += sys.getsizeof(turn.candidate_row_ids) + sys.getsizeof(turn.candidate_scores)
+    size += sum(sys.getsizeof(score) for score in turn.candidate_scores)
+    return size
+
+
+def estimate_turns_bytes(turns):
+    return sys.getsizeof(turns) + sum(estimate_turn_bytes(turn) for turn in turns)
+
+
+# 이 클래스는 세션 하나의 대화 기록입니다. st.session_state에는 이 객체를 넣고, 메시지 목록은 turns로 꺼냅니다.
+# 관리자가 기록을 디스크로 내려 두었으면 turns를 꺼내는 순간 다시 읽어 오므로, 쓰는 쪽은 내려갔는지 신경 쓰지 않아도 됩니다.
+class SessionChatHistory:
+    __slots__ = ("session_id", "approx_bytes", "last_active", "_turns", "_lock", "_governor", "__weakref__")
+
+    def __init__(self, governor, session_id, turns):
+        self.session_id = session_id
+        self.approx_bytes = 0
+        self.last_active = time.monotonic()
+        self._turns = list(turns)
+        self._lock = threading.Lock()
+        self._governor = governor
+
+    @property
+    def spilled(self):
+        return self._turns is None
+
+    # 메시지 목록을 돌려줍니다. 돌려받은 목록은 읽기만 하고, 바꿀 때는 append/replace를 씁니다.
+    @property
+    def turns(self):
+        with self._lock:
+            turns = self._load_locked()
+        self._governor.touch(self)
+        return turns
+
+    def __len__(self):
+        return len(self.turns)
+
+    def append(self, *turns):
+        with self._lock:
+            self._load_locked().extend(turns)
+            added_bytes = sum(estimate_turn_bytes(turn) for turn in turns)
+            self.approx_bytes += added_bytes
+            self._governor.account(added_bytes)
+        self._governor.touch(self)
+
+    def replace(self, turns):
+        with self._lock:
+            self._load_locked()
+            self._turns = list(turns)
+            new_bytes = estimate_turns_bytes(self._turns)
+            self._governor.account(new_bytes - self.approx_bytes)
+            self.approx_bytes = new_bytes
+        self._governor.touch(self)
+
+    # 잠금을 잡은 채로 부릅니다. 내려가 있으면 디스크에서 다시 읽어 옵니다.
+    def _load_locked(self):
+        if self._turns is None:
+            self._turns = self._governor.rehydrate(self)
+        return self._turns
+
+
+# 이 클래스는 모든 세션의 대화 기록이 차지하는 메모리를 대략 세고, 예산을 넘으면 가장 오래 조용했던 세션부터 디스크로 내리는 관리자입니다.
+# 내린 기록은 session_id 이름의 gzip JSON 파일 하나로 저장하고, 그 세션이 다시 화면을 그리면 읽어 온 뒤 파일을 지웁니다.
+# 세션 객체는 약한 참조로만 들고 있으므로, Streamlit이 세션을 정리하면 집계와 파일도 함께 정리됩니다.
+class SessionMemoryGovernor:
+    def __init__(
+        self,
+        spill_dir,
+        memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES,
+        low_watermark=DEFAULT_LOW_WATERMARK,
+        min_idle_seconds=DEFAULT_MIN_IDLE_SECONDS,
+        max_spill_age_seconds=DEFAULT_MAX_SPILL_AGE_SECONDS,
+    ):
+        self.spill_dir = Path(spill_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.low_watermark = low_watermark
+        self.min_idle_seconds = min_idle_seconds
+        self.max_spill_age_seconds = max_spill_age_seconds
+        self.resident_bytes = 0
+        self.spilled_bytes_on_disk = 0
+        self.spills = 0
+        self.rehydrations = 0
+        self.spill_errors = 0
+        self.last_error = None
+        self._sessions = OrderedDict()
+        self._spilled_file_sizes = {}
+        self._lock = threading.Lock()
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.remove_stale_spill_files()
+
+    # 새 세션의 대화 기록을 만들어 돌려줍니다. 같은 session_id가 이미 있으면 그 기록을 돌려줍니다.
+    def create(self, session_id, turns=()):
+        with self._lock:
+            reference = self._sessions.get(session_id)
+            history = reference() if reference is not None else None
+        if history is not None:
+            return history
+
+        history = SessionChatHistory(self, session_id, turns)
+        history.approx_bytes = estimate_turns_bytes(history._turns)
+        with self._lock:
+            self._sessions[session_id] = weakref.ref(history)
+            self.resident_bytes += history.approx_bytes
+        weakref.finalize(history, self._forget, session_id)
+        self._update_gauges()
+        self.enforce_budget(exclude=history)
+        return history
+
+    # 세션이 방금 쓰였다고 표시합니다. 가장 최근에 쓴 세션이 목록 맨 뒤로 갑니다.
+    def touch(self, history):
+        history.last_active = time.monotonic()
+        with self._lock:
+            if history.session_id in self._sessions:
+                self._sessions.move_to_end(history.session_id)
+        if self.resident_bytes > self.memory_budget_bytes:
+            self.enforce_budget(exclude=history)
+
+    def account(self, delta_bytes):
+        with self._lock:
+            self.resident_bytes += delta_bytes
+        CHAT_SESSION_RESIDENT_BYTES.set(self.resident_bytes)
+
+    # 상주 메모리가 예산을 넘었으면, 오래 조용했던 세션부터 내려 예산의 low_watermark 비율 아래로 맞춥니다.
+    # 다른 세션이 지금 쓰고 있는(잠금이 잡힌) 기록은 건너뜁니다. 내린 세션 수를 반환합니다.
+    def enforce_budget(self, exclude=None):
+        if self.resident_bytes <= self.memory_budget_bytes:
+            return 0
+        target_bytes = self.memory_budget_bytes * self.low_watermark
+        idle_before = time.monotonic() - self.min_idle_seconds
+        with self._lock:
+            candidates = [reference() for reference in self._sessions.values()]
+
+        spilled_count = 0
+        for history in candidates:
+            if self.resident_bytes <= target_bytes:
+                break
+            if history is None or history is exclude or history.last_active > idle_before:
+                continue
+            if not history._lock.acquire(blocking=False):
+                continue
+            try:
+                if history._turns is not None and self.spill_locked(history):
+                    spilled_count += 1
+            finally:
+                history._lock.release()
+        return spilled_count
+
+    def spill_path(self, session_id):
+        if SAFE_SESSION_ID_PATTERN.match(session_id):
+            file_stem = session_id
+        else:
+            file_stem = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return self.spill_dir / f"{file_stem}{SPILL_FILE_SUFFIX}"
+
+    # 잠금을 잡은 채로 부릅니다. 기록을 파일에 쓴 뒤에만 메모리에서 놓으므로, 쓰기에 실패하면 그대로 메모리에 남습니다.
+    def spill_locked(self, history):
+        spill_path = self.spill_path(history.session_id)
+        temporary_path = spill_path.with_name(f"{spill_path.name}.tmp")
+        payload = json.dumps([turn_to_row(turn) for turn in history._turns], ensure_ascii=False, separators=(",", ":"))
+        try:
+            temporary_path.write_bytes(gzip.compress(payload.encode("utf-8")))
+            os.replace(temporary_path, spill_path)
+        except OSError as error:
+            with self._lock:
+                self.spill_errors += 1
+                self.last_error = str(error)
+            return False
+
+        file_size = spill_path.stat().st_size
+        history._turns = None
+        with self._lock:
+            self.resident_bytes -= history.approx_bytes
+            self.spilled_bytes_on_disk += file_size
+            self._spilled_file_sizes[history.session_id] = file_size
+            self.spills += 1
+        CHAT_SESSION_SPILLS_TOTAL.inc()
+        self._update_gauges()
+        return True
+
+    # 잠금을 잡은 채로 부릅니다. 내려 둔 기록을 읽어 메시지 목록으로 되살리고 파일을 지웁니다.
+    # 파일이 지워졌거나 깨졌으면 화면이 멈추지 않도록 빈 기록으로 이어 가고 오류만 남깁니다.
+    def rehydrate(self, history):
+        spill_path = self.spill_path(history.session_id)
+        try:
+            rows = json.loads(gzip.decompress(spill_path.read_bytes()).decode("utf-8"))
+            turns = [turn_from_row(row) for row in rows]
+        except (OSError, ValueError) as error:
+            turns = []
+            history.approx_bytes = estimate_turns_bytes(turns)
+            with self._lock:
+                self.spill_errors += 1
+                self.last_error = str(error)
+        spill_path.unlink(missing_ok=True)
+        with self._lock:
+            self.resident_bytes += history.approx_bytes
+            self.spilled_bytes_on_disk -= self._spilled_file_sizes.pop(history.session_id, 0)
+            self.rehydrations += 1
+        CHAT_SESSION_REHYDRATIONS_TOTAL.inc()
+        self._update_gauges()
+        return turns
+
+    # 세션 객체가 사라질 때 불립니다. 집계에서 빼고, 내려 둔 파일이 있으면 지웁니다.
+    def _forget(self, session_id):
+        with self._lock:
+            reference = self._sessions.get(session_id)
+            if reference is not None and reference() is None:
+                del self._sessions[session_id]
+            file_size = self._spilled_file_sizes.pop(session_id, None)
+        if file_size is not None:
+            with self._lock:
+                self.spilled_bytes_on_disk -= file_size
+            self.spill_path(session_id).unlink(missing_ok=True)
+        self._recount_resident_bytes()
+
+    # 사라진 세션의 크기는 finalize 시점에 알 수 없으므로, 살아 있는 세션으로 다시 셉니다.
+    def _recount_resident_bytes(self):
+        with self._lock:
+            histories = [reference() for reference in self._sessions.values()]
+            self.resident_bytes = sum(
+                history.approx_bytes for history in histories if history is not None and not history.spilled
+            )
+        self._update_gauges()
+
+    # 오래되어 돌아올 세션이 없는 파일(이전 프로세스가 남긴 것 포함)을 지웁니다.
+    def remove_stale_spill_files(self):
+        expires_before = time.time() - self.max_spill_age_seconds
+        removed_count = 0
+        for spill_path in self.spill_dir.glob(f"*{SPILL_FILE_SUFFIX}*"):
+            try:
+                if spill_path.stat().st_mtime < expires_before:
+                    spill_path.unlink()
+                    removed_count += 1
+            except OSError:
+                continue
+        return removed_count
+
+    def _update_gauges(self):
+        stats = self.stats()
+        CHAT_SESSIONS.set(stats["resident_sessions"], "resident")
+        CHAT_SESSIONS.set(stats["spilled_sessions"], "spilled")
+        CHAT_SESSION_RESIDENT_BYTES.set(stats["resident_bytes"])
+
+    # 상주/내려간 세션 수와 메모리 사용량을 반환합니다. spills가 계속 늘고 rehydrations도 따라 늘면 예산이 너무 작다는 뜻입니다.
+    def stats(self):
+        with self._lock:
+            histories = [reference() for reference in self._sessions.values()]
+            live_histories = [history for history in histories if history is not None]
+            spilled_sessions = sum(1 for history in live_histories if history.spilled)
+            return {
+                "resident_sessions": len(live_histories) - spilled_sessions,
+                "spilled_sessions": spilled_sessions,
+                "resident_bytes": self.resident_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "spilled_bytes_on_disk": self.spilled_bytes_on_disk,
+                "spills": self.spills,
+                "rehydrations": self.rehydrations,
+                "spill_errors": self.spill_errors,
+                "last_error": self.last_error,
+            }
+
+    # 프로세스가 끝날 때 내려 둔 파일을 지웁니다. 세션은 메모리에만 있으므로 다음 프로세스에서 되살릴 수 없습니다.
+    def close(self):
+        with self._lock:
+            session_ids = list(self._spilled_file_sizes)
+            self._spilled_file_sizes.clear()
+            self.spilled_bytes_on_disk = 0
+        for session_id in session_ids:
+            self.spill_path(session_id).unlink(missing_ok=True)
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+# 이 함수는 저장 폴더마다 프로세스 전체에서 관리자를 하나만 만들어 돌려줍니다.
+# Streamlit은 화면마다 스크립트를 다시 실행하므로, 관리자는 이 모듈에 붙여 두어야 한 번만 만들어집니다.
+def get_session_governor(spill_dir, **governor_options):
+    governor_key = Path(spill_dir).resolve()
+    with _governors_lock:
+        governor = _governors.get(governor_key)
+        if governor is None:
+            governor = SessionMemoryGovernor(spill_dir, **governor_options)
+            _governors[governor_key] = governor
+            atexit.register(governor.close)
+        return governor
@@ -0,0 +1,128 @@
+import sys
+
+from faq_chatbot import find_search_engine_by_version
+
+
+USER_ROLE = "user"
+ASSISTANT_ROLE = "assistant"
+# 대화 도중 FAQ가 교체되어 예전 색인이 메모리에서 내려가면, 그 색인을 가리키던 답변 대신 이 문구를 보여 줍니다.
+STALE_ANSWER = "FAQ 내용이 갱신되어 이전 답변을 다시 불러오지 못했습니다. 같은 질문을 한 번 더 입력해 주세요."
+
+
+# 이 클래스는 대화 기록의 메시지 한 개입니다.
+# FAQ 답변은 문장을 복사해 두지 않고 (색인 버전, 행 번호, 점수)만 들고 있다가, 화면에 그릴 때 공유 색인에서 꺼냅니다.
+# text는 사용자 질문, 첫 인사, 기준 점수 미달 안내처럼 FAQ 행이 아닌 문장에만 씁니다.
+class ChatTurn:
+    __slots__ = ("role", "text", "index_version", "matched_row_id", "candidate_row_ids", "candidate_scores")
+
+    def __init__(
+        self,
+        role,
+        text=None,
+        index_version=None,
+        matched_row_id=None,
+        candidate_row_ids=(),
+        candidate_scores=(),
+    ):
+        self.role = role
+        self.text = text
+        self.index_version = index_version
+        self.matched_row_id = matched_row_id
+        self.candidate_row_ids = candidate_row_ids
+        self.candidate_scores = candidate_scores
+
+    # 세션을 파일로 내리거나 다시 올릴 수 있도록 슬롯 값을 튜플로 주고받습니다.
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"ChatTurn(role={self.role!r}, matched_row_id={self.matched_row_id!r}, candidates={self.candidate_row_ids!r})"
+
+
+# 이 함수는 메시지를 JSON으로 옮길 수 있는 목록 [역할, 문장, 색인 버전, 행 번호, 후보 행 번호들, 후보 점수들]로 바꿉니다.
+def turn_to_row(turn):
+    return [
+        turn.role,
+        turn.text,
+        turn.index_version,
+        turn.matched_row_id,
+        list(turn.candidate_row_ids),
+        list(turn.candidate_scores),
+    ]
+
+
+# 이 함수는 turn_to_row의 결과로 메시지를 되살립니다. 색인 버전 문자열은 intern해서 메시지마다 따로 들고 있지 않게 합니다.
+def turn_from_row(row):
+    role, text, index_version, matched_row_id, candidate_row_ids, candidate_scores = row
+    return ChatTurn(
+        role,
+        text,
+        sys.intern(index_version) if index_version is not None else None,
+        matched_row_id,
+        tuple(candidate_row_ids),
+        tuple(candidate_scores),
+    )
+
+
+# 이 함수는 사용자가 입력한 질문으로 대화 메시지를 만듭니다.
+def user_turn(text):
+    return ChatTurn(USER_ROLE, text)
+
+
+# 이 함수는 FAQ 행이 아닌 안내 문장(첫 인사 등)으로 챗봇 메시지를 만듭니다.
+def assistant_text_turn(text):
+    return ChatTurn(ASSISTANT_ROLE, text)
+
+
+# 이 함수는 get_chatbot_response 형태의 답변에서 행 번호와 점수만 뽑아 챗봇 메시지를 만듭니다.
+# 기준 점수를 넘은 답변이면 문장을 저장하지 않고, 넘지 못했으면 안내 문장(모든 세션이 같이 쓰는 상수)만 저장합니다.
+def assistant_turn_from_response(response, candidate_limit=3):
+    top_matches = response.get("top_matches", [])[:candidate_limit]
+    matched_row_id = response.get("matched_row_id")
+    return ChatTurn(
+        ASSISTANT_ROLE,
+        text=response["answer"] if matched_row_id is None else None,
+        index_version=response.get("index_version"),
+        matched_row_id=matched_row_id,
+        candidate_row_ids=tuple(match["row_id"] for match in top_matches),
+        candidate_scores=tuple(match["similarity_score"] for match in top_matches),
+    )
+
+
+# 이 함수는 메시지가 가리키는 색인의 검색 엔진을 찾습니다. 색인이 내려갔으면 None입니다.
+def find_turn_engine(turn):
+    if turn.index_version is None:
+        return None
+    return find_search_engine_by_version(turn.index_version)
+
+
+# 이 함수는 메시지 본문을 화면에 그릴 문장으로 돌려줍니다.
+def resolve_turn_text(turn):
+    if turn.matched_row_id is None:
+        return turn.text or ""
+    engine = find_turn_engine(turn)
+    if engine is None:
+        return STALE_ANSWER
+    return engine.answers[turn.matched_row_id]
+
+
+# 이 함수는 메시지의 추천 FAQ 후보를 {"question", "answer", "similarity_score"} 목록으로 돌려줍니다.
+# 색인이 내려가 문장을 꺼낼 수 없으면 빈 목록을 돌려줘 후보 버튼만 숨깁니다.
+def resolve_turn_candidates(turn):
+    if not turn.candidate_row_ids:
+        return []
+    engine = find_turn_engine(turn)
+    if engine is None:
+        return []
+    return [
+        {
+            "question": engine.questions[row_id],
+            "answer": engine.answers[row_id],
+            "similarity_score": similarity_score,
+        }
+        for row_id, similarity_score in zip(turn.candidate_row_ids, turn.candidate_scores)
+    ]
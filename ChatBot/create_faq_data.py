@@ -1,7 +1,13 @@
+import argparse
 from pathlib import Path
 
 import pandas as pd
 
+from faq_bilingual import write_translation_alignment
+
+
+ENGLISH_CSV_PATH = Path("faq_data_english.csv")
+
 
 # 이 함수는 FAQ 데이터를 5개 카테고리, 총 50개 문답으로 구성해 리스트 형태로 반환합니다.
 # 나중에 CSV로 저장하기 쉽도록 각 항목은 {"Question": ..., "Answer": ...} 형태의 딕셔너리로 만듭니다.
@@ -231,13 +237,27 @@ def save_faq_csv(records, output_path):
 
 
 # 이 함수는 전체 실행 흐름을 담당합니다.
-# 1) FAQ 데이터 생성 -> 2) 데이터 검증 -> 3) CSV 저장 순서로 작업합니다.
+# 1) FAQ 데이터 생성 -> 2) 데이터 검증 -> 3) CSV 저장 -> 4) 영어 번역본과의 행 대응표 저장 순서로 작업합니다.
+# --alignment-only를 주면 CSV는 그대로 두고, 두 CSV를 행끼리 맞춰 고친 뒤 대응표만 다시 만듭니다.
 def main():
+    parser = argparse.ArgumentParser(description="FAQ CSV와 영어 번역본의 행 대응표를 만듭니다.")
+    parser.add_argument("--alignment-only", action="store_true", help="faq_data.csv를 새로 만들지 않고 행 대응표만 다시 만듭니다.")
+    args = parser.parse_args()
+
     output_file = Path("faq_data.csv")
-    records = build_faq_records()
-    validate_faq_records(records)
-    save_faq_csv(records, output_file)
-    print(f"총 {len(records)}개의 FAQ 데이터가 '{output_file}' 파일로 저장되었습니다.")
+    if not args.alignment_only:
+        records = build_faq_records()
+        validate_faq_records(records)
+        save_faq_csv(records, output_file)
+        print(f"총 {len(records)}개의 FAQ 데이터가 '{output_file}' 파일로 저장되었습니다.")
+
+    if ENGLISH_CSV_PATH.exists():
+        try:
+            alignment_path = write_translation_alignment(output_file, ENGLISH_CSV_PATH)
+        except ValueError as error:
+            print(f"영어 번역본과 행이 맞지 않아 대응표를 만들지 않았습니다: {error}")
+        else:
+            print(f"영어 번역본과의 행 대응표를 '{alignment_path}' 파일로 저장했습니다.")
 
 
 if __name__ == "__main__":
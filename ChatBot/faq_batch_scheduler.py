@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from faq_chatbot import (
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOP_K,
+    EXHAUSTIVE_BACKEND,
+    record_response_metrics,
+    response_cache,
+    select_top_k,
+)
+from faq_metrics import registry, stage_timer
+
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_SECONDS = 0.002
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_CLOSE_TIMEOUT_SECONDS = 5.0
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+BATCH_SIZE = registry.histogram(
+    "faq_micro_batch_size",
+    "Questions scored together in one micro-batch.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+BATCH_QUEUE_WAIT_SECONDS = registry.histogram(
+    "faq_micro_batch_queue_wait_seconds",
+    "Time a question waited in the micro-batch queue before its batch started.",
+)
+BATCH_LATENCY_SECONDS = registry.histogram(
+    "faq_micro_batch_latency_seconds",
+    "Time from submit to a resolved answer for micro-batched questions.",
+)
+
+# 스케줄러 스레드에게 "남은 요청을 모두 처리하고 끝내라"고 알리는 표시입니다.
+_STOP = object()
+
+
+# 이 클래스는 스케줄러 큐에 들어간 질문 하나입니다.
+class BatchRequest:
+    __slots__ = ("user_question", "threshold", "top_k", "engine", "cache_key", "future", "submitted_at")
+
+    def __init__(self, user_question, threshold, top_k, engine, cache_key):
+        self.user_question = user_question
+        self.threshold = threshold
+        self.top_k = top_k
+        self.engine = engine
+        self.cache_key = cache_key
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+# 이 클래스는 동시에 들어온 질문들을 잠깐 모아 한 번에 점수 매기는 마이크로 배치 스케줄러입니다.
+# 첫 질문이 들어온 뒤 max_wait초가 지나거나 max_batch_size개가 모이면, 모인 질문을 (질문 수 x 어휘 수) 행렬 하나로 바꿔
+# FAQ 행렬과 희소 행렬 곱 한 번으로 점수를 내고, 질문마다 get_chatbot_response와 같은 답변으로 Future를 완료합니다.
+# engine에는 FaqSearchEngine이나, 색인 교체를 따라가도록 호출할 때마다 현재 엔진을 돌려주는 함수를 넘길 수 있습니다.
+class MicroBatchScheduler:
+    def __init__(
+        self,
+        engine,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        max_wait=DEFAULT_MAX_WAIT_SECONDS,
+        max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+    ):
+        self.engine_source = engine if callable(engine) else (lambda: engine)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.submitted_requests = 0
+        self.cached_requests = 0
+        self.rejected_requests = 0
+        self.completed_requests = 0
+        self.failed_requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.largest_batch = 0
+        self.total_queue_wait = 0.0
+        self.total_latency = 0.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._counter_lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="faq-micro-batch", daemon=True)
+        self._thread.start()
+
+    # 질문 하나를 큐에 넣고, 답변 딕셔너리로 완료될 Future를 반환합니다.
+    # 답변 캐시에 있으면 큐를 거치지 않고 이미 완료된 Future를 돌려주고, 큐가 가득 찼으면 queue.Full을 올립니다.
+    def submit(self, user_question, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K, use_cache=True):
+        if self._closed:
+            raise RuntimeError("이미 닫힌 스케줄러입니다.")
+        started_at = time.perf_counter()
+        engine = self.engine_source()
+        cache_key = None
+        if use_cache:
+            cache_key = response_cache.make_key(user_question, threshold, top_k, EXHAUSTIVE_BACKEND)
+            cached_response = response_cache.get(engine.index_version, cache_key)
+            if cached_response is not None:
+                record_response_metrics(cached_response, started_at, cache_hit=True)
+                with self._counter_lock:
+                    self.cached_requests += 1
+                future = Future()
+                future.set_result(cached_response)
+                return future
+
+        request = BatchRequest(user_question, threshold, top_k, engine, cache_key)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            with self._counter_lock:
+                self.rejected_requests += 1
+            raise
+        with self._counter_lock:
+            self.submitted_requests += 1
+        return request.future
+
+    # submit 후 답변이 나올 때까지 기다립니다. get_chatbot_response를 그대로 바꿔 끼울 수 있는 형태입니다.
+    def respond(self, user_question, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K, use_cache=True, timeout=None):
+        return self.submit(user_question, threshold, top_k, use_cache).result(timeout)
+
+    # 첫 요청을 기다렸다가, 그 요청이 들어온 시각부터 max_wait가 지나거나 배치가 가득 찰 때까지 더 모읍니다.
+    def _run(self):
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is _STOP:
+                return
+            batch = [request]
+            deadline = request.submitted_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._process_batch(batch)
+
+    # 같은 엔진으로 들어온 요청끼리 묶어 점수를 한 번에 계산하고, 요청마다 Future를 완료합니다.
+    def _process_batch(self, batch):
+        batch_started_at = time.perf_counter()
+        live_requests = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        completed_count = 0
+        groups = {}
+        for request in live_requests:
+            groups.setdefault(id(request.engine), []).append(request)
+
+        for requests in groups.values():
+            engine = requests[0].engine
+            try:
+                score_table = engine.score_batch([request.user_question for request in requests])
+            except Exception as error:
+                for request in requests:
+                    request.future.set_exception(error)
+                with self._counter_lock:
+                    self.failed_requests += len(requests)
+                continue
+            # 요청 하나의 답변을 만들다 실패해도 그 요청의 Future에만 오류를 넘기고, 스케줄러 스레드는 계속 돌게 합니다.
+            for request, similarity_scores in zip(requests, score_table):
+                try:
+                    with stage_timer("rank"):
+                        ranked_matches = [
+                            (int(index), float(similarity_scores[index]))
+                            for index in select_top_k(similarity_scores, max(request.top_k, 1))
+                        ]
+                    response = engine.build_response(ranked_matches, threshold=request.threshold, top_k=request.top_k)
+                    if request.cache_key is not None:
+                        response_cache.put(engine.index_version, request.cache_key, response)
+                except Exception as error:
+                    request.future.set_exception(error)
+                    with self._counter_lock:
+                        self.failed_requests += 1
+                    continue
+                record_response_metrics(response, request.submitted_at, cache_hit=False if request.cache_key is not None else None)
+                request.future.set_result(response)
+                completed_count += 1
+
+        finished_at = time.perf_counter()
+        queue_wait = sum(batch_started_at - request.submitted_at for request in batch)
+        latency = sum(finished_at - request.submitted_at for request in batch)
+        BATCH_SIZE.observe(len(batch))
+        for request in batch:
+            BATCH_QUEUE_WAIT_SECONDS.observe(batch_started_at - request.submitted_at)
+            BATCH_LATENCY_SECONDS.observe(finished_at - request.submitted_at)
+        with self._counter_lock:
+            self.batches += 1
+            self.batched_requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.completed_requests += completed_count
+            self.total_queue_wait += queue_wait
+            self.total_latency += latency
+
+    # 새 요청을 더 받지 않고, 큐에 남은 요청을 모두 처리한 뒤 스케줄러 스레드를 끝냅니다.
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT_SECONDS):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # 배치 크기와 대기 시간을 조정할 수 있도록 처리 현황을 반환합니다.
+    # 평균 배치 크기가 1에 가깝다면 max_wait를 늘려도 모이는 질문이 없다는 뜻이니 창을 줄이는 편이 낫습니다.
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "submitted_requests": self.submitted_requests,
+                "cached_requests": self.cached_requests,
+                "rejected_requests": self.rejected_requests,
+                "completed_requests": self.completed_requests,
+                "failed_requests": self.failed_requests,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "mean_queue_wait_ms": self.total_queue_wait * 1000 / self.batched_requests
+                if self.batched_requests else 0.0,
+                "mean_latency_ms": self.total_latency * 1000 / self.batched_requests
+                if self.batched_requests else 0.0,
+                "queued_requests": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "closed": self._closed,
+            }
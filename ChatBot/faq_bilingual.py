@@ -0,0 +1,281 @@
+import re
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from faq_chatbot import (
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOP_K,
+    EXHAUSTIVE_BACKEND,
+    TFIDF_SCORER,
+    FaqResponseCache,
+    get_search_engine,
+    initialize_chatbot_engine,
+    load_faq_data,
+    record_response_metrics,
+)
+from faq_metrics import stage_timer
+
+
+KOREAN_LOCALE = "ko"
+ENGLISH_LOCALE = "en"
+ENGLISH_FALLBACK_ANSWER = (
+    "Sorry, we couldn't find an answer to that. "
+    "Please contact our customer center (1588-0000) or try different keywords."
+)
+# 질문 언어를 정할 때 한글 한 글자를 영문 몇 글자로 칠지 정합니다. 한글 한 음절에는 영문 두세 글자만큼의 정보가 들어 있습니다.
+HANGUL_LETTER_WEIGHT = 2
+# 번역본 CSV 옆에 두는 행 대응표의 파일 이름 끝부분입니다. 예: faq_data_english.csv -> faq_data_english.alignment.csv
+# 번역본 CSV는 웹 챗봇도 두 열(Question, Answer)로 읽으므로, 대응 정보는 별도 파일에 둡니다.
+ALIGNMENT_FILE_SUFFIX = ".alignment.csv"
+
+HANGUL_PATTERN = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]")
+LATIN_PATTERN = re.compile(r"[A-Za-z]")
+
+
+# 이 함수는 질문에 들어 있는 한글과 영문 글자 수를 세어, 검색할 언어 목록과 답변할 언어를 정합니다.
+# 한글만 있거나 글자가 없으면 한국어, 영문만 있으면 영어, 둘 다 있으면 두 색인을 모두 검색합니다.
+# 섞여 있을 때는 더 많이 쓰인 쪽 언어로 답합니다.
+def route_query_locales(user_question):
+    user_question = str(user_question)
+    hangul_count = len(HANGUL_PATTERN.findall(user_question))
+    latin_count = len(LATIN_PATTERN.findall(user_question))
+    if not latin_count:
+        return (KOREAN_LOCALE,), KOREAN_LOCALE
+    if not hangul_count:
+        return (ENGLISH_LOCALE,), ENGLISH_LOCALE
+    if hangul_count * HANGUL_LETTER_WEIGHT >= latin_count:
+        return (KOREAN_LOCALE, ENGLISH_LOCALE), KOREAN_LOCALE
+    return (KOREAN_LOCALE, ENGLISH_LOCALE), ENGLISH_LOCALE
+
+
+def alignment_path_for(csv_path):
+    return Path(csv_path).with_suffix(ALIGNMENT_FILE_SUFFIX)
+
+
+# 이 함수는 기본 언어 CSV와 번역본 CSV의 행을 지금 순서대로 짝지어, 행마다 (원문 질문, 번역 질문)을 대응표로 저장합니다.
+# 두 CSV가 행끼리 맞는 상태에서만 실행해야 합니다. load_faq_data와 같은 행만 쓰므로 색인의 행 번호와 순서가 같습니다.
+def write_translation_alignment(source_csv_path, translated_csv_path):
+    source_df = load_faq_data(source_csv_path)
+    translated_df = load_faq_data(translated_csv_path)
+    if len(source_df) != len(translated_df):
+        raise ValueError(f"두 FAQ의 행 수가 다릅니다: {len(source_df)}행과 {len(translated_df)}행")
+    alignment_path = alignment_path_for(translated_csv_path)
+    alignment_df = pd.DataFrame({"SourceQuestion": source_df["Question"], "Question": translated_df["Question"]})
+    alignment_df.to_csv(alignment_path, index=False, encoding="utf-8-sig")
+    return alignment_path
+
+
+# 이 함수는 번역본 CSV의 대응표를 읽어 (원문 질문 목록, 번역 질문 목록)을 돌려줍니다. 대응표가 없으면 None입니다.
+def load_translation_alignment(csv_path):
+    alignment_path = alignment_path_for(csv_path)
+    if not alignment_path.exists():
+        return None
+    alignment_df = pd.read_csv(alignment_path, dtype=str, keep_default_na=False)
+    return alignment_df["SourceQuestion"].tolist(), alignment_df["Question"].tolist()
+
+
+# 이 클래스는 언어별 FAQ CSV 하나를 처음 필요할 때 한 번만 읽어 (faq_df, vectorizer, question_matrix)를 돌려줍니다.
+# 영어 질문이 한 번도 들어오지 않으면 영어 색인은 끝까지 만들지 않습니다.
+# 번역본이면 alignment에 행 대응표도 함께 읽어 둡니다.
+class LazyLocaleSource:
+    def __init__(self, csv_path, use_index_cache=True, scorer=TFIDF_SCORER):
+        self.csv_path = Path(csv_path)
+        self.use_index_cache = use_index_cache
+        self.scorer = scorer
+        self.alignment = None
+        self._triple = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._triple is not None
+
+    def __call__(self):
+        if self._triple is None:
+            with self._lock:
+                if self._triple is None:
+                    self.alignment = load_translation_alignment(self.csv_path)
+                    self._triple = initialize_chatbot_engine(
+                        self.csv_path,
+                        use_index_cache=self.use_index_cache,
+                        scorer=self.scorer,
+                    )
+        return self._triple
+
+
+# 이 함수는 행 대응표의 (원문 질문, 번역 질문)이 기본 언어 색인과 번역본 색인의 질문과 행마다 같은지 확인합니다.
+def rows_match(alignment, engine, default_engine):
+    source_questions, translated_questions = alignment
+    if not len(source_questions) == len(translated_questions) == engine.row_count == default_engine.row_count:
+        return False
+    return all(
+        source_question == str(default_engine.questions[row]) and translated_question == str(engine.questions[row])
+        for row, (source_question, translated_question) in enumerate(zip(source_questions, translated_questions))
+    )
+
+
+# 이 클래스는 한국어/영어 FAQ 색인을 함께 다루는 검색 엔진입니다.
+# 번역본마다 행 대응표(원문 질문, 번역 질문)를 두며, 그 두 열이 지금 기본 언어 색인과 번역본 색인의 질문과 행마다 같을 때만
+# 한 언어로 찾은 행의 답을 다른 언어로 돌려줍니다. 맞지 않으면 언어를 섞지 않고 찾은 언어로만 답합니다.
+# sources는 {언어: (faq_df, vectorizer, question_matrix)를 돌려주는 함수}이며, 질문이 그 언어로 라우팅될 때만 호출됩니다.
+class BilingualFaqEngine:
+    def __init__(self, sources, default_locale=KOREAN_LOCALE):
+        self.sources = dict(sources)
+        self.default_locale = default_locale
+        # 응답에 "locale"이 붙으므로, 기본 언어만 쓰는 경로도 get_chatbot_response의 모듈 캐시와 나눠 경로마다 따로 둡니다.
+        self._response_caches = {}
+        self._cache_lock = threading.Lock()
+        self._alignment_by_version = {}
+
+    # 이 엔진에서 쓸 수 있는 언어 목록입니다. 영어 CSV가 없는 배포에서는 한국어만 남습니다.
+    @property
+    def locales(self):
+        return tuple(self.sources)
+
+    # 질문을 어느 색인으로 검색할지 정합니다. 색인이 없는 언어는 빼고, 남는 것이 없으면 기본 언어를 씁니다.
+    def route(self, user_question):
+        search_locales, preferred_locale = route_query_locales(user_question)
+        search_locales = tuple(locale for locale in search_locales if locale in self.sources)
+        if not search_locales:
+            search_locales = (self.default_locale,)
+        if preferred_locale not in self.sources:
+            preferred_locale = search_locales[0]
+        return search_locales, preferred_locale
+
+    # 언어 하나의 검색 엔진을 꺼냅니다. pinned_triples에 그 언어가 있으면 새로 읽지 않고 그 묶음을 씁니다.
+    def get_engine(self, locale, pinned_triples=None):
+        triple = (pinned_triples or {}).get(locale)
+        if triple is None:
+            triple = self.sources[locale]()
+        faq_df, vectorizer, question_matrix = triple
+        return get_search_engine(vectorizer, question_matrix, faq_df)
+
+    def get_response_cache(self, search_locales, answer_locale):
+        cache_key = (search_locales, answer_locale)
+        with self._cache_lock:
+            cache = self._response_caches.get(cache_key)
+            if cache is None:
+                cache = FaqResponseCache()
+                self._response_caches[cache_key] = cache
+            return cache
+
+    # 질문을 라우팅된 색인에서 검색해 (행 번호, 유사도) 상위 k개를 반환합니다.
+    # 두 언어를 모두 검색하면 같은 행끼리 더 높은 점수를 남겨 합칩니다.
+    def search(self, user_question, k=DEFAULT_TOP_K, backend=EXHAUSTIVE_BACKEND, pinned_triples=None):
+        search_locales, _ = self.route(user_question)
+        engines = {locale: self.get_engine(locale, pinned_triples) for locale in search_locales}
+        return self.search_engines(engines, user_question, k, backend)[1]
+
+    # 검색 엔진들로 검색해 (가장 높은 점수를 낸 언어, 합친 순위)를 반환합니다.
+    # 행 수가 달라 두 CSV가 행끼리 맞지 않으면 합치지 않고, 1위 점수가 더 높은 쪽 순위만 씁니다.
+    def search_engines(self, engines, user_question, k, backend):
+        rankings = {locale: engine.search(user_question, k, backend=backend) for locale, engine in engines.items()}
+        best_locale = max(rankings, key=lambda locale: rankings[locale][0][1])
+        if len(rankings) == 1 or not self.rows_aligned(engines):
+            return best_locale, rankings[best_locale]
+
+        best_scores = {}
+        for ranked_matches in rankings.values():
+            for index, similarity_score in ranked_matches:
+                if similarity_score > best_scores.get(index, -1.0):
+                    best_scores[index] = similarity_score
+        merged_matches = sorted(best_scores.items(), key=lambda match: (-match[1], match[0]))
+        return best_locale, merged_matches[:k]
+
+    # {언어: 검색 엔진}의 행끼리 같은 FAQ인지 확인합니다. 기본 언어가 아닌 색인마다 행 대응표를 두 색인의 질문과 비교합니다.
+    # 비교 결과는 두 색인 버전 쌍마다 한 번만 계산해 둡니다. 어느 쪽 CSV든 바뀌어 버전이 달라지면 다시 비교합니다.
+    def rows_aligned(self, engines, pinned_triples=None):
+        translated_locales = [locale for locale in engines if locale != self.default_locale]
+        if not translated_locales:
+            return True
+        default_engine = engines.get(self.default_locale)
+        if default_engine is None:
+            default_engine = self.get_engine(self.default_locale, pinned_triples)
+        return all(
+            self.translation_aligned(locale, engines[locale], default_engine)
+            for locale in translated_locales
+        )
+
+    def translation_aligned(self, locale, engine, default_engine):
+        alignment_key = (locale, engine.index_version, default_engine.index_version)
+        with self._cache_lock:
+            aligned = self._alignment_by_version.get(alignment_key)
+        if aligned is None:
+            alignment = getattr(self.sources[locale], "alignment", None)
+            aligned = alignment is not None and rows_match(alignment, engine, default_engine)
+            with self._cache_lock:
+                self._alignment_by_version[alignment_key] = aligned
+        return aligned
+
+    # get_chatbot_response와 같은 형태의 답변에 답변 언어("locale")를 더해 반환합니다.
+    # answer_locale을 주면(예: 화면 언어) 검색한 언어와 상관없이 같은 행의 그 언어 답변을 돌려줍니다.
+    def respond(
+        self,
+        user_question,
+        threshold=DEFAULT_THRESHOLD,
+        use_cache=True,
+        backend=EXHAUSTIVE_BACKEND,
+        answer_locale=None,
+        pinned_triples=None,
+    ):
+        started_at = time.perf_counter()
+        search_locales, preferred_locale = self.route(user_question)
+        if answer_locale not in self.sources:
+            answer_locale = preferred_locale
+        engines = {
+            locale: self.get_engine(locale, pinned_triples)
+            for locale in dict.fromkeys(search_locales + (answer_locale,))
+        }
+
+        cache = self.get_response_cache(search_locales, answer_locale)
+        index_version = "+".join(engines[locale].index_version for locale in sorted(engines))
+        cache_key = cache.make_key(user_question, threshold, DEFAULT_TOP_K, backend)
+        if use_cache:
+            with stage_timer("cache_lookup"):
+                cached_response = cache.get(index_version, cache_key)
+            if cached_response is not None:
+                record_response_metrics(cached_response, started_at, cache_hit=True)
+                return cached_response
+
+        search_engines = {locale: engines[locale] for locale in search_locales}
+        best_locale, ranked_matches = self.search_engines(
+            search_engines, user_question, max(DEFAULT_TOP_K, 1), backend
+        )
+        if not self.rows_aligned({locale: engines[locale] for locale in (answer_locale, best_locale)}, pinned_triples):
+            answer_locale = best_locale
+
+        response = engines[answer_locale].build_response(ranked_matches, threshold=threshold, top_k=DEFAULT_TOP_K)
+        if response["matched_question"] is None and answer_locale == ENGLISH_LOCALE:
+            response["answer"] = ENGLISH_FALLBACK_ANSWER
+        response["locale"] = answer_locale
+
+        if use_cache:
+            cache.put(index_version, cache_key, response)
+        record_response_metrics(response, started_at, cache_hit=False if use_cache else None)
+        return response
+
+    # 지금까지 실제로 색인을 만든 언어 목록입니다. 한국어만 쓰는 배포에서 영어 색인이 만들어지지 않았는지 확인할 때 씁니다.
+    def loaded_locales(self):
+        return tuple(
+            locale for locale, source in self.sources.items()
+            if not isinstance(source, LazyLocaleSource) or source.loaded
+        )
+
+
+# 이 함수는 한국어 CSV와, 있으면 영어 CSV로 이중 언어 검색 엔진을 만듭니다.
+# 한국어 색인은 바로 준비하고, 영어 색인은 영어 질문이 처음 들어올 때 만듭니다.
+def initialize_bilingual_engine(
+    csv_path="faq_data.csv",
+    english_csv_path="faq_data_english.csv",
+    use_index_cache=True,
+    scorer=TFIDF_SCORER,
+):
+    sources = {KOREAN_LOCALE: LazyLocaleSource(csv_path, use_index_cache=use_index_cache, scorer=scorer)}
+    if english_csv_path is not None and Path(english_csv_path).exists():
+        sources[ENGLISH_LOCALE] = LazyLocaleSource(english_csv_path, use_index_cache=use_index_cache, scorer=scorer)
+    engine = BilingualFaqEngine(sources)
+    engine.sources[KOREAN_LOCALE]()
+    return engine
@@ -1,92 +1,53 @@
-import re
-from pathlib import Path
-
+import threading
+import time
+import warnings
+import weakref
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-
-# 이 함수는 사용자가 입력한 문장과 FAQ 질문 문장을 검색하기 좋은 형태로 정리합니다.
-# 소문자 변환, 특수문자 제거, 공백 정리 등을 통해 같은 의미의 문장이 조금 다르게 입력되어도 비교가 쉬워지도록 만듭니다.
-def preprocess_text(text):
-    normalized_text = str(text).lower().strip()
-    normalized_text = re.sub(r"[^0-9a-zA-Z가-힣\s]", " ", normalized_text)
-    normalized_text = re.sub(r"\s+", " ", normalized_text)
-    return normalized_text
-
-
-# 이 함수는 한국어 문장을 단어 단위로 잘게 나누는 간단한 토큰화 역할을 합니다.
-# 전문 형태소 분석기만큼 복잡하진 않지만, 조사와 어미 일부를 정리해 핵심 단어를 비교하기 쉽게 도와줍니다.
-def tokenize_korean_text(text):
-    cleaned_text = preprocess_text(text)
-    raw_tokens = re.findall(r"[0-9a-zA-Z가-힣]+", cleaned_text)
-
-    suffixes = (
-        "입니다",
-        "합니다",
-        "해요",
-        "해도",
-        "되나요",
-        "되죠",
-        "인가요",
-        "있어요",
-        "없어요",
-        "세요",
-        "까요",
-        "나요",
-        "군요",
-        "이라",
-        "라서",
-        "에게",
-        "에서",
-        "으로",
-        "부터",
-        "까지",
-        "처럼",
-        "라도",
-        "보다",
-        "이고",
-        "이며",
-        "이면",
-        "이라",
-        "에서",
-        "에게",
-        "한테",
-        "으로",
-        "로",
-        "은",
-        "는",
-        "이",
-        "가",
-        "을",
-        "를",
-        "에",
-        "도",
-        "만",
-        "와",
-        "과",
-        "요",
-    )
-
-    processed_tokens = []
-    for token in raw_tokens:
-        stripped_token = token
-        for suffix in suffixes:
-            if stripped_token.endswith(suffix) and len(stripped_token) > len(suffix) + 1:
-                stripped_token = stripped_token[: -len(suffix)]
-                break
-
-        if len(stripped_token) >= 2:
-            processed_tokens.append(stripped_token)
-
-            # 한국어 질문은 띄어쓰기 차이의 영향을 줄이기 위해 문자 2-gram도 일부 함께 추가합니다.
-            if re.search(r"[가-힣]", stripped_token) and len(stripped_token) >= 3:
-                processed_tokens.extend(
-                    stripped_token[index : index + 2]
-                    for index in range(len(stripped_token) - 1)
-                )
-
-    return processed_tokens
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from faq_index_store import (
+    FaqRecordStore,
+    compute_file_sha256,
+    default_index_root,
+    read_index_artifact,
+    write_index_artifact,
+)
+from faq_light_engine import (
+    BM25_SCORER,
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOP_K,
+    TFIDF_SCORER,
+    FaqResponseBuilder,
+    compute_index_version,
+    run_chatbot as run_light_chatbot,
+    select_top_k,
+)
+from faq_metrics import (
+    BELOW_THRESHOLD_TOTAL,
+    CACHE_HITS_TOTAL,
+    CACHE_MISSES_TOTAL,
+    REQUEST_SECONDS,
+    REQUESTS_TOTAL,
+    stage_timer,
+)
+from faq_tokenizer import TOKENIZER_SIGNATURE, preprocess_text, tokenize_korean_text
+
+
+SEARCH_ENGINE_CACHE_SIZE = 4
+# 배치 검색에서 한 번에 만드는 (질문 수 x FAQ 수) 점수 표의 최대 칸 수입니다. float32 기준 약 16MB입니다.
+MAX_BATCH_SCORE_CELLS = 4_000_000
+RESPONSE_CACHE_MAX_ENTRIES = 2048
+RESPONSE_CACHE_TTL_SECONDS = 3600
+# 모든 FAQ 행을 점수 매기는 기본 검색 방식 이름입니다. 다른 방식은 build_retriever에서 고릅니다.
+EXHAUSTIVE_BACKEND = "exhaustive"
+BM25_K1 = 1.2
+BM25_B = 0.75
 
 
 # 이 함수는 faq_data.csv 파일을 읽고, 비어 있는 값이 없는지 점검한 뒤 데이터프레임으로 반환합니다.
@@ -101,128 +62,679 @@ def load_faq_data(csv_path):
     return faq_df
 
 
-# 이 함수는 FAQ 질문 목록을 TF-IDF 숫자 벡터로 변환할 준비를 합니다.
-# 쉽게 말해, 사람이 읽는 문장을 컴퓨터가 비교할 수 있는 숫자 표로 바꾸는 과정입니다.
-def build_vectorizer_and_matrix(questions):
-    vectorizer = TfidfVectorizer(
+# 이 함수는 챗봇이 쓰는 설정(한국어 토크나이저, 소문자 변환 없음)으로 TF-IDF 벡터라이저를 만듭니다.
+# vocabulary를 넘기면 학습 없이 저장된 어휘를 그대로 쓰는 벡터라이저가 됩니다.
+def make_vectorizer(vocabulary=None):
+    return TfidfVectorizer(
         tokenizer=tokenize_korean_text,
         token_pattern=None,
         lowercase=False,
+        vocabulary=vocabulary,
+    )
+
+
+# 이 함수는 FAQ 질문 목록을 TF-IDF 숫자 벡터로 변환할 준비를 합니다.
+# 쉽게 말해, 사람이 읽는 문장을 컴퓨터가 비교할 수 있는 숫자 표로 바꾸는 과정입니다.
+# scorer="bm25"를 넘기면 같은 토크나이저로 BM25 가중치 행렬을 만듭니다.
+def build_vectorizer_and_matrix(questions, scorer=TFIDF_SCORER):
+    return get_scorer(scorer).fit(questions)
+
+
+# 이 클래스는 BM25 점수를 희소 행렬 곱 한 번으로 계산할 수 있게 만드는 벡터라이저입니다.
+# FAQ 쪽 행렬에는 문서 길이로 보정한 단어 빈도 포화 값 tf*(k1+1)/(tf+k1*(1-b+b*문서길이/평균길이))를 미리 넣어 둡니다.
+# 질문 쪽 벡터에는 질문에 나온 단어의 IDF를 넣고, 모든 단어가 최대로 맞았을 때 1이 되도록 나눠 점수를 0~1 사이로 맞춥니다.
+# 질문은 짧아서 같은 단어가 반복되는 일이 드물므로, 질문 안의 단어 빈도는 세지 않고 있다/없다만 봅니다.
+class Bm25Vectorizer:
+    def __init__(self, k1=BM25_K1, b=BM25_B, vocabulary=None):
+        self.k1 = k1
+        self.b = b
+        self.count_vectorizer = CountVectorizer(
+            tokenizer=tokenize_korean_text,
+            token_pattern=None,
+            lowercase=False,
+            vocabulary=vocabulary,
+        )
+        self.idf_ = None
+
+    @property
+    def vocabulary_(self):
+        return self.count_vectorizer.vocabulary_
+
+    @property
+    def vocabulary(self):
+        return self.count_vectorizer.vocabulary
+
+    def get_feature_names_out(self):
+        return self.count_vectorizer.get_feature_names_out()
+
+    # FAQ 질문 목록으로 어휘와 IDF를 학습하고, 문서 길이 보정까지 끝난 BM25 문서 행렬을 반환합니다.
+    def fit_transform(self, questions):
+        counts = sparse.csr_matrix(self.count_vectorizer.fit_transform(questions), dtype=np.float64)
+        document_count = counts.shape[0]
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        self.idf_ = np.log1p((document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        document_lengths = np.asarray(counts.sum(axis=1)).ravel()
+        average_length = document_lengths.mean() if document_count else 0.0
+        length_norms = self.k1 * (1 - self.b + self.b * document_lengths / (average_length or 1.0))
+        entry_norms = np.repeat(length_norms, np.diff(counts.indptr))
+        counts.data = counts.data * (self.k1 + 1) / (counts.data + entry_norms)
+        return counts
+
+    # 질문 목록을 (질문 수 x 어휘 수) 질문 가중치 행렬로 바꿉니다. FAQ 행렬과 곱하면 바로 BM25 점수가 됩니다.
+    def transform(self, user_questions):
+        return self.weight_queries(sparse.csr_matrix(self.count_vectorizer.transform(user_questions), dtype=np.float32))
+
+    # 질문 단어 빈도 행렬(float32 CSR)을 제자리에서 BM25 질문 가중치 행렬로 바꿉니다.
+    def weight_queries(self, query_matrix):
+        query_matrix.data = self.idf_[query_matrix.indices].astype(np.float32)
+        return divide_rows(query_matrix, sum_rows(query_matrix, query_matrix.data) * (self.k1 + 1))
+
+
+# 이 함수는 토큰화가 끝난 질문 목록을 (질문 수 x 어휘 수) 단어 빈도 행렬(float32 CSR)로 만듭니다.
+# 어휘에 없는 토큰은 버립니다. CSR 배열을 직접 채워 행렬을 한 번만 만들므로, 질문 하나든 수천 개든 가볍습니다.
+def count_token_lists(vocabulary, token_lists):
+    indptr = [0]
+    indices = []
+    data = []
+    for tokens in token_lists:
+        term_counts = {}
+        for token in tokens:
+            column_id = vocabulary.get(token)
+            if column_id is not None:
+                term_counts[column_id] = term_counts.get(column_id, 0) + 1
+        for column_id in sorted(term_counts):
+            indices.append(column_id)
+            data.append(term_counts[column_id])
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (
+            np.array(data, dtype=np.float32),
+            np.array(indices, dtype=np.int32),
+            np.array(indptr, dtype=np.int32),
+        ),
+        shape=(len(token_lists), len(vocabulary)),
+    )
+
+
+# 이 함수는 CSR 행렬의 저장 값 위치마다 주어진 values를 행별로 더합니다. 빈 행의 합은 0입니다.
+def sum_rows(matrix, values):
+    row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return np.bincount(row_ids, weights=values, minlength=matrix.shape[0])
+
+
+# 이 함수는 CSR 행렬의 각 행을 row_scales의 같은 위치 값으로 제자리에서 나눕니다. 0인 값은 1로 바꿔 빈 행을 그대로 둡니다.
+def divide_rows(matrix, row_scales):
+    row_scales = np.asarray(row_scales, dtype=np.float32)
+    row_scales[row_scales == 0] = 1.0
+    matrix.data /= np.repeat(row_scales, np.diff(matrix.indptr))
+    return matrix
+
+
+# 이 함수는 벡터라이저의 단어 -> 열 번호 사전을 반환합니다.
+# 저장 색인에서 만든 벡터라이저는 첫 transform 전까지 vocabulary_가 없으므로, 생성할 때 넘긴 어휘를 대신 씁니다.
+def get_vocabulary(vectorizer):
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    return vocabulary if vocabulary is not None else vectorizer.vocabulary
+
+
+# 이 클래스는 기본 점수 방식인 TF-IDF 코사인 유사도입니다.
+# 점수 방식은 학습(fit), 저장 색인에서 벡터라이저 복원(make_vectorizer), FAQ 행렬 준비(prepare_matrix),
+# 질문 벡터 변환(transform_queries)을 제공하고, 검색 엔진은 두 행렬을 곱하기만 합니다.
+# transform_tokens는 이미 토큰화한 질문 목록을 같은 행렬로 바꿉니다. 검색 엔진이 토큰화와 벡터화 시간을 따로 재는 데 씁니다.
+class TfidfCosineScorer:
+    name = TFIDF_SCORER
+
+    @property
+    def params(self):
+        return {}
+
+    def make_vectorizer(self, vocabulary=None):
+        return make_vectorizer(vocabulary)
+
+    def fit(self, questions):
+        vectorizer = self.make_vectorizer()
+        return vectorizer, vectorizer.fit_transform(questions)
+
+    def prepare_matrix(self, question_matrix):
+        return prepare_question_matrix(question_matrix)
+
+    def transform_queries(self, vectorizer, user_questions):
+        query_matrix = sparse.csr_matrix(vectorizer.transform(list(user_questions)), dtype=np.float32)
+        return normalize(query_matrix, norm="l2", copy=False)
+
+    # vectorizer.transform과 같은 값(단어 빈도 x IDF, L2 정규화)을 sklearn 분석기를 거치지 않고 만듭니다.
+    def transform_tokens(self, vectorizer, token_lists):
+        query_matrix = count_token_lists(get_vocabulary(vectorizer), token_lists)
+        query_matrix.data *= vectorizer.idf_[query_matrix.indices].astype(np.float32)
+        return divide_rows(query_matrix, np.sqrt(sum_rows(query_matrix, query_matrix.data * query_matrix.data)))
+
+
+# 이 클래스는 BM25 점수 방식입니다. 문서 쪽 포화 값은 학습할 때 이미 계산되어 있으므로, 행렬을 정규화하지 않고 그대로 씁니다.
+class Bm25Scorer:
+    name = BM25_SCORER
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+
+    @property
+    def params(self):
+        return {"k1": self.k1, "b": self.b}
+
+    def make_vectorizer(self, vocabulary=None):
+        return Bm25Vectorizer(k1=self.k1, b=self.b, vocabulary=vocabulary)
+
+    def fit(self, questions):
+        vectorizer = self.make_vectorizer()
+        return vectorizer, vectorizer.fit_transform(questions)
+
+    def prepare_matrix(self, question_matrix):
+        return sparse.csr_matrix(question_matrix, dtype=np.float32)
+
+    def transform_queries(self, vectorizer, user_questions):
+        return vectorizer.transform(list(user_questions))
+
+    # Bm25Vectorizer.transform과 같은 값(나온 단어의 IDF / 전체 합 x (k1+1))을 토큰 목록에서 바로 만듭니다.
+    def transform_tokens(self, vectorizer, token_lists):
+        return vectorizer.weight_queries(count_token_lists(get_vocabulary(vectorizer), token_lists))
+
+
+SCORERS = {
+    TFIDF_SCORER: TfidfCosineScorer,
+    BM25_SCORER: Bm25Scorer,
+}
+
+
+# 이 함수는 점수 방식 이름(또는 이미 만든 점수 방식 객체)을 점수 방식 객체로 바꿉니다.
+def get_scorer(scorer=TFIDF_SCORER):
+    if not isinstance(scorer, str):
+        return scorer
+    scorer_class = SCORERS.get(scorer)
+    if scorer_class is None:
+        raise ValueError(f"알 수 없는 점수 방식입니다: {scorer}")
+    return scorer_class()
+
+
+# 이 함수는 학습된 벡터라이저가 어떤 점수 방식으로 만들어졌는지 알려 줍니다.
+# 기존 함수들은 (vectorizer, question_matrix)만 주고받으므로, 검색 엔진은 벡터라이저로 점수 방식을 고릅니다.
+def scorer_for_vectorizer(vectorizer):
+    if isinstance(vectorizer, Bm25Vectorizer):
+        return Bm25Scorer(k1=vectorizer.k1, b=vectorizer.b)
+    return TfidfCosineScorer()
+
+
+# 이 함수는 학습된 벡터라이저와 질문 행렬, FAQ 데이터를 CSV 옆 색인 폴더에 저장합니다.
+# sklearn 객체를 pickle하지 않고 어휘, IDF, CSR 배열, 질문/답변 열만 파일로 남깁니다.
+def save_chatbot_index(csv_path, csv_sha256, faq_df, vectorizer, question_matrix, index_root=None):
+    scorer = scorer_for_vectorizer(vectorizer)
+    prepared_matrix = scorer.prepare_matrix(question_matrix)
+    questions = faq_df["Question"].tolist()
+    answers = faq_df["Answer"].tolist()
+    return write_index_artifact(
+        index_root or default_index_root(csv_path),
+        csv_sha256=csv_sha256,
+        tokenizer_signature=TOKENIZER_SIGNATURE,
+        vocabulary_terms=vectorizer.get_feature_names_out().tolist(),
+        idf=vectorizer.idf_,
+        question_matrix=prepared_matrix,
+        questions=questions,
+        answers=answers,
+        scorer_name=scorer.name,
+        scorer_params=scorer.params,
+        index_version=compute_index_version(questions, answers, scorer),
+    )
+
+
+# 이 함수는 CSV 해시가 맞는 저장 색인이 있으면 읽어서 (faq_df, vectorizer, question_matrix)를 만들고, 없으면 None을 반환합니다.
+# 행렬은 메모리 매핑된 배열을 복사 없이 감싸므로, 다시 학습하는 것보다 훨씬 빨리 준비됩니다.
+# faq_df 자리에는 데이터프레임 대신 메모리 매핑된 FaqRecordStore가 들어가, 답변 본문은 실제로 보여 줄 때만 읽힙니다.
+def load_chatbot_index(csv_path, csv_sha256, index_root=None, scorer=TFIDF_SCORER):
+    scorer = get_scorer(scorer)
+    artifact = read_index_artifact(
+        index_root or default_index_root(csv_path),
+        csv_sha256=csv_sha256,
+        tokenizer_signature=TOKENIZER_SIGNATURE,
+        scorer_name=scorer.name,
+        scorer_params=scorer.params,
+    )
+    if artifact is None:
+        return None
+
+    vectorizer = scorer.make_vectorizer(
+        vocabulary={term: column for column, term in enumerate(artifact.vocabulary_terms)}
+    )
+    vectorizer.idf_ = np.asarray(artifact.idf)
+    question_matrix = sparse.csr_matrix(
+        (artifact.data, artifact.indices, artifact.indptr),
+        shape=artifact.shape,
+        copy=False,
     )
-    question_matrix = vectorizer.fit_transform(questions)
-    return vectorizer, question_matrix
+    return artifact.records, vectorizer, question_matrix
 
 
 # 이 함수는 FAQ CSV를 읽고 챗봇 검색에 필요한 모든 준비를 한 번에 끝냅니다.
 # 웹 화면, 콘솔 화면처럼 여러 실행 방식에서 같은 초기화 코드를 반복하지 않도록 도와줍니다.
-def initialize_chatbot_engine(csv_path="faq_data.csv"):
-    faq_df = load_faq_data(csv_path)
-    vectorizer, question_matrix = build_vectorizer_and_matrix(faq_df["Question"].tolist())
+# 저장된 색인이 CSV 내용과 맞으면 그대로 불러오고, CSV가 바뀌었을 때만 다시 학습해 색인을 새로 저장합니다.
+# scorer로 점수 방식("tfidf" 또는 "bm25")을 고릅니다. 점수 방식마다 색인을 따로 저장합니다.
+def initialize_chatbot_engine(csv_path="faq_data.csv", use_index_cache=True, index_root=None, scorer=TFIDF_SCORER):
+    loaded_index = None
+    if use_index_cache:
+        csv_sha256 = compute_file_sha256(csv_path)
+        loaded_index = load_chatbot_index(csv_path, csv_sha256, index_root=index_root, scorer=scorer)
+
+    if loaded_index is not None:
+        faq_df, vectorizer, question_matrix = loaded_index
+    else:
+        faq_df = load_faq_data(csv_path)
+        vectorizer, question_matrix = build_vectorizer_and_matrix(faq_df["Question"].tolist(), scorer=scorer)
+        if use_index_cache:
+            try:
+                save_chatbot_index(csv_path, csv_sha256, faq_df, vectorizer, question_matrix, index_root=index_root)
+            except OSError as error:
+                warnings.warn(f"FAQ 색인을 저장하지 못해 다음 실행에서도 다시 학습합니다: {error}")
+            else:
+                # 방금 저장한 색인을 다시 열어, 처음 학습한 실행에서도 데이터프레임 대신 메모리 매핑된 기록 저장소로 답합니다.
+                loaded_index = load_chatbot_index(csv_path, csv_sha256, index_root=index_root, scorer=scorer)
+                if loaded_index is not None:
+                    faq_df, vectorizer, question_matrix = loaded_index
+
+    # 첫 질문이 검색 엔진 준비 비용까지 떠안지 않도록 여기에서 미리 만들어 둡니다.
+    get_search_engine(vectorizer, question_matrix, faq_df)
     return faq_df, vectorizer, question_matrix
 
 
-# 이 함수는 사용자의 질문과 FAQ 질문들 사이의 유사도를 계산해
-# 가장 비슷한 질문의 인덱스와 점수를 반환합니다.
-def find_best_match(user_question, vectorizer, question_matrix):
-    user_vector = vectorizer.transform([user_question])
-    similarity_scores = cosine_similarity(user_vector, question_matrix).flatten()
+# 이 함수는 질문 행렬을 검색 엔진이 쓰는 형태(float32 CSR, 행마다 L2 정규화)로 맞춥니다.
+# 행이 정규화되어 있으면 코사인 유사도가 단순한 희소 행렬 곱셈과 같아집니다.
+# 저장 색인처럼 이미 정규화된 float32 행렬은 복사하지 않고 그대로 씁니다(메모리 매핑된 읽기 전용 배열 포함).
+def prepare_question_matrix(question_matrix):
+    prepared_matrix = sparse.csr_matrix(question_matrix, dtype=np.float32)
+    row_norms = np.sqrt(np.asarray(prepared_matrix.multiply(prepared_matrix).sum(axis=1)).ravel())
+    if np.allclose(row_norms[row_norms > 0], 1.0, atol=1e-4):
+        return prepared_matrix
+    return normalize(prepared_matrix, norm="l2", copy=True)
+
+
+# 이 클래스는 벡터라이저, 정규화된 질문 행렬, FAQ 질문/답변 목록을 한곳에 묶어 둔 검색 엔진입니다.
+# 질문 하나당 토큰화와 점수 계산을 한 번만 하도록 만들어, 기존 함수들은 이 객체를 감싸기만 합니다.
+# 점수 방식(TF-IDF 코사인, BM25)은 벡터라이저로 정해지며, 어느 방식이든 점수는 희소 행렬 곱 한 번입니다.
+class FaqSearchEngine(FaqResponseBuilder):
+    def __init__(self, vectorizer, question_matrix, faq_df=None):
+        self.vectorizer = vectorizer
+        self.scorer = scorer_for_vectorizer(vectorizer)
+        # 원본 행렬을 함께 들고 있어야 get_search_engine의 id 기반 캐시가 안전하게 유지됩니다.
+        self.source_matrix = question_matrix
+        self.question_matrix = self.scorer.prepare_matrix(question_matrix)
+        self.faq_df = None
+        self.questions = None
+        self.answers = None
+        self.index_version = None
+        self._transposed_matrix = None
+        self._retrievers = {}
+        self._retriever_lock = threading.Lock()
+        if faq_df is not None:
+            self.attach_rows(faq_df)
+
+    @property
+    def row_count(self):
+        return self.question_matrix.shape[0]
+
+    # FAQ 데이터를 연결합니다. 저장 색인에서 연 FaqRecordStore는 메모리 매핑된 열과 저장해 둔 색인 버전을 그대로 쓰고,
+    # 데이터프레임은 질문/답변을 파이썬 리스트로 옮겨 두어 검색 결과를 .loc 없이 바로 꺼냅니다.
+    def attach_rows(self, faq_df):
+        if isinstance(faq_df, FaqRecordStore):
+            self.attach_records(faq_df.questions, faq_df.answers, index_version=faq_df.index_version)
+        else:
+            self.attach_records(faq_df["Question"].tolist(), faq_df["Answer"].tolist())
+        self.faq_df = faq_df
+
+    # 질문/답변 목록을 직접 연결합니다. 리스트가 아니어도 번호로 꺼낼 수 있는 목록이면 됩니다(예: 공유 메모리의 문자열 열).
+    # 색인 버전을 이미 알고 있으면 넘겨서 전체 질문/답변을 다시 훑지 않게 합니다.
+    def attach_records(self, questions, answers, index_version=None):
+        if len(questions) != self.row_count or len(answers) != self.row_count:
+            raise ValueError("FAQ 데이터 행 수와 질문 행렬의 행 수가 다릅니다.")
+        self.faq_df = None
+        self.questions = questions
+        self.answers = answers
+        self.index_version = index_version or compute_index_version(questions, answers, self.scorer)
+        _search_engines_by_version[self.index_version] = self
+
+    # 사용자 질문 하나를 점수 방식에 맞는 희소 벡터(1 x 어휘 수)로 바꿉니다. TF-IDF는 L2 정규화된 벡터입니다.
+    # 토큰화와 벡터화를 나눠 실행해, 각 단계 시간을 faq_stage_seconds에 따로 남깁니다.
+    def transform_query(self, user_question):
+        with stage_timer("tokenize"):
+            tokens = tokenize_korean_text(user_question)
+        with stage_timer("vectorize"):
+            return self.scorer.transform_tokens(self.vectorizer, [tokens])
+
+    # 사용자 질문 하나를 벡터로 바꾼 뒤, 모든 FAQ와의 유사도(기본은 코사인 유사도) 배열을 반환합니다.
+    def score(self, user_question):
+        user_vector = self.transform_query(user_question)
+        with stage_timer("score"):
+            dense_query = np.zeros(self.question_matrix.shape[1], dtype=np.float32)
+            dense_query[user_vector.indices] = user_vector.data
+            return self.question_matrix.dot(dense_query)
+
+    # 검색 방식 이름에 맞는 검색기를 처음 쓸 때 한 번만 만들어 둡니다.
+    def get_retriever(self, backend):
+        with self._retriever_lock:
+            retriever = self._retrievers.get(backend)
+            if retriever is None:
+                retriever = build_retriever(backend, self.question_matrix)
+                self._retrievers[backend] = retriever
+            return retriever
+
+    # 설정을 바꾼 검색기를 직접 끼워 넣을 때 사용합니다.
+    def set_retriever(self, backend, retriever):
+        with self._retriever_lock:
+            self._retrievers[backend] = retriever
+
+    # 여러 질문을 한 번에 (질문 수 x 어휘 수) 질문 행렬로 바꿉니다. 행마다 transform_query와 같은 벡터입니다.
+    def transform_query_batch(self, user_questions):
+        with stage_timer("tokenize"):
+            token_lists = [tokenize_korean_text(user_question) for user_question in user_questions]
+        with stage_timer("vectorize"):
+            return self.scorer.transform_tokens(self.vectorizer, token_lists)
+
+    # 질문 행렬과 FAQ 행렬을 희소 행렬 곱 한 번으로 곱해 (질문 수 x FAQ 수) 유사도 표를 만듭니다.
+    def score_query_matrix(self, query_matrix):
+        if self._transposed_matrix is None:
+            self._transposed_matrix = self.question_matrix.T.tocsr()
+        with stage_timer("score"):
+            return (query_matrix @ self._transposed_matrix).toarray()
+
+    # 여러 질문을 한 번에 벡터로 바꾼 뒤, (질문 수 x FAQ 수) 유사도 표를 희소 행렬 곱 한 번으로 계산합니다.
+    def score_batch(self, user_questions):
+        return self.score_query_matrix(self.transform_query_batch(list(user_questions)))
+
+    # 배치 한 번에 넣을 질문 수를 정합니다. 점수 표 크기가 MAX_BATCH_SCORE_CELLS를 넘지 않게 합니다.
+    def default_chunk_size(self):
+        return max(1, min(1024, MAX_BATCH_SCORE_CELLS // max(self.row_count, 1)))
+
+    # 질문 목록을 chunk_size씩 나눠 처리하면서, 질문마다 search와 같은 형태의 결과를 순서대로 내보냅니다.
+    # 제너레이터라서 하루치 로그처럼 큰 입력도 점수 표 한 덩어리 크기의 메모리만 사용합니다.
+    def iter_search_batch(self, user_questions, k=DEFAULT_TOP_K, chunk_size=None):
+        chunk_size = chunk_size or self.default_chunk_size()
+        question_iterator = iter(user_questions)
+        while True:
+            question_chunk = list(islice(question_iterator, chunk_size))
+            if not question_chunk:
+                return
+            score_table = self.score_batch(question_chunk)
+            for similarity_scores in score_table:
+                yield [
+                    (int(index), float(similarity_scores[index]))
+                    for index in select_top_k(similarity_scores, k)
+                ]
+
+    # 질문 하나에 대해 (FAQ 행 번호, 유사도) 쌍을 유사도가 높은 순서로 최대 k개 반환합니다.
+    # backend를 바꾸면 전체 행을 다 점수 매기지 않는 검색기로 검색합니다.
+    # "inverted"는 같은 결과를, "lsh"는 후보만 다시 점수 매기는 근사 결과를 돌려줍니다.
+    def search(self, user_question, k=DEFAULT_TOP_K, backend=EXHAUSTIVE_BACKEND):
+        if backend != EXHAUSTIVE_BACKEND:
+            user_vector = self.transform_query(user_question)
+            with stage_timer("retrieve"):
+                return self.get_retriever(backend).top_k(user_vector.indices, user_vector.data, k)
+
+        similarity_scores = self.score(user_question)
+        with stage_timer("rank"):
+            return [
+                (int(index), float(similarity_scores[index]))
+                for index in select_top_k(similarity_scores, k)
+            ]
+
+    # get_chatbot_response와 같은 형태의 답변을 검색 한 번으로 만듭니다.
+    def respond(self, user_question, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K, backend=EXHAUSTIVE_BACKEND):
+        ranked_matches = self.search(user_question, max(top_k, 1), backend=backend)
+        return self.build_response(ranked_matches, threshold=threshold, top_k=top_k)
+
+    # respond의 배치 버전입니다. 질문 순서대로 get_chatbot_response와 같은 형태의 답변을 내보냅니다.
+    def iter_respond_batch(self, user_questions, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K, chunk_size=None):
+        for ranked_matches in self.iter_search_batch(user_questions, max(top_k, 1), chunk_size):
+            yield self.build_response(ranked_matches, threshold=threshold, top_k=top_k)
+
+
+# 이 함수는 검색 방식 이름으로 검색기를 만듭니다. 해당 모듈은 실제로 그 방식을 쓸 때만 불러옵니다.
+# 검색기는 top_k(질문 단어 번호 배열, 질문 가중치 배열, k)로 (행 번호, 유사도) 목록을 돌려주면 됩니다.
+def build_retriever(backend, question_matrix):
+    if backend == "inverted":
+        from faq_inverted_index import InvertedFaqIndex
+
+        return InvertedFaqIndex(question_matrix)
+    if backend == "lsh":
+        from faq_lsh_index import LshFaqIndex
+
+        return LshFaqIndex(question_matrix)
+    raise ValueError(f"알 수 없는 검색 방식입니다: {backend}")
+
+
+# 이 클래스는 get_chatbot_response 결과를 담아 두는 크기 제한(LRU) + 유효 시간(TTL) 캐시입니다.
+# 빠른 질문 버튼처럼 같은 문장이 반복될 때 토큰화와 유사도 계산을 건너뜁니다.
+# 항목 키에 색인 버전이 들어가므로, 버전이 다른 엔진 여러 개가 캐시를 같이 써도 서로의 항목을 지우지 않습니다.
+# 교체된 색인의 항목은 더 조회되지 않으므로 LRU 축출이나 TTL 만료로 자연히 빠집니다.
+class FaqResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # 캐시 키는 preprocess_text로 정리한 질문입니다. 정리 결과가 같으면 토큰도 같으므로 답변이 달라지지 않습니다.
+    @staticmethod
+    def make_key(user_question, threshold, top_k, backend=EXHAUSTIVE_BACKEND):
+        return preprocess_text(user_question).strip(), float(threshold), int(top_k), backend
+
+    def get(self, index_version, cache_key):
+        entry_key = (index_version, cache_key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._entries[entry_key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+        return copy_response(response)
+
+    def put(self, index_version, cache_key, response):
+        if self.max_entries <= 0:
+            return
+        stored_response = copy_response(response)
+        entry_key = (index_version, cache_key)
+        with self._lock:
+            self._entries[entry_key] = (time.monotonic() + self.ttl_seconds, stored_response)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # 실제 트래픽에서 캐시 크기를 정할 수 있도록 적중/실패/축출 횟수와 현재 크기를 반환합니다.
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "index_versions": len({index_version for index_version, _ in self._entries}),
+            }
 
-    best_match_index = similarity_scores.argmax()
-    best_match_score = float(similarity_scores[best_match_index])
-    return best_match_index, best_match_score
 
+# 이 함수는 답변 딕셔너리를 후보 목록까지 복사합니다.
+# 캐시에 들어 있는 원본을 호출한 쪽에서 고쳐도 다음 사용자에게 영향이 가지 않게 합니다.
+def copy_response(response):
+    copied_response = dict(response)
+    copied_response["top_matches"] = [dict(match) for match in response["top_matches"]]
+    return copied_response
 
-# 이 함수는 사용자의 질문과 가장 비슷한 FAQ 후보 여러 개를 유사도 순으로 반환합니다.
-# 웹 화면에서 "비슷한 질문 더 보기" 기능을 만들 때 활용할 수 있습니다.
-def find_top_matches(user_question, faq_df, vectorizer, question_matrix, top_k=3):
-    user_vector = vectorizer.transform([user_question])
-    similarity_scores = cosine_similarity(user_vector, question_matrix).flatten()
-
-    sorted_indices = similarity_scores.argsort()[::-1][:top_k]
-    top_matches = []
-    for index in sorted_indices:
-        top_matches.append(
-            {
-                "question": faq_df.loc[index, "Question"],
-                "answer": faq_df.loc[index, "Answer"],
-                "similarity_score": float(similarity_scores[index]),
-            }
-        )
 
-    return top_matches
+response_cache = FaqResponseCache()
 
 
-# 이 함수는 실제 챗봇 답변을 만드는 핵심 함수입니다.
-# 가장 유사한 FAQ를 찾고, 유사도가 기준보다 낮으면 안내 문구를 반환합니다.
-def get_chatbot_response(user_question, faq_df, vectorizer, question_matrix, threshold=0.2):
-    top_matches = find_top_matches(
-        user_question=user_question,
-        faq_df=faq_df,
-        vectorizer=vectorizer,
-        question_matrix=question_matrix,
-        top_k=3,
-    )
-    best_match_index, best_match_score = find_best_match(
-        user_question=user_question,
-        vectorizer=vectorizer,
-        question_matrix=question_matrix,
-    )
+# 이 함수는 get_chatbot_response 앞단 캐시의 현재 통계를 반환합니다.
+def get_response_cache_stats():
+    return response_cache.stats()
 
-    if best_match_score < threshold:
-        return {
-            "matched_question": None,
-            "similarity_score": best_match_score,
-            "top_matches": top_matches,
-            "answer": "죄송합니다. 해당 내용은 고객센터(1588-0000)로 문의해 주시거나 다른 검색어를 입력해 주세요.",
-        }
 
-    return {
-        "matched_question": faq_df.loc[best_match_index, "Question"],
-        "similarity_score": best_match_score,
-        "top_matches": top_matches,
-        "answer": faq_df.loc[best_match_index, "Answer"],
-    }
+_search_engine_cache = OrderedDict()
+_search_engine_cache_lock = threading.Lock()
+# 색인 버전으로 엔진을 다시 찾기 위한 표입니다. 약한 참조라서 이 표 때문에 교체된 색인이 메모리에 남지는 않습니다.
+_search_engines_by_version = weakref.WeakValueDictionary()
 
 
-# 이 함수는 프로그램을 실행했을 때 사용자가 직접 질문을 입력하고 답변을 받도록 만드는 대화 루프입니다.
-# exit, quit, 종료 중 하나를 입력하면 프로그램을 끝냅니다.
-def run_chatbot():
-    csv_path = Path("faq_data.csv")
-    if not csv_path.exists():
-        raise FileNotFoundError(
-            "faq_data.csv 파일이 없습니다. 먼저 create_faq_data.py를 실행해 FAQ 데이터를 생성해 주세요."
-        )
+# 이 함수는 (vectorizer, question_matrix) 조합마다 검색 엔진을 한 번만 만들고 재사용합니다.
+# 기존 함수들이 같은 인자를 계속 넘겨도 행렬 정규화 같은 준비 작업이 반복되지 않습니다.
+def get_search_engine(vectorizer, question_matrix, faq_df=None):
+    cache_key = (id(vectorizer), id(question_matrix))
+    with _search_engine_cache_lock:
+        engine = _search_engine_cache.get(cache_key)
+        if engine is not None:
+            _search_engine_cache.move_to_end(cache_key)
+
+    if engine is None:
+        engine = FaqSearchEngine(vectorizer, question_matrix)
+        with _search_engine_cache_lock:
+            _search_engine_cache[cache_key] = engine
+            while len(_search_engine_cache) > SEARCH_ENGINE_CACHE_SIZE:
+                _search_engine_cache.popitem(last=False)
 
-    faq_df, vectorizer, question_matrix = initialize_chatbot_engine(csv_path)
+    if faq_df is not None and engine.faq_df is not faq_df:
+        engine.attach_rows(faq_df)
+    return engine
 
-    print("가이드매칭 Support FAQ 챗봇입니다.")
-    print("질문을 입력해 주세요. 종료하려면 'exit', 'quit', '종료' 중 하나를 입력하세요.\n")
 
-    while True:
-        user_question = input("사용자 질문: ").strip()
+# 이 함수는 이미 질문/답변을 연결해 둔 검색 엔진을 get_search_engine 캐시에 넣습니다.
+# 공유 메모리 색인처럼 데이터프레임 없이 만든 엔진도 faq_df=None으로 기존 함수들을 그대로 쓸 수 있게 합니다.
+def register_search_engine(engine):
+    cache_key = (id(engine.vectorizer), id(engine.source_matrix))
+    with _search_engine_cache_lock:
+        _search_engine_cache[cache_key] = engine
+        _search_engine_cache.move_to_end(cache_key)
+        while len(_search_engine_cache) > SEARCH_ENGINE_CACHE_SIZE:
+            _search_engine_cache.popitem(last=False)
+    return engine
 
-        if user_question.lower() in {"exit", "quit", "종료"}:
-            print("챗봇을 종료합니다.")
-            break
 
-        if not user_question:
-            print("질문이 비어 있습니다. 내용을 입력해 주세요.\n")
-            continue
+# 이 함수는 색인 버전에 해당하는 검색 엔진을 찾아 반환합니다. 그 색인이 이미 교체되어 메모리에서 내려갔으면 None입니다.
+# 대화 기록처럼 행 번호만 들고 있다가, 화면에 그릴 때 질문/답변 문장을 꺼내는 곳에서 씁니다.
+def find_search_engine_by_version(index_version):
+    return _search_engines_by_version.get(index_version)
 
-        response = get_chatbot_response(
-            user_question=user_question,
-            faq_df=faq_df,
-            vectorizer=vectorizer,
-            question_matrix=question_matrix,
+
+# 이 함수는 사용자의 질문과 FAQ 질문들 사이의 유사도를 계산해
+# 가장 비슷한 질문의 인덱스와 점수를 반환합니다.
+def find_best_match(user_question, vectorizer, question_matrix, backend=EXHAUSTIVE_BACKEND):
+    engine = get_search_engine(vectorizer, question_matrix)
+    return engine.search(user_question, 1, backend=backend)[0]
+
+
+# 이 함수는 사용자의 질문과 가장 비슷한 FAQ 후보 여러 개를 유사도 순으로 반환합니다.
+# 웹 화면에서 "비슷한 질문 더 보기" 기능을 만들 때 활용할 수 있습니다.
+# backend로 검색 방식을 고를 수 있습니다. 기본값은 모든 행을 점수 매기는 방식이고,
+# FAQ가 아주 많을 때는 backend="lsh"로 약간의 정확도를 내주고 지연 시간 상한을 얻을 수 있습니다.
+def find_top_matches(
+    user_question,
+    faq_df,
+    vectorizer,
+    question_matrix,
+    top_k=DEFAULT_TOP_K,
+    backend=EXHAUSTIVE_BACKEND,
+):
+    engine = get_search_engine(vectorizer, question_matrix, faq_df)
+    return engine.build_top_matches(engine.search(user_question, top_k, backend=backend))
+
+
+# 이 함수는 답변 하나가 끝났을 때 요청 수, 전체 처리 시간, 기준 미달 답변 수, 캐시 적중/실패 수 지표를 남깁니다.
+# cache_hit이 None이면 캐시를 쓰지 않은 요청이라 캐시 지표는 건드리지 않습니다.
+def record_response_metrics(response, started_at, cache_hit=None):
+    REQUEST_SECONDS.observe(time.perf_counter() - started_at)
+    REQUESTS_TOTAL.inc()
+    if response["matched_question"] is None:
+        BELOW_THRESHOLD_TOTAL.inc()
+    if cache_hit is True:
+        CACHE_HITS_TOTAL.inc()
+    elif cache_hit is False:
+        CACHE_MISSES_TOTAL.inc()
+
+
+# 이 함수는 실제 챗봇 답변을 만드는 핵심 함수입니다.
+# 가장 유사한 FAQ를 찾고, 유사도가 기준보다 낮으면 안내 문구를 반환합니다.
+# 같은 질문은 response_cache에서 바로 꺼내고, 처음 보는 질문만 실제로 검색합니다.
+def get_chatbot_response(
+    user_question,
+    faq_df,
+    vectorizer,
+    question_matrix,
+    threshold=DEFAULT_THRESHOLD,
+    use_cache=True,
+    backend=EXHAUSTIVE_BACKEND,
+):
+    started_at = time.perf_counter()
+    engine = get_search_engine(vectorizer, question_matrix, faq_df)
+    if not use_cache:
+        response = engine.respond(user_question, threshold=threshold, top_k=DEFAULT_TOP_K, backend=backend)
+        record_response_metrics(response, started_at)
+        return response
+
+    with stage_timer("cache_lookup"):
+        cache_key = response_cache.make_key(user_question, threshold, DEFAULT_TOP_K, backend)
+        cached_response = response_cache.get(engine.index_version, cache_key)
+    if cached_response is not None:
+        record_response_metrics(cached_response, started_at, cache_hit=True)
+        return cached_response
+
+    response = engine.respond(user_question, threshold=threshold, top_k=DEFAULT_TOP_K, backend=backend)
+    response_cache.put(engine.index_version, cache_key, response)
+    record_response_metrics(response, started_at, cache_hit=False)
+    return response
+
+
+# 이 함수는 여러 질문을 한꺼번에 처리해 질문마다 get_chatbot_response와 같은 답변을 목록으로 돌려줍니다.
+# 대화 로그 재생이나 테스트 질문 세트 채점처럼 질문이 많을 때, 질문을 묶어서 벡터 변환과 점수 계산을 합니다.
+def get_chatbot_responses(
+    user_questions,
+    faq_df,
+    vectorizer,
+    question_matrix,
+    threshold=DEFAULT_THRESHOLD,
+    top_k=DEFAULT_TOP_K,
+    chunk_size=None,
+):
+    engine = get_search_engine(vectorizer, question_matrix, faq_df)
+    return list(
+        engine.iter_respond_batch(
+            user_questions,
+            threshold=threshold,
+            top_k=top_k,
+            chunk_size=chunk_size,
         )
+    )
 
-        if response["matched_question"] is not None:
-            print(f"가장 유사한 질문: {response['matched_question']}")
-            print(f"유사도 점수: {response['similarity_score']:.3f}")
-        else:
-            print(f"유사도 점수: {response['similarity_score']:.3f}")
 
-        print(f"챗봇 답변: {response['answer']}\n")
+# 이 함수는 콘솔 대화 루프를 실행합니다. 루프는 pandas, scikit-learn 없이 뜨는 faq_light_engine.run_chatbot에 있습니다.
+# 빠르게 시작하려면 python faq_light_engine.py로 바로 실행하면 됩니다.
+def run_chatbot():
+    run_light_chatbot()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,475 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from faq_batch_scheduler import DEFAULT_MAX_BATCH_SIZE, MicroBatchScheduler
+from faq_chatbot import (
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOP_K,
+    EXHAUSTIVE_BACKEND,
+    TFIDF_SCORER,
+    find_top_matches,
+    get_chatbot_response,
+    get_search_engine,
+    initialize_chatbot_engine,
+)
+from faq_metrics import PROMETHEUS_CONTENT_TYPE, render_metrics
+from faq_shared_index import attach_shared_index, publish_shared_index, read_process_memory
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CSV_PATH = Path(__file__).resolve().parent / "faq_data.csv"
+DEFAULT_WORKER_COUNT = min(8, os.cpu_count() or 1)
+# 작업 풀에 쌓아 둘 수 있는 최대 요청 수입니다. 넘으면 기다리게 하지 않고 바로 503으로 돌려보냅니다.
+DEFAULT_MAX_PENDING_PER_WORKER = 16
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 10.0
+# 연결 유지(keep-alive) 중인 소켓이 이 시간 동안 아무 요청도 보내지 않으면 닫아 스레드를 돌려받습니다.
+DEFAULT_IDLE_TIMEOUT_SECONDS = 30.0
+# Next.js route.ts의 MAX_BODY_BYTES, MAX_SINGLE_MESSAGE_CHARS와 같은 한도입니다.
+MAX_BODY_BYTES = 96 * 1024
+MAX_QUESTION_CHARS = 3000
+MAX_SEARCH_TOP_K = 50
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+
+# 이 예외는 잘못된 요청을 알맞은 HTTP 상태 코드와 함께 돌려보낼 때 씁니다.
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# 이 클래스는 FAQ 엔진을 한 번 불러 두고, 검색/답변 작업을 정해진 수의 작업 스레드에서 실행합니다.
+# 연결을 받는 스레드는 요청을 읽고 쓰기만 하고, 점수 계산은 작업 풀이 하므로 동시에 계산하는 수가 max_workers를 넘지 않습니다.
+# 엔진은 백그라운드에서 불러오며, 준비가 끝나기 전에는 /readyz가 503을 돌려줍니다.
+# shared_descriptor를 주면 CSV를 읽지 않고 부모 프로세스가 공유 메모리에 올린 색인에 붙습니다(--processes 모드).
+# batch_window를 주면 /answer(기본 검색 방식)는 작업 풀 대신 마이크로 배치 스케줄러로 보내, 동시에 온 질문을 한 번에 점수 매깁니다.
+class FaqHttpService:
+    def __init__(
+        self,
+        csv_path=DEFAULT_CSV_PATH,
+        scorer=TFIDF_SCORER,
+        max_workers=DEFAULT_WORKER_COUNT,
+        max_pending=None,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT_SECONDS,
+        batch_window=None,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        shared_descriptor=None,
+    ):
+        self.csv_path = Path(csv_path)
+        self.scorer = scorer
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * DEFAULT_MAX_PENDING_PER_WORKER
+        self.request_timeout = request_timeout
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.scheduler = None
+        self.shared_descriptor = shared_descriptor
+        self.shared_index = None
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.load_error = None
+        self.rejected_requests = 0
+        self.timed_out_requests = 0
+        self._triple = None
+        self._ready_event = threading.Event()
+        self._pending_slots = threading.BoundedSemaphore(self.max_pending)
+        self._counter_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="faq-http-worker")
+
+    # FAQ 엔진을 불러옵니다. wait=False면 백그라운드 스레드에서 불러와 서버가 바로 연결을 받을 수 있습니다.
+    def load(self, wait=True):
+        if not wait:
+            threading.Thread(target=self.load, name="faq-http-loader", daemon=True).start()
+            return
+        try:
+            if self.shared_descriptor is not None:
+                self.shared_index = attach_shared_index(self.shared_descriptor)
+                self._triple = self.shared_index.as_triple()
+            else:
+                self._triple = initialize_chatbot_engine(self.csv_path, scorer=self.scorer)
+        except Exception as error:
+            self.load_error = str(error)
+            raise
+        if self.batch_window:
+            faq_df, vectorizer, question_matrix = self._triple
+            self.scheduler = MicroBatchScheduler(
+                get_search_engine(vectorizer, question_matrix, faq_df),
+                max_batch_size=self.max_batch_size,
+                max_wait=self.batch_window,
+                max_queue_size=self.max_pending,
+            )
+        self._ready_event.set()
+
+    @property
+    def ready(self):
+        return self._ready_event.is_set()
+
+    # 작업 하나를 작업 풀에서 실행하고 결과를 기다립니다. 대기 자리가 없으면 503, 시간이 지나면 504입니다.
+    def run(self, task, *args):
+        if not self.ready:
+            raise HttpError(503, "FAQ 엔진을 준비하고 있습니다.")
+        if not self._pending_slots.acquire(blocking=False):
+            with self._counter_lock:
+                self.rejected_requests += 1
+            raise HttpError(503, "요청이 많아 잠시 후 다시 시도해 주세요.")
+        try:
+            future = self._executor.submit(task, *args)
+        except BaseException:
+            self._pending_slots.release()
+            raise
+        # 자리는 작업이 실제로 끝나거나 취소될 때 돌려줍니다. 시간이 지나 504로 답해도 작업은 계속 돌 수 있으므로,
+        # 그때 자리를 먼저 돌려주면 실제로 쌓인 작업이 max_pending을 넘게 됩니다.
+        future.add_done_callback(lambda _: self._pending_slots.release())
+        try:
+            return future.result(timeout=self.request_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._counter_lock:
+                self.timed_out_requests += 1
+            raise HttpError(504, "답변을 만드는 데 시간이 너무 오래 걸렸습니다.") from None
+
+    # 기본 검색 방식의 /answer는 스케줄러가 있으면 스케줄러로, 아니면 작업 풀로 보냅니다.
+    def answer_request(self, user_question, threshold, use_cache, backend):
+        if self.scheduler is None or backend != EXHAUSTIVE_BACKEND:
+            return self.run(self.answer, user_question, threshold, use_cache, backend)
+        if not self.ready:
+            raise HttpError(503, "FAQ 엔진을 준비하고 있습니다.")
+        try:
+            future = self.scheduler.submit(user_question, threshold, DEFAULT_TOP_K, use_cache)
+        except queue.Full:
+            with self._counter_lock:
+                self.rejected_requests += 1
+            raise HttpError(503, "요청이 많아 잠시 후 다시 시도해 주세요.") from None
+        try:
+            return future.result(timeout=self.request_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._counter_lock:
+                self.timed_out_requests += 1
+            raise HttpError(504, "답변을 만드는 데 시간이 너무 오래 걸렸습니다.") from None
+
+    def answer(self, user_question, threshold, use_cache, backend):
+        faq_df, vectorizer, question_matrix = self._triple
+        return get_chatbot_response(
+            user_question,
+            faq_df,
+            vectorizer,
+            question_matrix,
+            threshold=threshold,
+            use_cache=use_cache,
+            backend=backend,
+        )
+
+    def search(self, user_question, top_k, backend):
+        faq_df, vectorizer, question_matrix = self._triple
+        return find_top_matches(user_question, faq_df, vectorizer, question_matrix, top_k=top_k, backend=backend)
+
+    def health(self):
+        with self._counter_lock:
+            rejected_requests, timed_out_requests = self.rejected_requests, self.timed_out_requests
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "ready": self.ready,
+            "load_error": self.load_error,
+            "started_at": self.started_at,
+            "csv_path": str(self.csv_path),
+            "scorer": self.scorer,
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "rejected_requests": rejected_requests,
+            "timed_out_requests": timed_out_requests,
+            "micro_batch": self.scheduler.stats() if self.scheduler is not None else None,
+            "shared_index": self.shared_descriptor["shm_name"] if self.shared_descriptor else None,
+            "memory": read_process_memory(),
+        }
+
+    def close(self):
+        if self.scheduler is not None:
+            self.scheduler.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.shared_index is not None:
+            self.shared_index.close()
+
+
+# 이 함수는 요청 본문에서 질문 문자열을 꺼내 검사합니다.
+def read_question(payload):
+    user_question = payload.get("question")
+    if not isinstance(user_question, str) or not user_question.strip():
+        raise HttpError(400, "question 문자열이 필요합니다.")
+    if len(user_question) > MAX_QUESTION_CHARS:
+        raise HttpError(400, f"question은 {MAX_QUESTION_CHARS}자 이하로 보내 주세요.")
+    return user_question.strip()
+
+
+# NaN은 어떤 비교도 거짓이라 범위 검사를 그대로 통과하므로, 유한한 수가 아니면 따로 거절합니다.
+def read_number(payload, key, default, cast, minimum=None, maximum=None):
+    value = payload.get(key, default)
+    if isinstance(value, bool):
+        raise HttpError(400, f"{key} 값이 올바르지 않습니다.")
+    try:
+        value = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HttpError(400, f"{key} 값이 올바르지 않습니다.") from None
+    if not math.isfinite(value):
+        raise HttpError(400, f"{key} 값이 올바르지 않습니다.")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise HttpError(400, f"{key} 값이 허용 범위를 벗어났습니다.")
+    return value
+
+
+# 이 함수는 요청 본문에서 참/거짓 값을 꺼냅니다. "false" 같은 문자열이 참으로 읽히지 않도록 JSON true/false만 받습니다.
+def read_flag(payload, key, default):
+    value = payload.get(key, default)
+    if not isinstance(value, bool):
+        raise HttpError(400, f"{key} 값은 true 또는 false여야 합니다.")
+    return value
+
+
+# 이 클래스는 요청 하나를 처리합니다. HTTP/1.1로 응답하고 항상 Content-Length를 붙여, 클라이언트가 연결을 계속 재사용할 수 있게 합니다.
+class FaqRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = DEFAULT_IDLE_TIMEOUT_SECONDS
+    # 헤더와 본문이 따로 나가므로, Nagle 알고리즘이 켜져 있으면 연결을 재사용할 때 응답마다 지연 ACK(약 40ms)를 기다리게 됩니다.
+    disable_nagle_algorithm = True
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/healthz":
+            self.send_json(200, self.service.health())
+        elif path == "/readyz":
+            if self.service.ready:
+                self.send_json(200, {"status": "ready"})
+            else:
+                self.send_json(503, {"status": "loading", "load_error": self.service.load_error})
+        elif path == "/metrics":
+            self.send_body(200, render_metrics().encode("utf-8"), PROMETHEUS_CONTENT_TYPE)
+        else:
+            self.send_json(404, {"error": "없는 경로입니다."})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        try:
+            payload = self.read_json_body()
+            if path == "/answer":
+                response = self.service.answer_request(
+                    read_question(payload),
+                    read_number(payload, "threshold", DEFAULT_THRESHOLD, float, 0.0, 1.0),
+                    read_flag(payload, "use_cache", True),
+                    str(payload.get("backend", EXHAUSTIVE_BACKEND)),
+                )
+            elif path == "/search":
+                response = {
+                    "matches": self.service.run(
+                        self.service.search,
+                        read_question(payload),
+                        read_number(payload, "top_k", DEFAULT_TOP_K, int, 1, MAX_SEARCH_TOP_K),
+                        str(payload.get("backend", EXHAUSTIVE_BACKEND)),
+                    )
+                }
+            else:
+                raise HttpError(404, "없는 경로입니다.")
+        except HttpError as error:
+            self.send_json(error.status, {"error": error.message})
+            return
+        except ValueError as error:
+            # 알 수 없는 검색 방식(backend) 같은 입력 오류입니다.
+            self.send_json(400, {"error": str(error)})
+            return
+        self.send_json(200, response)
+
+    # 본문을 끝까지 읽어야 다음 요청이 같은 연결에서 바르게 읽히므로, 너무 큰 본문은 읽지 않고 연결을 닫습니다.
+    def read_json_body(self):
+        try:
+            content_length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            self.close_connection = True
+            raise HttpError(400, "Content-Length 값이 올바르지 않습니다.") from None
+        if content_length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise HttpError(413, f"요청 본문이 너무 큽니다. ({MAX_BODY_BYTES}바이트 이하)")
+        raw_body = self.rfile.read(content_length) if content_length > 0 else b""
+        try:
+            payload = json.loads(raw_body or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HttpError(400, "본문이 올바른 JSON이 아닙니다.") from None
+        if not isinstance(payload, dict):
+            raise HttpError(400, "본문은 JSON 객체여야 합니다.")
+        return payload
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), JSON_CONTENT_TYPE)
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    # 부하 시험 중 요청마다 표준 오류에 접근 로그를 남기면 그 자체가 병목이 되므로 남기지 않습니다.
+    def log_message(self, format, *args):
+        return
+
+
+class FaqHttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 부하 시험처럼 연결이 한꺼번에 몰릴 때 연결 요청이 거절되지 않도록 대기열을 늘립니다.
+    request_queue_size = 128
+
+    def __init__(self, server_address, service, listen_socket=None):
+        self.service = service
+        super().__init__(server_address, FaqRequestHandler, bind_and_activate=listen_socket is None)
+        if listen_socket is not None:
+            # 부모 프로세스가 열어 둔 소켓을 그대로 씁니다. 여러 작업 프로세스가 같은 소켓에서 번갈아 연결을 받습니다.
+            self.socket.close()
+            self.socket = listen_socket
+            self.server_address = listen_socket.getsockname()
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
+
+
+# 이 함수는 서버를 만들고 엔진을 불러옵니다. wait_until_ready=False면 엔진을 백그라운드에서 불러옵니다.
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, wait_until_ready=True, **service_options):
+    service = FaqHttpService(**service_options)
+    server = FaqHttpServer((host, port), service)
+    service.load(wait=wait_until_ready)
+    return server
+
+
+# 이 함수는 --processes 모드의 작업 프로세스 하나입니다. 공유 색인에 붙고, 부모가 연 소켓에서 요청을 받습니다.
+def serve_worker(listen_socket, shared_descriptor, service_options):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    service = FaqHttpService(shared_descriptor=shared_descriptor, **service_options)
+    server = FaqHttpServer(None, service, listen_socket=listen_socket)
+    service.load()
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+# 이 함수는 색인을 한 번만 만들어 공유 메모리에 올리고, 같은 소켓을 쓰는 작업 프로세스 process_count개를 띄웁니다.
+# 작업 프로세스는 행렬과 답변을 복사하지 않고 공유 메모리를 읽기만 하므로, 프로세스를 늘려도 색인 메모리는 한 벌입니다.
+# Ctrl+C나 SIGTERM을 받으면 작업 프로세스를 멈춘 뒤 공유 메모리를 지웁니다.
+def serve_processes(host, port, process_count, csv_path, scorer, service_options):
+    faq_df, vectorizer, question_matrix = initialize_chatbot_engine(csv_path, scorer=scorer)
+    owner = publish_shared_index(faq_df, vectorizer, question_matrix)
+    del faq_df, vectorizer, question_matrix
+    listen_socket = socket.create_server((host, port), backlog=FaqHttpServer.request_queue_size)
+    signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=serve_worker,
+            args=(listen_socket, owner.descriptor, service_options),
+            name=f"faq-http-{worker_index}",
+        )
+        for worker_index in range(process_count)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        bound_host, bound_port = listen_socket.getsockname()[:2]
+        print(
+            f"FAQ HTTP 서비스가 http://{bound_host}:{bound_port} 에서 작업 프로세스 {process_count}개로 실행 중입니다. "
+            f"공유 색인 {owner.size_bytes / (1024 * 1024):.1f}MB ({owner.descriptor['shm_name']})"
+        )
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("\nFAQ HTTP 서비스를 종료합니다.")
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        for worker in workers:
+            worker.join(DEFAULT_REQUEST_TIMEOUT_SECONDS)
+        listen_socket.close()
+        owner.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAQ 검색 엔진을 JSON HTTP 서비스로 제공합니다 (POST /answer, POST /search).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--csv", default=str(DEFAULT_CSV_PATH), help="FAQ CSV 경로 (기본: faq_data.csv)")
+    parser.add_argument("--scorer", default=TFIDF_SCORER, help="점수 방식 (tfidf 또는 bm25)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKER_COUNT, help="점수 계산 작업 스레드 수")
+    parser.add_argument("--max-pending", type=int, help="작업 풀에 쌓아 둘 최대 요청 수 (기본: 작업 스레드 수 x 16)")
+    parser.add_argument("--request-timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT_SECONDS)
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=0.0,
+        help="0보다 크면 /answer 질문을 이 시간(ms)만큼 모아 한 번에 점수 매깁니다 (예: 2)",
+    )
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="2 이상이면 색인을 공유 메모리에 한 번 올리고 이 수만큼 작업 프로세스를 띄웁니다",
+    )
+    args = parser.parse_args()
+
+    service_options = {
+        "max_workers": args.workers,
+        "max_pending": args.max_pending,
+        "request_timeout": args.request_timeout,
+        "batch_window": args.batch_window_ms / 1000 or None,
+        "max_batch_size": args.max_batch_size,
+    }
+    if args.processes > 1:
+        serve_processes(args.host, args.port, args.processes, args.csv, args.scorer, service_options)
+        return
+
+    server = create_server(
+        args.host,
+        args.port,
+        wait_until_ready=False,
+        csv_path=args.csv,
+        scorer=args.scorer,
+        **service_options,
+    )
+    host, port = server.server_address[:2]
+    print(f"FAQ HTTP 서비스가 http://{host}:{port} 에서 실행 중입니다. 종료하려면 Ctrl+C를 누르세요.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nFAQ HTTP 서비스를 종료합니다.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from faq_chatbot import DEFAULT_TOP_K, select_top_k, tokenize_korean_text
+
+
+# 삭제/수정으로 죽은 행과 아직 합쳐지지 않은 추가 행이 전체 행의 이 비율을 넘으면 백그라운드 압축을 시작합니다.
+DEFAULT_COMPACTION_RATIO = 0.25
+DEFAULT_MIN_COMPACTION_ROWS = 256
+
+
+# 이 클래스는 FAQ를 한 건씩 추가/수정/삭제할 수 있는 TF-IDF 색인입니다.
+# 전체를 다시 학습하지 않고, 바뀐 문서만 토큰화한 뒤 문서 빈도(DF)를 더하고 빼서 IDF를 갱신합니다.
+# 행렬에는 단어 등장 횟수만 저장하고, IDF 가중치와 행 길이(norm)는 검색 직전에 한 번에 다시 계산합니다.
+# 그래서 점수는 같은 문서로 TfidfVectorizer를 새로 학습했을 때의 코사인 유사도와 같습니다.
+#
+# 행 저장 방식:
+# - 기본 행렬: 압축이 끝난 행들의 CSR 배열(등장 횟수)
+# - 추가 버퍼: 압축 이후 추가/수정된 행들의 목록. 검색할 때 작은 CSR로 만들어 기본 행렬 뒤에 이어 붙인 것처럼 씁니다.
+# - 삭제 표시: 행마다 살아 있는지 여부. 삭제와 수정은 기존 행을 지우지 않고 죽은 행으로 표시만 합니다.
+#
+# 지금은 라이브러리로만 제공합니다. initialize_chatbot_engine, HTTP 서비스, Streamlit 화면은 저장 색인을 통째로 다시 만드는 방식을 그대로 씁니다.
+class IncrementalFaqIndex:
+    def __init__(
+        self,
+        tokenizer=tokenize_korean_text,
+        compaction_ratio=DEFAULT_COMPACTION_RATIO,
+        min_compaction_rows=DEFAULT_MIN_COMPACTION_ROWS,
+        background_compaction=True,
+    ):
+        self.tokenizer = tokenizer
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_rows = min_compaction_rows
+        self.background_compaction = background_compaction
+        self._lock = threading.RLock()
+        # 압축은 한 번에 하나만 돌게 합니다. 두 압축이 겹치면 압축 중 삭제 목록과 행 번호 스냅샷이 서로를 덮어씁니다.
+        self._compaction_lock = threading.Lock()
+
+        self.term_ids = {}
+        self.terms = []
+        self._document_frequency = np.zeros(1024, dtype=np.int64)
+
+        self._base_indptr = np.zeros(1, dtype=np.int64)
+        self._base_indices = np.zeros(0, dtype=np.int32)
+        self._base_matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._base_squared_matrix = self._base_matrix
+        self._pending_rows = []
+        self._row_doc_ids = []
+        self._alive = bytearray()
+        self._row_of_doc = {}
+        self.records = {}
+        self.live_count = 0
+        self.dead_row_count = 0
+
+        self._weights_dirty = True
+        self._idf = np.zeros(0, dtype=np.float64)
+        self._row_norms = np.zeros(0, dtype=np.float64)
+        self._tail_matrix = None
+
+        self._compaction_thread = None
+        self._deleted_during_compaction = None
+        self.compaction_count = 0
+
+    # 데이터프레임의 모든 행을 행 번호를 문서 id로 삼아 한꺼번에 넣습니다.
+    @classmethod
+    def from_faq_df(cls, faq_df, **options):
+        index = cls(**options)
+        index.add_many(enumerate(zip(faq_df["Question"], faq_df["Answer"])))
+        return index
+
+    @property
+    def row_count(self):
+        return len(self._row_doc_ids)
+
+    @property
+    def base_row_count(self):
+        return len(self._base_indptr) - 1
+
+    def __len__(self):
+        return self.live_count
+
+    def __contains__(self, doc_id):
+        return doc_id in self._row_of_doc
+
+    def get_record(self, doc_id):
+        return self.records[doc_id]
+
+    # 질문 문장을 (단어 번호 배열, 등장 횟수 배열)로 바꿉니다. 처음 보는 단어는 어휘 끝에 새 번호로 붙입니다.
+    def _vectorize_document(self, question):
+        term_counts = Counter(self.tokenizer(question))
+        term_ids = np.empty(len(term_counts), dtype=np.int32)
+        counts = np.empty(len(term_counts), dtype=np.float32)
+        for position, (term, count) in enumerate(term_counts.items()):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                term_id = len(self.terms)
+                self.term_ids[term] = term_id
+                self.terms.append(term)
+            term_ids[position] = term_id
+            counts[position] = count
+
+        order = np.argsort(term_ids)
+        return term_ids[order], counts[order]
+
+    def _ensure_term_capacity(self):
+        if len(self.terms) > self._document_frequency.shape[0]:
+            grown = np.zeros(max(len(self.terms), self._document_frequency.shape[0] * 2), dtype=np.int64)
+            grown[: self._document_frequency.shape[0]] = self._document_frequency
+            self._document_frequency = grown
+
+    # 행 번호에 해당하는 단어 번호 배열을 돌려줍니다. DF를 줄일 때 사용합니다.
+    def _row_term_ids(self, row):
+        if row < self.base_row_count:
+            return self._base_indices[self._base_indptr[row] : self._base_indptr[row + 1]]
+        return self._pending_rows[row - self.base_row_count][0]
+
+    # 새 문서를 추가합니다. 이미 있는 id면 ValueError를 냅니다.
+    def add(self, doc_id, question, answer):
+        with self._lock:
+            if doc_id in self._row_of_doc:
+                raise ValueError(f"이미 있는 FAQ id입니다: {doc_id!r}")
+            self._append_row(doc_id, question, answer)
+        self._maybe_compact()
+
+    # (문서 id, (질문, 답변)) 목록을 한꺼번에 추가하고, 끝난 뒤 한 번만 압축합니다.
+    # 백그라운드 압축이 돌고 있으면 compact가 그 압축이 끝날 때까지 기다렸다가 이어서 압축합니다.
+    def add_many(self, documents):
+        with self._lock:
+            for doc_id, (question, answer) in documents:
+                if doc_id in self._row_of_doc:
+                    raise ValueError(f"이미 있는 FAQ id입니다: {doc_id!r}")
+                self._append_row(doc_id, question, answer)
+        self.compact()
+
+    # 기존 문서를 바꿉니다. 이전 행은 죽은 행으로 표시하고 새 행을 추가 버퍼에 붙입니다.
+    def update(self, doc_id, question, answer):
+        with self._lock:
+            if doc_id not in self._row_of_doc:
+                raise KeyError(doc_id)
+            self._tombstone(doc_id)
+            self._append_row(doc_id, question, answer)
+        self._maybe_compact()
+
+    # 문서를 지웁니다. 행은 그대로 두고 죽은 행으로 표시한 뒤 DF만 줄입니다.
+    def delete(self, doc_id):
+        with self._lock:
+            if doc_id not in self._row_of_doc:
+                raise KeyError(doc_id)
+            self._tombstone(doc_id)
+            del self.records[doc_id]
+        self._maybe_compact()
+
+    def _append_row(self, doc_id, question, answer):
+        term_ids, counts = self._vectorize_document(question)
+        self._ensure_term_capacity()
+        self._document_frequency[term_ids] += 1
+
+        self._row_of_doc[doc_id] = len(self._row_doc_ids)
+        self._row_doc_ids.append(doc_id)
+        self._pending_rows.append((term_ids, counts))
+        self._alive.append(1)
+        self.records[doc_id] = (question, answer)
+        self.live_count += 1
+        self._weights_dirty = True
+        self._tail_matrix = None
+
+    def _tombstone(self, doc_id):
+        row = self._row_of_doc.pop(doc_id)
+        self._document_frequency[self._row_term_ids(row)] -= 1
+        self._alive[row] = 0
+        self.live_count -= 1
+        self.dead_row_count += 1
+        self._weights_dirty = True
+        if self._deleted_during_compaction is not None:
+            self._deleted_during_compaction.append(row)
+
+    # 검색 전에 IDF, 행 길이, 추가 버퍼 CSR을 최신 상태로 맞춥니다. 바뀐 것이 없으면 아무것도 하지 않습니다.
+    # IDF는 sklearn TfidfVectorizer 기본값(smooth_idf=True)과 같은 식 ln((1 + n) / (1 + df)) + 1을 씁니다.
+    def _refresh(self):
+        if self._tail_matrix is None:
+            self._tail_matrix = self._build_pending_matrix(self._pending_rows)
+        if not self._weights_dirty:
+            return
+
+        term_count = len(self.terms)
+        document_frequency = self._document_frequency[:term_count]
+        idf = np.log((1.0 + self.live_count) / (1.0 + document_frequency)) + 1.0
+        squared_idf = idf * idf
+
+        base_squared_matrix = self._base_squared_matrix
+        base_norms = np.sqrt(base_squared_matrix.dot(squared_idf[: base_squared_matrix.shape[1]]))
+        tail_norms = np.sqrt(self._tail_matrix.power(2).dot(squared_idf[: self._tail_matrix.shape[1]]))
+        self._idf = idf
+        self._row_norms = np.concatenate((base_norms, tail_norms))
+        self._weights_dirty = False
+
+    def _build_pending_matrix(self, pending_rows):
+        if not pending_rows:
+            return sparse.csr_matrix((0, len(self.terms)), dtype=np.float32)
+        indptr = np.zeros(len(pending_rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([term_ids.shape[0] for term_ids, _ in pending_rows])
+        indices = np.concatenate([term_ids for term_ids, _ in pending_rows])
+        counts = np.concatenate([counts for _, counts in pending_rows])
+        return sparse.csr_matrix((counts, indices, indptr), shape=(len(pending_rows), len(self.terms)))
+
+    # 질문을 색인과 같은 가중치 방식의 L2 정규화 벡터로 바꿉니다.
+    # 살아 있는 문서에 한 번도 나오지 않는 단어(DF=0)는 새로 학습한 어휘에 없는 단어와 같으므로 제외합니다.
+    def _query_weights(self, user_question):
+        known_ids = []
+        weights = []
+        for term, count in Counter(self.tokenizer(user_question)).items():
+            term_id = self.term_ids.get(term)
+            if term_id is not None and self._document_frequency[term_id] > 0:
+                known_ids.append(term_id)
+                weights.append(count * self._idf[term_id])
+
+        dense_query = np.zeros(len(self.terms), dtype=np.float64)
+        if known_ids:
+            weights = np.asarray(weights)
+            dense_query[known_ids] = weights / np.linalg.norm(weights)
+        return dense_query
+
+    # 질문 하나에 대해 살아 있는 문서 전체의 코사인 유사도를 계산해 (문서 id, 유사도)를 높은 순으로 최대 k개 반환합니다.
+    def search(self, user_question, k=DEFAULT_TOP_K):
+        with self._lock:
+            self._refresh()
+            dense_query = self._query_weights(user_question)
+            # 문서 쪽 가중치는 (등장 횟수 x IDF) / 행 길이이므로, 질문 벡터에 IDF를 미리 곱해 두면 곱셈 한 번으로 끝납니다.
+            weighted_query = dense_query * self._idf
+            base_scores = self._base_matrix.dot(weighted_query[: self._base_matrix.shape[1]])
+            tail_scores = self._tail_matrix.dot(weighted_query[: self._tail_matrix.shape[1]])
+            raw_scores = np.concatenate((base_scores, tail_scores))
+            row_norms = self._row_norms
+            alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+            row_doc_ids = self._row_doc_ids
+
+            similarity_scores = np.zeros(raw_scores.shape[0], dtype=np.float64)
+            np.divide(raw_scores, row_norms, out=similarity_scores, where=row_norms > 0)
+            similarity_scores[~alive] = -np.inf
+            ranked_rows = select_top_k(similarity_scores, min(k, self.live_count))
+            return [(row_doc_ids[row], float(similarity_scores[row])) for row in ranked_rows]
+
+    # 죽은 행과 추가 버퍼가 충분히 쌓였으면 압축을 시작합니다.
+    def _maybe_compact(self):
+        with self._lock:
+            waste = self.dead_row_count + len(self._pending_rows)
+            row_count = self.row_count
+        if waste < self.min_compaction_rows or waste < self.compaction_ratio * max(row_count, 1):
+            return
+        if not self.background_compaction:
+            self.compact()
+            return
+        with self._lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(
+                target=self.compact, name="faq-index-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+
+    # 살아 있는 행만 모아 기본 행렬을 새로 만들고, 추가 버퍼를 비웁니다.
+    # 무거운 배열 작업은 잠금 밖에서 하고, 그동안 들어온 추가/삭제는 교체 직전에 다시 반영합니다.
+    # 압축 잠금을 처음부터 끝까지 잡고 있어, 다른 압축(백그라운드 스레드나 add_many)은 앞선 압축이 끝난 뒤에 시작합니다.
+    def compact(self):
+        with self._compaction_lock:
+            self._compact()
+
+    def _compact(self):
+        with self._lock:
+            snapshot_base_rows = self.base_row_count
+            snapshot_pending_count = len(self._pending_rows)
+            snapshot_base_matrix = self._base_matrix
+            snapshot_pending_rows = list(self._pending_rows)
+            snapshot_alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+            snapshot_doc_ids = list(self._row_doc_ids)
+            snapshot_term_count = len(self.terms)
+            self._deleted_during_compaction = []
+
+        try:
+            pending_matrix = self._build_pending_matrix_with_width(snapshot_pending_rows, snapshot_term_count)
+            base_matrix = sparse.csr_matrix(snapshot_base_matrix, copy=False)
+            base_matrix.resize((snapshot_base_rows, snapshot_term_count))
+            combined_matrix = sparse.vstack((base_matrix, pending_matrix), format="csr", dtype=np.float32)
+            live_rows = np.flatnonzero(snapshot_alive)
+            compacted_matrix = combined_matrix[live_rows]
+            compacted_matrix.sort_indices()
+            squared_matrix = compacted_matrix.power(2)
+            old_to_new_row = np.full(snapshot_alive.shape[0], -1, dtype=np.int64)
+            old_to_new_row[live_rows] = np.arange(live_rows.shape[0])
+        except Exception:
+            with self._lock:
+                self._deleted_during_compaction = None
+            raise
+
+        with self._lock:
+            snapshot_row_count = snapshot_base_rows + snapshot_pending_count
+            new_doc_ids = [snapshot_doc_ids[row] for row in live_rows]
+            new_alive = bytearray(b"\x01" * len(new_doc_ids))
+            for deleted_row in self._deleted_during_compaction:
+                if deleted_row < snapshot_row_count and old_to_new_row[deleted_row] >= 0:
+                    new_alive[old_to_new_row[deleted_row]] = 0
+
+            # 압축하는 동안 새로 붙은 행은 새 추가 버퍼로 옮깁니다.
+            remaining_pending = self._pending_rows[snapshot_pending_count:]
+            remaining_alive = self._alive[snapshot_row_count:]
+            remaining_doc_ids = self._row_doc_ids[snapshot_row_count:]
+
+            self._base_matrix = compacted_matrix
+            self._base_squared_matrix = squared_matrix
+            self._base_indptr = compacted_matrix.indptr
+            self._base_indices = compacted_matrix.indices
+            self._pending_rows = remaining_pending
+            self._row_doc_ids = new_doc_ids + remaining_doc_ids
+            self._alive = new_alive + remaining_alive
+            self._row_of_doc = {
+                doc_id: row
+                for row, doc_id in enumerate(self._row_doc_ids)
+                if self._alive[row]
+            }
+            self.dead_row_count = self.row_count - self.live_count
+            self._deleted_during_compaction = None
+            self._tail_matrix = None
+            self._weights_dirty = True
+            self.compaction_count += 1
+
+    def _build_pending_matrix_with_width(self, pending_rows, term_count):
+        pending_matrix = self._build_pending_matrix(pending_rows)
+        pending_matrix.resize((pending_matrix.shape[0], term_count))
+        return pending_matrix
+
+    # 압축 스레드가 돌고 있으면 끝날 때까지 기다립니다.
+    def wait_for_compaction(self, timeout=None):
+        compaction_thread = self._compaction_thread
+        if compaction_thread is not None:
+            compaction_thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live_documents": self.live_count,
+                "rows": self.row_count,
+                "base_rows": self.base_row_count,
+                "pending_rows": len(self._pending_rows),
+                "dead_rows": self.dead_row_count,
+                "terms": len(self.terms),
+                "compactions": self.compaction_count,
+            }
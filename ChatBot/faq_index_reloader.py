@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from faq_chatbot import TFIDF_SCORER, get_search_engine, initialize_chatbot_engine
+from faq_index_store import compute_file_sha256
+
+
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+
+
+# 이 클래스는 한 시점의 FAQ 색인 묶음을 담는 읽기 전용 스냅샷입니다.
+# 화면을 다시 그리는 동안에는 처음 꺼낸 스냅샷만 쓰므로, 중간에 색인이 교체되어도 한 화면 안의 결과가 섞이지 않습니다.
+class FaqIndexSnapshot:
+    __slots__ = ("faq_df", "vectorizer", "question_matrix", "index_version", "csv_sha256", "loaded_at")
+
+    def __init__(self, faq_df, vectorizer, question_matrix, index_version, csv_sha256):
+        self.faq_df = faq_df
+        self.vectorizer = vectorizer
+        self.question_matrix = question_matrix
+        self.index_version = index_version
+        self.csv_sha256 = csv_sha256
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+
+    # 기존 함수들이 받는 (faq_df, vectorizer, question_matrix) 순서로 돌려줍니다.
+    def as_triple(self):
+        return self.faq_df, self.vectorizer, self.question_matrix
+
+
+# 이 클래스는 faq_data.csv를 주기적으로 살펴보고, 내용이 바뀌면 백그라운드에서 색인을 다시 만들어 교체합니다.
+# 수정 시각과 파일 크기로 변경을 먼저 감지하고, 내용 해시가 실제로 달라졌을 때만 다시 만듭니다.
+# 새 색인이 완성된 뒤 스냅샷 참조 하나만 바꾸므로, 요청을 처리하는 쪽은 항상 완성된 색인만 보게 됩니다.
+class FaqIndexReloader:
+    def __init__(
+        self,
+        csv_path,
+        poll_interval=DEFAULT_POLL_INTERVAL_SECONDS,
+        on_reload=None,
+        on_error=None,
+        scorer=TFIDF_SCORER,
+    ):
+        self.csv_path = Path(csv_path)
+        self.scorer = scorer
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.reload_count = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pending_signature = None
+        self._loaded_signature = self.read_file_signature()
+        self._snapshot = None
+        self._snapshot = self.rebuild(reason="initial")
+
+    # 현재 색인 스냅샷을 반환합니다. 참조를 한 번 읽을 뿐이라 요청 처리 경로에서 기다리는 일이 없습니다.
+    def current(self):
+        return self._snapshot
+
+    def read_file_signature(self):
+        file_stat = self.csv_path.stat()
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    # CSV로 색인을 새로 만들고 스냅샷을 교체한 뒤, 걸린 시간과 버전을 on_reload로 알립니다.
+    def rebuild(self, reason):
+        started_at = time.perf_counter()
+        csv_sha256 = compute_file_sha256(self.csv_path)
+        faq_df, vectorizer, question_matrix = initialize_chatbot_engine(self.csv_path, scorer=self.scorer)
+        snapshot = FaqIndexSnapshot(
+            faq_df,
+            vectorizer,
+            question_matrix,
+            index_version=get_search_engine(vectorizer, question_matrix, faq_df).index_version,
+            csv_sha256=csv_sha256,
+        )
+        rebuild_seconds = time.perf_counter() - started_at
+
+        with self._lock:
+            previous_snapshot = self._snapshot
+            self._snapshot = snapshot
+            self.reload_count += 1
+
+        if self.on_reload is not None:
+            self.on_reload(snapshot, previous_snapshot, rebuild_seconds, reason)
+        return snapshot
+
+    # 파일이 바뀌었는지 한 번 확인합니다. 저장 도중의 파일을 읽지 않도록, 같은 변경이 두 번 연속 보일 때만 다시 만듭니다.
+    def check_now(self):
+        try:
+            signature = self.read_file_signature()
+        except OSError as error:
+            self.report_error(error)
+            return False
+
+        if signature == self._loaded_signature:
+            self._pending_signature = None
+            return False
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+
+        self._pending_signature = None
+        # 성공하든 실패하든 이 파일 상태는 처리한 것으로 기록합니다. 실패한 CSV를 매번 다시 읽지 않기 위해서입니다.
+        self._loaded_signature = signature
+        try:
+            if compute_file_sha256(self.csv_path) == self._snapshot.csv_sha256:
+                return False
+            self.rebuild(reason="csv_changed")
+        except Exception as error:
+            # 잘못된 CSV가 저장되어도 기존 색인으로 계속 답하고, 다음 변경 때 다시 시도합니다.
+            self.report_error(error)
+            return False
+        return True
+
+    def report_error(self, error):
+        if self.on_error is not None:
+            self.on_error(error)
+
+    # 변경 감지 스레드를 시작합니다. 데몬 스레드라서 프로세스 종료를 막지 않습니다.
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="faq-index-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.check_now()
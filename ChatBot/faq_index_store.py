@@ -0,0 +1,356 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+
+# 형식 2부터 질문/답변을 JSON 대신 열마다 UTF-8 바이트 파일과 시작 위치 파일로 저장합니다. 형식 1 색인은 읽지 않고 다시 만듭니다.
+INDEX_FORMAT_VERSION = 2
+INDEX_DIR_SUFFIX = ".index"
+MANIFEST_FILE_NAME = "manifest.json"
+VOCABULARY_FILE_NAME = "vocabulary.json"
+IDF_FILE_NAME = "idf.npy"
+MATRIX_FILE_NAMES = {
+    "data": "question_matrix.data.npy",
+    "indices": "question_matrix.indices.npy",
+    "indptr": "question_matrix.indptr.npy",
+}
+RECORD_FILE_NAMES = {
+    "questions": ("questions.offsets.npy", "questions.utf8.npy"),
+    "answers": ("answers.offsets.npy", "answers.utf8.npy"),
+}
+# 같은 CSV로 만든 색인을 몇 개까지 남겨 둘지 정합니다. 막 교체된 색인을 아직 읽는 프로세스를 위해 하나는 더 남깁니다.
+KEPT_INDEX_VERSIONS = 2
+# 기본 점수 방식입니다. 이 방식의 색인 폴더 이름에는 방식 이름을 붙이지 않아 예전 색인과 이름이 같습니다.
+DEFAULT_SCORER_NAME = "tfidf"
+
+
+# 이 클래스는 UTF-8 바이트 버퍼와 시작 위치 배열로 이루어진 읽기 전용 문자열 목록입니다.
+# 번호로 꺼낼 때만 그 문자열을 디코딩하므로, 답변 수십만 개를 파이썬 문자열로 미리 만들어 두지 않습니다.
+# 버퍼가 메모리 매핑된 파일이면 실제로 꺼낸 문자열이 있는 페이지만 읽히고, 공유 메모리여도 똑같이 씁니다.
+# 꺼낼 때는 memoryview 조각을 바로 디코딩합니다. NumPy 배열을 자르는 것보다 몇 배 빠르고 중간 bytes 복사도 없습니다.
+class TextColumn:
+    __slots__ = ("offsets", "buffer", "_offset_view", "_buffer_view")
+
+    def __init__(self, offsets, buffer):
+        self.offsets = offsets
+        self.buffer = buffer
+        self._offset_view = memoryview(np.ascontiguousarray(offsets, dtype=np.int64))
+        self._buffer_view = memoryview(np.ascontiguousarray(buffer, dtype=np.uint8))
+
+    def __len__(self):
+        return len(self._offset_view) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("문자열 목록의 범위를 벗어났습니다.")
+        return str(self._buffer_view[self._offset_view[index] : self._offset_view[index + 1]], "utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    # 데이터프레임 열처럼 전체를 파이썬 리스트로 꺼냅니다. 모든 문자열을 디코딩하므로 서비스 경로에서는 쓰지 않습니다.
+    def tolist(self):
+        return list(self)
+
+    @property
+    def nbytes(self):
+        return self._offset_view.nbytes + self._buffer_view.nbytes
+
+
+# 이 함수는 문자열 목록을 (시작 위치 배열, UTF-8 바이트 배열)로 바꿉니다.
+def encode_text_column(values):
+    encoded_values = [str(value).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded_values) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded_values], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded_values), dtype=np.uint8)
+
+
+# 이 클래스는 FAQ 질문/답변을 열 단위(TextColumn)로 담은 읽기 전용 기록 저장소입니다.
+# 검색 결과 행 번호로 질문/답변을 꺼내는 일은 오프셋 두 개를 읽고 그 구간만 디코딩하는 O(1) 작업입니다.
+# len(records)와 records["Question"]처럼 데이터프레임과 같은 방식으로도 읽을 수 있어, faq_df 자리에 그대로 넘길 수 있습니다.
+# index_version은 색인을 저장할 때 계산해 둔 값이라, 검색 엔진이 전체 질문/답변을 다시 훑어 해시하지 않아도 됩니다.
+class FaqRecordStore:
+    __slots__ = ("questions", "answers", "index_version")
+
+    def __init__(self, questions, answers, index_version=None):
+        if len(questions) != len(answers):
+            raise ValueError("질문 수와 답변 수가 다릅니다.")
+        self.questions = questions
+        self.answers = answers
+        self.index_version = index_version
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __getitem__(self, column_name):
+        if column_name == "Question":
+            return self.questions
+        if column_name == "Answer":
+            return self.answers
+        raise KeyError(column_name)
+
+    @property
+    def nbytes(self):
+        return self.questions.nbytes + self.answers.nbytes
+
+
+# 이 클래스는 디스크에서 읽어 온 색인 묶음을 담습니다.
+# 행렬 배열과 질문/답변 바이트는 np.load(mmap_mode="r")로 열기 때문에, 여러 프로세스가 같은 파일을 열면 같은 메모리 페이지를 나눠 씁니다.
+class FaqIndexArtifact:
+    def __init__(self, index_dir, manifest, vocabulary_terms, idf, data, indices, indptr, records):
+        self.index_dir = index_dir
+        self.manifest = manifest
+        self.vocabulary_terms = vocabulary_terms
+        self.idf = idf
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.records = records
+
+    @property
+    def questions(self):
+        return self.records.questions
+
+    @property
+    def answers(self):
+        return self.records.answers
+
+    @property
+    def index_version(self):
+        return self.records.index_version
+
+    @property
+    def shape(self):
+        return self.manifest["row_count"], self.manifest["term_count"]
+
+    @property
+    def csv_sha256(self):
+        return self.manifest["csv_sha256"]
+
+    @property
+    def scorer_params(self):
+        return self.manifest.get("scorer_params", {})
+
+
+# 이 함수는 파일 내용을 SHA-256으로 요약합니다. CSV가 바뀌었는지 판단하는 기준입니다.
+def compute_file_sha256(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as source_file:
+        for chunk in iter(lambda: source_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 이 함수는 CSV 옆에 만들 색인 폴더 경로를 정합니다. 예: faq_data.csv -> faq_data.index/
+def default_index_root(csv_path):
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + INDEX_DIR_SUFFIX)
+
+
+# 이 함수는 CSV 내용 해시마다 따로 두는 색인 폴더 경로를 반환합니다.
+# 폴더 이름이 내용 해시라서, CSV가 바뀌면 자연스럽게 다른 폴더를 보게 됩니다.
+# 기본이 아닌 점수 방식은 이름 뒤에 방식 이름을 붙여(예: 1a2b...-bm25) 서로 덮어쓰지 않게 합니다.
+def index_dir_for(index_root, csv_sha256, scorer_name=DEFAULT_SCORER_NAME):
+    if scorer_name == DEFAULT_SCORER_NAME:
+        return Path(index_root) / csv_sha256[:16]
+    return Path(index_root) / f"{csv_sha256[:16]}-{scorer_name}"
+
+
+def scorer_name_of(index_dir):
+    _, _, scorer_name = Path(index_dir).name.partition("-")
+    return scorer_name or DEFAULT_SCORER_NAME
+
+
+# 이 함수는 학습된 색인 구성 요소를 임시 폴더에 모두 쓴 뒤, 이름 바꾸기 한 번으로 공개합니다.
+# 쓰는 도중에 다른 프로세스가 읽더라도 반쯤 쓰인 색인을 보는 일이 없습니다.
+# index_version을 넘기면 manifest에 남겨, 읽는 쪽이 질문/답변 전체를 해시하지 않고 바로 씁니다.
+def write_index_artifact(
+    index_root,
+    csv_sha256,
+    tokenizer_signature,
+    vocabulary_terms,
+    idf,
+    question_matrix,
+    questions,
+    answers,
+    scorer_name=DEFAULT_SCORER_NAME,
+    scorer_params=None,
+    index_version=None,
+):
+    index_root = Path(index_root)
+    index_root.mkdir(parents=True, exist_ok=True)
+    target_dir = index_dir_for(index_root, csv_sha256, scorer_name)
+    staging_dir = index_root / f".staging-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    staging_dir.mkdir()
+
+    try:
+        np.save(staging_dir / IDF_FILE_NAME, np.asarray(idf, dtype=np.float64))
+        np.save(staging_dir / MATRIX_FILE_NAMES["data"], np.asarray(question_matrix.data, dtype=np.float32))
+        np.save(staging_dir / MATRIX_FILE_NAMES["indices"], np.asarray(question_matrix.indices))
+        np.save(staging_dir / MATRIX_FILE_NAMES["indptr"], np.asarray(question_matrix.indptr))
+        write_json(staging_dir / VOCABULARY_FILE_NAME, list(vocabulary_terms))
+        for column_values, (offsets_file_name, text_file_name) in (
+            (questions, RECORD_FILE_NAMES["questions"]),
+            (answers, RECORD_FILE_NAMES["answers"]),
+        ):
+            offsets, text_bytes = encode_text_column(column_values)
+            np.save(staging_dir / offsets_file_name, offsets)
+            np.save(staging_dir / text_file_name, text_bytes)
+
+        manifest = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "csv_sha256": csv_sha256,
+            "tokenizer_signature": tokenizer_signature,
+            "row_count": int(question_matrix.shape[0]),
+            "term_count": int(question_matrix.shape[1]),
+            "nnz": int(question_matrix.nnz),
+            "matrix_dtype": "float32",
+            "scorer": scorer_name,
+            "scorer_params": dict(scorer_params or {}),
+            "row_normalized": scorer_name == DEFAULT_SCORER_NAME,
+            "index_version": index_version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        # manifest는 마지막에 씁니다. manifest가 있는 폴더만 완성된 색인으로 취급합니다.
+        write_json(staging_dir / MANIFEST_FILE_NAME, manifest)
+
+        try:
+            staging_dir.rename(target_dir)
+        except OSError:
+            # 다른 프로세스가 같은 CSV, 같은 설정으로 먼저 색인을 만들었으면 그 결과를 그대로 씁니다.
+            # 폴더 이름에는 CSV 해시만 들어가므로, 같은 이름으로 남은 것이 형식 버전이나 토크나이저, 점수 설정이 다른
+            # 예전 색인이면 read_index_artifact가 매번 거절합니다. 그런 폴더는 지우고 새 색인으로 바꿉니다.
+            # 예전 색인을 매핑해 둔 프로세스는 파일이 지워져도 이미 연 매핑을 그대로 읽습니다.
+            target_settings = read_build_settings(target_dir)
+            if target_settings is None:
+                raise
+            if target_settings != build_settings_of(manifest):
+                shutil.rmtree(target_dir, ignore_errors=True)
+                try:
+                    staging_dir.rename(target_dir)
+                except OSError:
+                    if read_build_settings(target_dir) != build_settings_of(manifest):
+                        raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    prune_index_versions(index_root, keep_dir=target_dir)
+    return target_dir
+
+
+# 이 함수는 오래된 해시 폴더를 최근 것 몇 개만 남기고 지웁니다. 실패해도 서비스에는 영향이 없게 조용히 넘어갑니다.
+# 점수 방식마다 따로 세므로, 한 방식의 색인을 새로 만들어도 다른 방식의 색인은 지우지 않습니다.
+def prune_index_versions(index_root, keep_dir, keep_count=KEPT_INDEX_VERSIONS):
+    scorer_name = scorer_name_of(keep_dir)
+    version_dirs = [
+        path for path in Path(index_root).iterdir()
+        if path.is_dir()
+        and not path.name.startswith(".")
+        and path != keep_dir
+        and scorer_name_of(path) == scorer_name
+    ]
+    version_dirs.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale_dir in version_dirs[max(keep_count - 1, 0):]:
+        shutil.rmtree(stale_dir, ignore_errors=True)
+
+
+# 이 함수는 CSV 해시가 맞는 색인 폴더를 찾아 읽습니다.
+# 폴더가 없거나, 형식 버전/토크나이저/점수 방식이 다르거나, 파일이 깨졌으면 None을 반환해 다시 학습하도록 합니다.
+# scorer_params를 넘기면 저장할 때 쓴 설정(예: BM25의 k1, b)까지 같아야 저장 색인을 씁니다.
+def read_index_artifact(
+    index_root,
+    csv_sha256,
+    tokenizer_signature,
+    mmap=True,
+    scorer_name=DEFAULT_SCORER_NAME,
+    scorer_params=None,
+):
+    index_dir = index_dir_for(index_root, csv_sha256, scorer_name)
+    manifest_path = index_dir / MANIFEST_FILE_NAME
+    if not manifest_path.exists():
+        return None
+
+    try:
+        manifest = read_json(manifest_path)
+        if (
+            manifest.get("format_version") != INDEX_FORMAT_VERSION
+            or manifest.get("csv_sha256") != csv_sha256
+            or manifest.get("tokenizer_signature") != tokenizer_signature
+            or manifest.get("scorer", DEFAULT_SCORER_NAME) != scorer_name
+            or (scorer_params is not None and manifest.get("scorer_params", {}) != dict(scorer_params))
+        ):
+            return None
+
+        mmap_mode = "r" if mmap else None
+        vocabulary_terms = read_json(index_dir / VOCABULARY_FILE_NAME)
+        questions, answers = (
+            TextColumn(
+                np.load(index_dir / offsets_file_name, mmap_mode=mmap_mode),
+                np.load(index_dir / text_file_name, mmap_mode=mmap_mode),
+            )
+            for offsets_file_name, text_file_name in (RECORD_FILE_NAMES["questions"], RECORD_FILE_NAMES["answers"])
+        )
+        artifact = FaqIndexArtifact(
+            index_dir=index_dir,
+            manifest=manifest,
+            vocabulary_terms=vocabulary_terms,
+            idf=np.load(index_dir / IDF_FILE_NAME, mmap_mode=mmap_mode),
+            data=np.load(index_dir / MATRIX_FILE_NAMES["data"], mmap_mode=mmap_mode),
+            indices=np.load(index_dir / MATRIX_FILE_NAMES["indices"], mmap_mode=mmap_mode),
+            indptr=np.load(index_dir / MATRIX_FILE_NAMES["indptr"], mmap_mode=mmap_mode),
+            records=FaqRecordStore(questions, answers, manifest.get("index_version")),
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+    row_count, term_count = artifact.shape
+    if (
+        len(vocabulary_terms) != term_count
+        or artifact.idf.shape[0] != term_count
+        or artifact.indptr.shape[0] != row_count + 1
+        or len(artifact.questions) != row_count
+        or len(artifact.answers) != row_count
+        or any(int(column.offsets[-1]) != column.buffer.shape[0] for column in (artifact.questions, artifact.answers))
+    ):
+        return None
+    return artifact
+
+
+# 이 함수는 manifest에서 read_index_artifact가 맞춰 보는 설정(형식 버전, CSV 해시, 토크나이저, 점수 방식과 설정)만 뽑습니다.
+def build_settings_of(manifest):
+    return (
+        manifest.get("format_version"),
+        manifest.get("csv_sha256"),
+        manifest.get("tokenizer_signature"),
+        manifest.get("scorer", DEFAULT_SCORER_NAME),
+        manifest.get("scorer_params", {}),
+    )
+
+
+# 이 함수는 색인 폴더 manifest의 설정을 읽습니다. manifest가 없거나 읽을 수 없으면 None입니다.
+def read_build_settings(index_dir):
+    try:
+        return build_settings_of(read_json(Path(index_dir) / MANIFEST_FILE_NAME))
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_json(file_path, payload):
+    with Path(file_path).open("w", encoding="utf-8") as json_file:
+        json.dump(payload, json_file, ensure_ascii=False)
+
+
+def read_json(file_path):
+    with Path(file_path).open("r", encoding="utf-8") as json_file:
+        return json.load(json_file)
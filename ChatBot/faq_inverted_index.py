@@ -0,0 +1,107 @@
+import numpy as np
+from scipy import sparse
+
+from faq_light_engine import select_top_k
+
+
+# 이 클래스는 정규화된 TF-IDF 질문 행렬을 단어별 역색인(포스팅 목록)으로 바꿔 둔 검색기입니다.
+# 질문에 나온 단어의 포스팅만 훑기 때문에, FAQ가 많아져도 질문과 관련 있는 문서만 점수를 매깁니다.
+# 단어마다 "이 단어가 줄 수 있는 최대 점수"를 미리 구해 두고, MaxScore 방식으로 상위 k개에 들 수 없는 문서를 일찍 버립니다.
+# 결과는 모든 행을 점수 매기는 기본 방식의 상위 k개와 같습니다(점수가 같으면 앞쪽 행 우선).
+class InvertedFaqIndex:
+    def __init__(self, question_matrix):
+        column_matrix = sparse.csc_matrix(question_matrix, dtype=np.float32)
+        column_matrix.sort_indices()
+        self.row_count, self.term_count = column_matrix.shape
+        self.postings_indptr = column_matrix.indptr
+        self.postings_rows = column_matrix.indices
+        self.postings_weights = column_matrix.data
+
+        # 단어별 최대 가중치입니다. 포스팅이 비어 있는 단어는 0입니다.
+        self.term_upper_bounds = np.zeros(self.term_count, dtype=np.float32)
+        non_empty_terms = np.flatnonzero(np.diff(self.postings_indptr) > 0)
+        if non_empty_terms.size:
+            self.term_upper_bounds[non_empty_terms] = np.maximum.reduceat(
+                self.postings_weights, self.postings_indptr[non_empty_terms]
+            )
+
+    def postings(self, term_id):
+        start, end = self.postings_indptr[term_id], self.postings_indptr[term_id + 1]
+        return self.postings_rows[start:end], self.postings_weights[start:end]
+
+    # 질문 벡터(단어 번호, 가중치)로 상위 k개 (행 번호, 유사도)를 구합니다.
+    #
+    # 1) 단어를 최대 기여도(질문 가중치 x 단어 최대 가중치)가 큰 순서로 정렬합니다.
+    # 2) 앞쪽 단어부터 포스팅을 더해 후보 문서를 모읍니다. 매번 후보들의 k번째 부분 점수(θ)를 구합니다.
+    # 3) 남은 단어들의 최대 기여도 합이 θ보다 작아지면, 아직 후보가 아닌 문서는 상위 k개에 들 수 없습니다.
+    #    그 뒤로는 새 후보를 만들지 않고 기존 후보의 점수만 채우며, 남은 기여도를 다 받아도 θ에 못 미치는 후보는 버립니다.
+    def top_k(self, query_term_ids, query_weights, k):
+        k = min(int(k), self.row_count)
+        if k <= 0:
+            return []
+
+        query_term_ids = np.asarray(query_term_ids, dtype=np.int64)
+        query_weights = np.asarray(query_weights, dtype=np.float64)
+        upper_bounds = query_weights * self.term_upper_bounds[query_term_ids]
+        useful_terms = upper_bounds > 0
+        query_term_ids = query_term_ids[useful_terms]
+        query_weights = query_weights[useful_terms]
+        upper_bounds = upper_bounds[useful_terms]
+
+        order = np.argsort(-upper_bounds, kind="stable")
+        query_term_ids = query_term_ids[order]
+        query_weights = query_weights[order]
+        remaining_bounds = np.append(np.cumsum(upper_bounds[order][::-1])[::-1], 0.0)
+
+        candidate_rows = np.empty(0, dtype=np.int64)
+        candidate_scores = np.empty(0, dtype=np.float64)
+        term_position = 0
+        term_total = query_term_ids.shape[0]
+
+        # 필수 단어 구간: 새 후보 문서를 모읍니다.
+        while term_position < term_total:
+            rows, weights = self.postings(query_term_ids[term_position])
+            merged_rows = np.concatenate((candidate_rows, rows))
+            merged_scores = np.concatenate((candidate_scores, weights * query_weights[term_position]))
+            candidate_rows, inverse = np.unique(merged_rows, return_inverse=True)
+            candidate_scores = np.bincount(inverse, weights=merged_scores, minlength=candidate_rows.shape[0])
+            term_position += 1
+            if remaining_bounds[term_position] < self.kth_score(candidate_scores, k):
+                break
+
+        # 선택 단어 구간: 기존 후보의 점수만 채우고, 가망 없는 후보는 버립니다.
+        while term_position < term_total and candidate_rows.shape[0]:
+            rows, weights = self.postings(query_term_ids[term_position])
+            positions = np.searchsorted(rows, candidate_rows)
+            positions[positions >= rows.shape[0]] = 0
+            found = rows[positions] == candidate_rows
+            candidate_scores[found] += weights[positions[found]] * query_weights[term_position]
+            term_position += 1
+
+            threshold = self.kth_score(candidate_scores, k)
+            keep = candidate_scores + remaining_bounds[term_position] >= threshold
+            candidate_rows = candidate_rows[keep]
+            candidate_scores = candidate_scores[keep]
+
+        ranked = [
+            (int(candidate_rows[position]), float(candidate_scores[position]))
+            for position in select_top_k(candidate_scores, k)
+        ]
+        if len(ranked) < k:
+            # 점수가 0인 문서끼리는 기본 방식처럼 앞쪽 행부터 채웁니다.
+            ranked.extend(
+                (int(row), 0.0)
+                for row in self.lowest_rows_excluding(candidate_rows, k - len(ranked))
+            )
+        return ranked
+
+    # 후보 점수들 가운데 k번째로 큰 값입니다. 후보가 k개보다 적으면 아직 아무도 버릴 수 없으므로 0입니다.
+    @staticmethod
+    def kth_score(candidate_scores, k):
+        if candidate_scores.shape[0] < k:
+            return 0.0
+        return float(np.partition(candidate_scores, candidate_scores.shape[0] - k)[candidate_scores.shape[0] - k])
+
+    def lowest_rows_excluding(self, excluded_rows, count):
+        window = np.arange(min(self.row_count, count + excluded_rows.shape[0]))
+        return np.setdiff1d(window, excluded_rows, assume_unique=True)[:count]
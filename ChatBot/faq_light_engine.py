@@ -0,0 +1,309 @@
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from faq_index_store import compute_file_sha256, default_index_root, read_index_artifact
+from faq_metrics import stage_timer
+from faq_tokenizer import TOKENIZER_SIGNATURE, tokenize_korean_text
+
+
+FALLBACK_ANSWER = "죄송합니다. 해당 내용은 고객센터(1588-0000)로 문의해 주시거나 다른 검색어를 입력해 주세요."
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_TOP_K = 3
+# 점수 계산 방식 이름입니다. 기본은 TF-IDF 코사인 유사도이고, get_scorer로 BM25를 고를 수 있습니다.
+TFIDF_SCORER = "tfidf"
+BM25_SCORER = "bm25"
+
+
+# 이 함수는 유사도 점수 배열에서 점수가 가장 높은 k개의 위치를 점수 내림차순으로 반환합니다.
+# 전체를 정렬하지 않고 k번째 점수만 부분 선택으로 찾은 뒤, 그 안쪽 후보만 정렬합니다.
+# 점수가 같으면 앞쪽 FAQ가 먼저 오도록 해서 argmax와 같은 결과를 보장합니다.
+def select_top_k(similarity_scores, top_k):
+    total_count = similarity_scores.shape[0]
+    top_k = min(int(top_k), total_count)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    kth_score = np.partition(similarity_scores, total_count - top_k)[total_count - top_k]
+    above_indices = np.flatnonzero(similarity_scores > kth_score)
+    tied_indices = np.flatnonzero(similarity_scores == kth_score)[: top_k - above_indices.size]
+    candidate_indices = np.concatenate((above_indices, tied_indices))
+
+    order = np.lexsort((candidate_indices, -similarity_scores[candidate_indices]))
+    return candidate_indices[order]
+
+
+# 이 함수는 FAQ 질문/답변 내용으로 색인 버전 문자열을 만듭니다.
+# 내용이 한 글자라도 바뀌면 버전이 달라지므로, 답변 캐시가 예전 색인의 결과를 돌려주지 않게 막는 기준이 됩니다.
+# 같은 FAQ라도 점수 방식이 다르면 점수가 다르므로, 기본이 아닌 점수 방식은 이름과 설정도 함께 넣습니다.
+def compute_index_version(questions, answers, scorer=None):
+    digest = hashlib.sha256()
+    if scorer is not None and scorer.name != TFIDF_SCORER:
+        digest.update(repr((scorer.name, sorted(scorer.params.items()))).encode("utf-8"))
+    for question, answer in zip(questions, answers):
+        digest.update(str(question).encode("utf-8"))
+        digest.update(b"\x1f")
+        digest.update(str(answer).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:16]
+
+
+# 이 클래스는 (행 번호, 유사도) 검색 결과를 get_chatbot_response 형태의 답변으로 바꾸는 공통 부분입니다.
+# FaqSearchEngine과 LightFaqEngine이 함께 써서, 어느 엔진으로 답해도 답변 딕셔너리 모양이 같습니다.
+# 상속하는 클래스는 questions, answers, index_version을 갖고 있어야 합니다.
+class FaqResponseBuilder:
+    # 검색 결과 (행 번호, 유사도) 목록을 화면과 로그에서 쓰는 후보 딕셔너리 목록으로 바꿉니다.
+    def build_top_matches(self, ranked_matches):
+        if self.questions is None:
+            raise ValueError("FAQ 질문/답변이 연결되지 않은 검색 엔진입니다.")
+        return [
+            {
+                "row_id": index,
+                "question": self.questions[index],
+                "answer": self.answers[index],
+                "similarity_score": similarity_score,
+            }
+            for index, similarity_score in ranked_matches
+        ]
+
+    # 정렬된 검색 결과와 기준 점수로 최종 답변 딕셔너리를 조립합니다.
+    def build_response(self, ranked_matches, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K):
+        with stage_timer("build_response"):
+            return self._build_response(ranked_matches, threshold, top_k)
+
+    def _build_response(self, ranked_matches, threshold, top_k):
+        best_match_index, best_match_score = ranked_matches[0]
+        top_matches = self.build_top_matches(ranked_matches[:top_k])
+
+        if best_match_score < threshold:
+            return {
+                "matched_question": None,
+                "matched_row_id": None,
+                "similarity_score": best_match_score,
+                "top_matches": top_matches,
+                "answer": FALLBACK_ANSWER,
+                "index_version": self.index_version,
+            }
+
+        return {
+            "matched_question": self.questions[best_match_index],
+            "matched_row_id": best_match_index,
+            "similarity_score": best_match_score,
+            "top_matches": top_matches,
+            "answer": self.answers[best_match_index],
+            "index_version": self.index_version,
+        }
+
+
+# 이 클래스는 TF-IDF 질문 가중치(단어 빈도 x IDF, L2 정규화)를 만듭니다. TfidfCosineScorer.transform_tokens와 같은 값입니다.
+class TfidfQueryWeights:
+    name = TFIDF_SCORER
+
+    @property
+    def params(self):
+        return {}
+
+    def weigh(self, term_counts, term_idf):
+        weights = term_counts * term_idf
+        norm = np.sqrt(np.dot(weights, weights))
+        return weights / norm if norm else weights
+
+
+# 이 클래스는 BM25 질문 가중치(나온 단어의 IDF / 전체 합 x (k1+1))를 만듭니다. Bm25Scorer.transform_tokens와 같은 값입니다.
+# 문서 길이 보정(b)은 저장 색인의 문서 행렬에 이미 들어 있어서, 질문 쪽에는 k1만 필요합니다.
+class Bm25QueryWeights:
+    name = BM25_SCORER
+
+    def __init__(self, k1, b):
+        self.k1 = k1
+        self.b = b
+
+    @property
+    def params(self):
+        return {"k1": self.k1, "b": self.b}
+
+    def weigh(self, term_counts, term_idf):
+        total = float(term_idf.sum()) * (self.k1 + 1)
+        return term_idf / np.float32(total) if total else term_idf
+
+
+# 이 함수는 저장 색인 manifest의 점수 방식 이름과 설정으로 질문 가중치 계산기를 고릅니다.
+def make_query_weights(scorer_name, scorer_params=None):
+    scorer_params = scorer_params or {}
+    if scorer_name == TFIDF_SCORER:
+        return TfidfQueryWeights()
+    if scorer_name == BM25_SCORER:
+        return Bm25QueryWeights(k1=scorer_params["k1"], b=scorer_params["b"])
+    raise ValueError(f"알 수 없는 점수 방식입니다: {scorer_name}")
+
+
+# 이 클래스는 저장된 색인만으로 질문에 답하는 서비스 전용 검색 엔진입니다.
+# NumPy와 표준 라이브러리만 쓰므로 pandas, scipy, scikit-learn을 불러오지 않고, 콘솔 챗봇이나 짧게 도는 작업자가 바로 뜹니다.
+# 점수는 FaqSearchEngine의 기본 방식과 같은 희소 내적입니다. CSR 배열의 값마다 질문 가중치를 곱하고 행별로 더합니다.
+# 색인을 새로 학습하거나 다른 검색 방식(inverted, lsh)을 쓰려면 faq_chatbot의 FaqSearchEngine을 씁니다.
+class LightFaqEngine(FaqResponseBuilder):
+    def __init__(
+        self,
+        vocabulary,
+        idf,
+        data,
+        indices,
+        indptr,
+        shape,
+        questions,
+        answers,
+        scorer_name=TFIDF_SCORER,
+        scorer_params=None,
+        index_version=None,
+    ):
+        row_count, term_count = shape
+        if len(questions) != row_count or len(answers) != row_count:
+            raise ValueError("FAQ 데이터 행 수와 질문 행렬의 행 수가 다릅니다.")
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = (row_count, term_count)
+        self.questions = questions
+        self.answers = answers
+        self.query_weights = make_query_weights(scorer_name, scorer_params)
+        self.index_version = index_version or compute_index_version(questions, answers, self.query_weights)
+        # 저장 값마다 어느 FAQ 행에 속하는지 적어 둔 배열입니다. 질문마다 행별 합계를 bincount 한 번으로 구합니다.
+        self._row_ids = np.repeat(np.arange(row_count, dtype=np.int32), np.diff(indptr))
+
+    # 디스크에서 읽은 색인 묶음(FaqIndexArtifact)으로 엔진을 만듭니다. 행렬 배열과 질문/답변 열은 메모리 매핑된 그대로 씁니다.
+    @classmethod
+    def from_artifact(cls, artifact):
+        return cls(
+            vocabulary={term: column for column, term in enumerate(artifact.vocabulary_terms)},
+            idf=artifact.idf,
+            data=artifact.data,
+            indices=artifact.indices,
+            indptr=artifact.indptr,
+            shape=artifact.shape,
+            questions=artifact.questions,
+            answers=artifact.answers,
+            scorer_name=artifact.manifest.get("scorer", TFIDF_SCORER),
+            scorer_params=artifact.scorer_params,
+            index_version=artifact.index_version,
+        )
+
+    @property
+    def row_count(self):
+        return self.shape[0]
+
+    # 사용자 질문 하나를 (단어 열 번호 배열, 질문 가중치 배열)로 바꿉니다. 어휘에 없는 토큰은 버립니다.
+    def transform_query(self, user_question):
+        with stage_timer("tokenize"):
+            tokens = tokenize_korean_text(user_question)
+        with stage_timer("vectorize"):
+            term_counts = {}
+            for token in tokens:
+                column_id = self.vocabulary.get(token)
+                if column_id is not None:
+                    term_counts[column_id] = term_counts.get(column_id, 0) + 1
+            column_ids = np.fromiter(sorted(term_counts), dtype=np.int64, count=len(term_counts))
+            counts = np.array([term_counts[column_id] for column_id in column_ids.tolist()], dtype=np.float32)
+            return column_ids, self.query_weights.weigh(counts, self.idf[column_ids])
+
+    # 사용자 질문 하나와 모든 FAQ의 유사도 배열을 반환합니다. 어휘와 겹치는 단어가 없으면 모두 0입니다.
+    def score(self, user_question):
+        column_ids, weights = self.transform_query(user_question)
+        with stage_timer("score"):
+            if column_ids.size == 0:
+                return np.zeros(self.row_count, dtype=np.float32)
+            dense_query = np.zeros(self.shape[1], dtype=np.float32)
+            dense_query[column_ids] = weights
+            products = self.data * dense_query[self.indices]
+            return np.bincount(self._row_ids, weights=products, minlength=self.row_count).astype(np.float32)
+
+    # 질문 하나에 대해 (FAQ 행 번호, 유사도) 쌍을 유사도가 높은 순서로 최대 k개 반환합니다.
+    def search(self, user_question, k=DEFAULT_TOP_K):
+        similarity_scores = self.score(user_question)
+        with stage_timer("rank"):
+            return [
+                (int(index), float(similarity_scores[index]))
+                for index in select_top_k(similarity_scores, k)
+            ]
+
+    # get_chatbot_response와 같은 형태의 답변을 검색 한 번으로 만듭니다.
+    def respond(self, user_question, threshold=DEFAULT_THRESHOLD, top_k=DEFAULT_TOP_K):
+        ranked_matches = self.search(user_question, max(top_k, 1))
+        return self.build_response(ranked_matches, threshold=threshold, top_k=top_k)
+
+
+# 이 함수는 CSV 옆의 저장 색인을 읽어 LightFaqEngine을 만듭니다.
+# 색인이 없거나 CSV, 토크나이저가 바뀌었을 때만 faq_chatbot을 불러와 학습하고 색인을 저장하므로, 무거운 import는 그때 한 번만 일어납니다.
+# 색인 저장에 실패한 경우에도 방금 학습한 결과로 엔진을 만들어 돌려줍니다.
+def load_light_engine(csv_path="faq_data.csv", index_root=None, scorer=TFIDF_SCORER):
+    if scorer not in (TFIDF_SCORER, BM25_SCORER):
+        raise ValueError(f"알 수 없는 점수 방식입니다: {scorer}")
+    artifact = read_index_artifact(
+        index_root or default_index_root(csv_path),
+        csv_sha256=compute_file_sha256(csv_path),
+        tokenizer_signature=TOKENIZER_SIGNATURE,
+        scorer_name=scorer,
+    )
+    if artifact is not None:
+        return LightFaqEngine.from_artifact(artifact)
+
+    from faq_chatbot import get_search_engine, get_vocabulary, initialize_chatbot_engine
+
+    faq_df, vectorizer, question_matrix = initialize_chatbot_engine(csv_path, index_root=index_root, scorer=scorer)
+    engine = get_search_engine(vectorizer, question_matrix, faq_df)
+    return LightFaqEngine(
+        vocabulary=get_vocabulary(vectorizer),
+        idf=vectorizer.idf_,
+        data=engine.question_matrix.data,
+        indices=engine.question_matrix.indices,
+        indptr=engine.question_matrix.indptr,
+        shape=engine.question_matrix.shape,
+        questions=engine.questions,
+        answers=engine.answers,
+        scorer_name=engine.scorer.name,
+        scorer_params=engine.scorer.params,
+        index_version=engine.index_version,
+    )
+
+
+# 이 함수는 프로그램을 실행했을 때 사용자가 직접 질문을 입력하고 답변을 받도록 만드는 대화 루프입니다.
+# exit, quit, 종료 중 하나를 입력하면 프로그램을 끝냅니다.
+# 저장 색인이 있으면 pandas, scikit-learn 없이 시작하므로 첫 질문까지 기다리는 시간이 짧습니다.
+def run_chatbot(csv_path="faq_data.csv"):
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        raise FileNotFoundError(
+            "faq_data.csv 파일이 없습니다. 먼저 create_faq_data.py를 실행해 FAQ 데이터를 생성해 주세요."
+        )
+
+    engine = load_light_engine(csv_path)
+
+    print("가이드매칭 Support FAQ 챗봇입니다.")
+    print("질문을 입력해 주세요. 종료하려면 'exit', 'quit', '종료' 중 하나를 입력하세요.\n")
+
+    while True:
+        user_question = input("사용자 질문: ").strip()
+
+        if user_question.lower() in {"exit", "quit", "종료"}:
+            print("챗봇을 종료합니다.")
+            break
+
+        if not user_question:
+            print("질문이 비어 있습니다. 내용을 입력해 주세요.\n")
+            continue
+
+        response = engine.respond(user_question)
+
+        if response["matched_question"] is not None:
+            print(f"가장 유사한 질문: {response['matched_question']}")
+            print(f"유사도 점수: {response['similarity_score']:.3f}")
+        else:
+            print(f"유사도 점수: {response['similarity_score']:.3f}")
+
+        print(f"챗봇 답변: {response['answer']}\n")
+
+
+if __name__ == "__main__":
+    run_chatbot()
@@ -0,0 +1,141 @@
+from itertools import islice
+
+import numpy as np
+
+from faq_light_engine import select_top_k
+
+
+DEFAULT_TABLE_COUNT = 8
+DEFAULT_BITS_PER_TABLE = 12
+DEFAULT_PROBE_BITS = 2
+DEFAULT_MAX_CANDIDATES = 20000
+# 서명을 계산할 때 한 번에 처리하는 행 수입니다. (행 수 x 전체 비트 수) 임시 배열이 너무 커지지 않게 합니다.
+SIGNATURE_CHUNK_ROWS = 65536
+
+
+# 이 클래스는 TF-IDF 벡터를 무작위 초평면(SimHash)으로 여러 해시 테이블에 나눠 담는 근사 검색기입니다.
+# 질문과 같은 칸(버킷)에 떨어진 문서만 후보로 삼고, 후보는 원래 코사인 유사도로 다시 정확하게 점수 매깁니다.
+# 정확도와 속도는 다음 값으로 조절합니다.
+# - table_count, bits_per_table(만들 때): 테이블이 많을수록 재현율이 오르고, 비트가 많을수록 버킷이 작아집니다.
+# - probe_bits(검색할 때): 테이블마다 확신이 낮은 비트를 몇 개까지 하나씩 뒤집어 옆 버킷도 볼지 정합니다.
+# - max_candidates(검색할 때): 다시 점수 매길 행 수의 상한입니다. 지연 시간의 상한이 됩니다.
+class LshFaqIndex:
+    def __init__(
+        self,
+        question_matrix,
+        table_count=DEFAULT_TABLE_COUNT,
+        bits_per_table=DEFAULT_BITS_PER_TABLE,
+        probe_bits=DEFAULT_PROBE_BITS,
+        max_candidates=DEFAULT_MAX_CANDIDATES,
+        seed=0,
+    ):
+        if not 1 <= bits_per_table <= 31:
+            raise ValueError("bits_per_table은 1~31 사이여야 합니다.")
+        self.question_matrix = question_matrix
+        self.row_count, self.term_count = question_matrix.shape
+        self.table_count = table_count
+        self.bits_per_table = bits_per_table
+        self.probe_bits = probe_bits
+        self.max_candidates = max_candidates
+
+        rng = np.random.default_rng(seed)
+        self.projections = rng.standard_normal(
+            (self.term_count, table_count * bits_per_table), dtype=np.float32
+        )
+        self.bit_weights = (1 << np.arange(bits_per_table, dtype=np.int64)).astype(np.int64)
+
+        signatures = self.compute_signatures()
+        self.bucket_keys = []
+        self.bucket_starts = []
+        self.bucket_rows = []
+        for table in range(table_count):
+            table_keys = signatures[:, table]
+            order = np.argsort(table_keys, kind="stable")
+            sorted_keys = table_keys[order]
+            unique_keys, starts = np.unique(sorted_keys, return_index=True)
+            self.bucket_keys.append(unique_keys)
+            self.bucket_starts.append(np.append(starts, sorted_keys.shape[0]))
+            self.bucket_rows.append(order.astype(np.int64))
+
+    # 모든 행의 테이블별 버킷 번호(비트 묶음)를 구합니다. 큰 말뭉치도 메모리가 넘치지 않게 나눠서 계산합니다.
+    def compute_signatures(self):
+        signatures = np.empty((self.row_count, self.table_count), dtype=np.int64)
+        for start in range(0, self.row_count, SIGNATURE_CHUNK_ROWS):
+            end = min(start + SIGNATURE_CHUNK_ROWS, self.row_count)
+            projected = np.asarray(self.question_matrix[start:end] @ self.projections)
+            signatures[start:end] = self.pack_bits(projected > 0)
+        return signatures
+
+    # (행 수 x 전체 비트) 불리언 배열을 테이블별 정수 버킷 번호로 묶습니다.
+    def pack_bits(self, bits):
+        bits = bits.reshape(bits.shape[0], self.table_count, self.bits_per_table)
+        return bits.astype(np.int64) @ self.bit_weights
+
+    # 질문이 떨어지는 버킷과, 확신이 낮은 비트를 뒤집은 이웃 버킷의 번호를 테이블별로 만듭니다.
+    def probe_keys(self, projected_query):
+        projected_query = projected_query.reshape(self.table_count, self.bits_per_table)
+        base_keys = (projected_query > 0).astype(np.int64) @ self.bit_weights
+        probe_keys = [base_keys]
+        if self.probe_bits > 0:
+            uncertain_bits = np.argsort(np.abs(projected_query), axis=1)[:, : self.probe_bits]
+            for probe in range(uncertain_bits.shape[1]):
+                probe_keys.append(base_keys ^ self.bit_weights[uncertain_bits[:, probe]])
+        return probe_keys
+
+    # 버킷 번호로 그 버킷에 담긴 행 번호 배열을 꺼냅니다. 없는 버킷이면 빈 배열입니다.
+    def bucket(self, table, key):
+        position = np.searchsorted(self.bucket_keys[table], key)
+        if position >= self.bucket_keys[table].shape[0] or self.bucket_keys[table][position] != key:
+            return self.bucket_rows[table][:0]
+        start, end = self.bucket_starts[table][position], self.bucket_starts[table][position + 1]
+        return self.bucket_rows[table][start:end]
+
+    # 질문과 같은 버킷에 들어간 행들을 모읍니다. 상한을 넘으면 여러 테이블에서 자주 겹친 행부터 남깁니다.
+    def candidate_rows(self, query_term_ids, query_weights):
+        dense_query = np.zeros(self.term_count, dtype=np.float32)
+        dense_query[query_term_ids] = query_weights
+        projected_query = self.projections[query_term_ids].T @ np.asarray(query_weights, dtype=np.float32)
+
+        collected = []
+        collected_count = 0
+        for keys in self.probe_keys(projected_query):
+            for table in range(self.table_count):
+                rows = self.bucket(table, keys[table])
+                collected.append(rows)
+                collected_count += rows.shape[0]
+            if collected_count >= self.max_candidates:
+                break
+        if not collected_count:
+            return np.empty(0, dtype=np.int64), dense_query
+        candidates, collision_counts = np.unique(np.concatenate(collected), return_counts=True)
+        if candidates.shape[0] > self.max_candidates:
+            keep = np.argpartition(-collision_counts, self.max_candidates - 1)[: self.max_candidates]
+            candidates = np.sort(candidates[keep])
+        return candidates, dense_query
+
+    # 후보 행만 원래 코사인 유사도로 다시 계산해 상위 k개 (행 번호, 유사도)를 반환합니다.
+    def top_k(self, query_term_ids, query_weights, k):
+        return self.top_k_with_stats(query_term_ids, query_weights, k)[0]
+
+    # top_k와 같지만, 실제로 다시 점수 매긴 행 수도 함께 돌려줍니다. 재현율/비용 보고서에서 씁니다.
+    def top_k_with_stats(self, query_term_ids, query_weights, k):
+        k = min(int(k), self.row_count)
+        if k <= 0:
+            return [], 0
+        query_term_ids = np.asarray(query_term_ids, dtype=np.int64)
+        candidates, dense_query = self.candidate_rows(query_term_ids, query_weights)
+
+        ranked = []
+        if candidates.shape[0]:
+            candidate_scores = self.question_matrix[candidates].dot(dense_query)
+            ranked = [
+                (int(candidates[position]), float(candidate_scores[position]))
+                for position in select_top_k(candidate_scores, k)
+            ]
+        if len(ranked) < k:
+            # 후보가 모자라면 기본 방식처럼 점수 0인 앞쪽 행으로 채웁니다.
+            seen_rows = {row for row, _ in ranked}
+            ranked.extend(
+                islice(((row, 0.0) for row in range(self.row_count) if row not in seen_rows), k - len(ranked))
+            )
+        return ranked, int(candidates.shape[0])
@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+
+# 단계별 지연 시간 히스토그램의 칸 경계(초)입니다. 토큰화처럼 수 마이크로초 걸리는 단계부터 화면 그리기까지 담습니다.
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_METRICS_FILE_INTERVAL_SECONDS = 15.0
+
+
+# 이 함수는 라벨 값을 Prometheus 텍스트 형식에 맞게 이스케이프합니다.
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(label_names, label_values, extra_labels=()):
+    pairs = [*zip(label_names, label_values), *extra_labels]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# 이 클래스는 계속 늘어나기만 하는 카운터입니다. 라벨 값 조합마다 따로 셉니다.
+class Counter:
+    metric_type = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.label_names:
+            values = [((), 0)]
+        return [
+            f"{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}"
+            for label_values, value in values
+        ]
+
+
+# 이 클래스는 오르내리는 현재 값(상주 세션 수, 메모리 사용량 등)을 담는 게이지입니다. 라벨 값 조합마다 따로 기억합니다.
+class Gauge:
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.label_names:
+            values = [((), 0)]
+        return [
+            f"{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}"
+            for label_values, value in values
+        ]
+
+
+# 이 클래스는 관측값을 정해진 칸에 세는 히스토그램입니다. 칸별 개수, 합계, 전체 개수를 라벨 값 조합마다 기억합니다.
+# 관측 한 번은 잠금 한 번과 이분 탐색 한 번이라, 답변 경로에서 매번 불러도 부담이 작습니다.
+class Histogram:
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        bucket_index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][bucket_index] += 1
+            series[1] += value
+            series[2] += 1
+
+    # (관측 수, 합계)를 반환합니다. 테스트나 벤치마크에서 평균을 볼 때 씁니다.
+    def totals(self, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted(
+                (label_values, list(bucket_counts), total, count)
+                for label_values, (bucket_counts, total, count) in self._series.items()
+            )
+        lines = []
+        for label_values, bucket_counts, total, count in snapshot:
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative_count += bucket_count
+                bucket_labels = format_labels(self.label_names, label_values, (("le", format_value(upper_bound)),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative_count}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# 이 클래스는 프로세스 안의 지표들을 모아 Prometheus 텍스트 형식으로 내보냅니다.
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"이미 등록된 지표 이름입니다: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=STAGE_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "faq_stage_seconds",
+    "Time spent in each stage of the FAQ answer path.",
+    label_names=("stage",),
+)
+REQUEST_SECONDS = registry.histogram(
+    "faq_request_seconds",
+    "End-to-end answer time (get_chatbot_response or BilingualFaqEngine.respond), including cache hits.",
+)
+REQUESTS_TOTAL = registry.counter("faq_requests_total", "Questions answered, including cache hits.")
+BELOW_THRESHOLD_TOTAL = registry.counter(
+    "faq_below_threshold_total",
+    "Answers that fell below the similarity threshold and returned the fallback message.",
+)
+CACHE_HITS_TOTAL = registry.counter("faq_response_cache_hits_total", "Response cache hits.")
+CACHE_MISSES_TOTAL = registry.counter("faq_response_cache_misses_total", "Response cache misses.")
+
+
+# 이 클래스는 with 블록 하나의 실행 시간을 faq_stage_seconds{stage=...}에 기록합니다.
+# contextlib.contextmanager보다 가벼운 클래스 방식이라, 수 마이크로초짜리 단계에 써도 측정 비용이 작습니다.
+class StageTimer:
+    __slots__ = ("stage", "started_at")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.started_at = 0.0
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started_at, self.stage)
+        return False
+
+
+def stage_timer(stage):
+    return StageTimer(stage)
+
+
+def render_metrics():
+    return registry.render()
+
+
+# 이 함수는 현재 지표를 파일에 씁니다. 임시 파일에 쓴 뒤 이름을 바꾸므로, 읽는 쪽(node_exporter textfile 등)은 반쯤 쓴 파일을 보지 않습니다.
+def write_metrics_file(metrics_path):
+    metrics_path = Path(metrics_path)
+    metrics_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = metrics_path.with_name(metrics_path.name + f".tmp-{os.getpid()}")
+    temporary_path.write_text(render_metrics(), encoding="utf-8")
+    os.replace(temporary_path, metrics_path)
+
+
+# 이 함수는 interval초마다 지표 파일을 다시 쓰는 백그라운드 스레드를 시작합니다. 멈출 때 쓸 Event를 반환합니다.
+def start_metrics_file_writer(metrics_path, interval=DEFAULT_METRICS_FILE_INTERVAL_SECONDS):
+    stop_event = threading.Event()
+
+    def write_loop():
+        while not stop_event.wait(interval):
+            try:
+                write_metrics_file(metrics_path)
+            except OSError:
+                continue
+
+    threading.Thread(target=write_loop, name="faq-metrics-file", daemon=True).start()
+    return stop_event
+
+
+# 이 함수는 /metrics 요청을 처리하는 핸들러 클래스를 만듭니다.
+# http.server는 불러오는 데만 수십 ms가 걸리므로, 서버를 실제로 띄울 때만 불러와 지표 모듈 import를 가볍게 둡니다.
+def make_metrics_request_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # Prometheus가 몇 초마다 긁어 가므로, 요청마다 표준 오류에 접근 로그를 남기지 않습니다.
+        def log_message(self, format, *args):
+            return
+
+    return MetricsRequestHandler
+
+
+# 이 함수는 /metrics를 제공하는 작은 HTTP 서버를 백그라운드 스레드에서 시작하고 서버 객체를 반환합니다.
+# 기본으로 127.0.0.1에만 열어, 같은 기계에서 도는 Prometheus만 긁어 갈 수 있게 합니다.
+def start_metrics_server(port, host="127.0.0.1"):
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), make_metrics_request_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="faq-metrics-http", daemon=True).start()
+    return server
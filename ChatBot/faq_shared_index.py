@@ -0,0 +1,261 @@
+import atexit
+import os
+import re
+import threading
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from faq_chatbot import (
+    SCORERS,
+    TOKENIZER_SIGNATURE,
+    FaqSearchEngine,
+    get_search_engine,
+    register_search_engine,
+)
+from faq_index_store import TextColumn, encode_text_column
+
+
+SHARED_INDEX_FORMAT_VERSION = 1
+SHARED_MEMORY_NAME_PREFIX = "faqidx-"
+# 배열마다 시작 위치를 이 크기의 배수로 맞춥니다. 캐시 줄 경계에 맞춰 두면 numpy가 읽을 때 손해가 없습니다.
+ARRAY_ALIGNMENT = 64
+SMAPS_ROLLUP_PATH = "/proc/{pid}/smaps_rollup"
+SMAPS_FIELD_PATTERN = re.compile(r"^(\w+):\s+(\d+) kB$")
+
+# 이 프로세스가 붙어 있는 공유 메모리 블록입니다. SharedFaqIndex를 버려도 엔진이 get_search_engine 캐시 등에 남아 있을 수 있으므로,
+# 블록 객체가 가비지 컬렉션되며 스스로 닫히지 않도록 close()가 성공할 때까지 여기서 붙잡아 둡니다.
+_attached_blocks = {}
+_attached_blocks_lock = threading.Lock()
+
+
+# 이 함수는 프로세스가 끝날 때 붙어 있던 블록을 닫습니다. 아직 배열이 남아 있어 닫을 수 없는 블록은
+# 핸들만 떼어 내, 종료 중 SharedMemory.__del__이 같은 BufferError를 다시 내지 않게 합니다. 매핑은 운영체제가 정리합니다.
+def _release_attached_blocks():
+    with _attached_blocks_lock:
+        shared_blocks = list(_attached_blocks.values())
+        _attached_blocks.clear()
+    for shared_block in shared_blocks:
+        try:
+            shared_block.close()
+        except BufferError:
+            shared_block._buf = shared_block._mmap = None
+
+
+atexit.register(_release_attached_blocks)
+
+
+# 이 함수는 배열들을 공유 메모리 한 덩어리 안에 놓을 위치를 정합니다. 결과는 {이름: [시작 위치, dtype, 모양]}과 전체 크기입니다.
+def plan_layout(arrays):
+    layout = {}
+    offset = 0
+    for array_name, array in arrays.items():
+        offset = -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+        layout[array_name] = [offset, array.dtype.str, list(array.shape)]
+        offset += array.nbytes
+    return layout, max(offset, 1)
+
+
+# 이 함수는 이 프로세스가 붙기만 한(만들지 않은) 공유 메모리를 엽니다.
+# Python 3.13 전에는 여는 쪽도 블록을 resource_tracker에 등록해, 그 추적기가 끝날 때 블록을 지워 버립니다.
+# multiprocessing으로 띄운 작업 프로세스는 부모의 추적기를 함께 쓰므로 그대로 두고,
+# 따로 실행된 프로세스처럼 자기 추적기를 새로 띄우는 경우에만 추적 목록에서 빼 둡니다.
+def open_shared_memory(shm_name):
+    try:
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        pass
+    shares_parent_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is not None
+    shared_block = shared_memory.SharedMemory(name=shm_name)
+    if not shares_parent_tracker:
+        resource_tracker.unregister(shared_block._name, "shared_memory")
+    return shared_block
+
+
+# 이 클래스는 색인을 공유 메모리에 올린 부모 프로세스가 쥐고 있는 소유권입니다.
+# descriptor(JSON으로 옮길 수 있는 사전)를 작업 프로세스에 넘기면, 작업 프로세스는 attach_shared_index로 복사 없이 붙습니다.
+# close()는 블록을 닫고 지웁니다(unlink). 이미 붙어 있는 작업 프로세스는 자기가 닫을 때까지 계속 읽을 수 있습니다.
+class SharedFaqIndexOwner:
+    def __init__(self, shared_block, descriptor):
+        self.shared_block = shared_block
+        self.descriptor = descriptor
+        self._closed = False
+        self._close_lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def size_bytes(self):
+        return self.descriptor["size"]
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.shared_block.close()
+        try:
+            self.shared_block.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+# 이 함수는 학습이 끝난 색인(CSR 배열, IDF, 어휘, 질문/답변 문자열)을 공유 메모리 한 덩어리에 올립니다.
+# 부모 프로세스에서 한 번만 부르고, 돌려받은 소유권 객체의 descriptor를 작업 프로세스들에 나눠 줍니다.
+def publish_shared_index(faq_df, vectorizer, question_matrix, shm_name=None):
+    engine = get_search_engine(vectorizer, question_matrix, faq_df)
+    prepared_matrix = engine.question_matrix
+    question_offsets, question_bytes = encode_text_column(engine.questions)
+    answer_offsets, answer_bytes = encode_text_column(engine.answers)
+    term_offsets, term_bytes = encode_text_column(vectorizer.get_feature_names_out().tolist())
+    arrays = {
+        "data": np.asarray(prepared_matrix.data, dtype=np.float32),
+        "indices": np.asarray(prepared_matrix.indices),
+        "indptr": np.asarray(prepared_matrix.indptr),
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+        "question_offsets": question_offsets,
+        "question_bytes": question_bytes,
+        "answer_offsets": answer_offsets,
+        "answer_bytes": answer_bytes,
+        "term_offsets": term_offsets,
+        "term_bytes": term_bytes,
+    }
+    layout, size = plan_layout(arrays)
+
+    shm_name = shm_name or f"{SHARED_MEMORY_NAME_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    shared_block = shared_memory.SharedMemory(name=shm_name, create=True, size=size)
+    try:
+        for array_name, array in arrays.items():
+            offset, dtype, shape = layout[array_name]
+            target = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_block.buf, offset=offset)
+            target[...] = array
+            del target
+    except BaseException:
+        shared_block.close()
+        shared_block.unlink()
+        raise
+
+    descriptor = {
+        "format_version": SHARED_INDEX_FORMAT_VERSION,
+        "shm_name": shared_block.name,
+        "size": size,
+        "layout": layout,
+        "shape": list(prepared_matrix.shape),
+        "scorer": engine.scorer.name,
+        "scorer_params": engine.scorer.params,
+        "index_version": engine.index_version,
+        "tokenizer_signature": TOKENIZER_SIGNATURE,
+        "owner_pid": os.getpid(),
+    }
+    return SharedFaqIndexOwner(shared_block, descriptor)
+
+
+# 이 클래스는 작업 프로세스가 공유 메모리 색인에 읽기 전용으로 붙은 결과입니다.
+# 행렬, IDF, 질문/답변은 모두 공유 메모리를 그대로 가리키는 뷰이고, 프로세스마다 따로 만드는 것은 어휘 사전(단어 -> 열 번호)뿐입니다.
+# faq_df 자리에는 None을 쓰며, as_triple()의 결과를 get_chatbot_response 등 기존 함수에 그대로 넘길 수 있습니다.
+class SharedFaqIndex:
+    def __init__(self, shared_block, descriptor, engine, vectorizer, question_matrix, questions, answers):
+        self.shared_block = shared_block
+        self.descriptor = descriptor
+        self.engine = engine
+        self.vectorizer = vectorizer
+        self.question_matrix = question_matrix
+        self.questions = questions
+        self.answers = answers
+        self._closed = False
+
+    @property
+    def index_version(self):
+        return self.descriptor["index_version"]
+
+    def as_triple(self):
+        return None, self.vectorizer, self.question_matrix
+
+    # 공유 메모리를 가리키는 뷰를 모두 놓은 뒤 블록을 닫습니다. 블록을 지우는(unlink) 것은 부모 프로세스의 몫입니다.
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.engine = self.vectorizer = self.question_matrix = self.questions = self.answers = None
+        try:
+            self.shared_block.close()
+        except BufferError:
+            # 다른 곳(예: get_search_engine 캐시의 엔진)이 아직 배열을 쥐고 있으면 매핑을 풀 수 없습니다.
+            # 블록은 _attached_blocks에 남겨 두고, 프로세스가 끝날 때 운영체제가 정리합니다.
+            return
+        with _attached_blocks_lock:
+            _attached_blocks.pop(id(self.shared_block), None)
+
+
+# 이 함수는 descriptor가 가리키는 공유 메모리 색인에 붙어 검색 엔진을 만듭니다. 배열은 복사하지 않습니다.
+# 토크나이저 규칙이 다른 코드에서 만든 색인이면 어휘가 맞지 않으므로 ValueError를 올립니다.
+def attach_shared_index(descriptor):
+    if descriptor.get("format_version") != SHARED_INDEX_FORMAT_VERSION:
+        raise ValueError("공유 색인 형식 버전이 다릅니다.")
+    if descriptor.get("tokenizer_signature") != TOKENIZER_SIGNATURE:
+        raise ValueError("공유 색인을 만든 토크나이저 규칙이 현재 코드와 다릅니다.")
+
+    shared_block = open_shared_memory(descriptor["shm_name"])
+    with _attached_blocks_lock:
+        _attached_blocks[id(shared_block)] = shared_block
+    # np.ndarray(buffer=...)와 달리 np.frombuffer는 버퍼를 빌린 채로 유지합니다.
+    # 그래서 배열이 하나라도 살아 있는 동안에는 shared_block.close()가 매핑을 풀지 못하고 BufferError로 멈춥니다.
+    arrays = {}
+    for array_name, (offset, dtype, shape) in descriptor["layout"].items():
+        element_count = int(np.prod(shape))
+        array = np.frombuffer(shared_block.buf, dtype=np.dtype(dtype), count=element_count, offset=offset).reshape(shape)
+        array.flags.writeable = False
+        arrays[array_name] = array
+
+    row_count, term_count = descriptor["shape"]
+    question_matrix = sparse.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=(row_count, term_count),
+        copy=False,
+    )
+    terms = TextColumn(arrays["term_offsets"], arrays["term_bytes"])
+    scorer = SCORERS[descriptor["scorer"]](**descriptor["scorer_params"])
+    vectorizer = scorer.make_vectorizer(vocabulary={term: column for column, term in enumerate(terms)})
+    vectorizer.idf_ = arrays["idf"]
+
+    engine = FaqSearchEngine(vectorizer, question_matrix)
+    questions = TextColumn(arrays["question_offsets"], arrays["question_bytes"])
+    answers = TextColumn(arrays["answer_offsets"], arrays["answer_bytes"])
+    engine.attach_records(questions, answers, index_version=descriptor["index_version"])
+    register_search_engine(engine)
+    return SharedFaqIndex(shared_block, descriptor, engine, vectorizer, question_matrix, questions, answers)
+
+
+# 이 함수는 프로세스 하나의 메모리 사용량(kB)을 읽습니다. 리눅스의 /proc/<pid>/smaps_rollup을 씁니다.
+# rss는 이 프로세스가 만지는 모든 페이지, pss는 공유 페이지를 나눠 가진 몫, uss는 이 프로세스만 쓰는 페이지입니다.
+# 작업 프로세스가 늘 때 실제로 늘어나는 메모리는 uss 쪽이므로, 공유 색인의 효과는 uss와 pss로 확인합니다.
+def read_process_memory(pid="self"):
+    smaps_path = Path(SMAPS_ROLLUP_PATH.format(pid=pid))
+    try:
+        fields = {}
+        for line in smaps_path.read_text().splitlines():
+            match = SMAPS_FIELD_PATTERN.match(line)
+            if match:
+                fields[match.group(1)] = int(match.group(2))
+    except OSError:
+        import resource
+
+        return {"pid": os.getpid() if pid == "self" else pid, "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+    return {
+        "pid": os.getpid() if pid == "self" else pid,
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "uss_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "pss_shmem_kb": fields.get("Pss_Shmem", 0),
+    }
@@ -0,0 +1,120 @@
+import hashlib
+import re
+from functools import lru_cache
+
+
+# 토큰화는 질문마다, 그리고 색인을 만들 때 FAQ마다 실행되므로 정규식은 모듈을 불러올 때 한 번만 컴파일합니다.
+DISALLOWED_CHARACTER_PATTERN = re.compile(r"[^0-9a-zA-Z가-힣\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+TOKEN_PATTERN = re.compile(r"[0-9a-zA-Z가-힣]+")
+
+# 토큰 끝에서 떼어 낼 조사/어미 목록입니다. 앞에 있는 항목일수록 우선순위가 높습니다.
+KOREAN_SUFFIXES = (
+    "입니다",
+    "합니다",
+    "해요",
+    "해도",
+    "되나요",
+    "되죠",
+    "인가요",
+    "있어요",
+    "없어요",
+    "세요",
+    "까요",
+    "나요",
+    "군요",
+    "이라",
+    "라서",
+    "에게",
+    "에서",
+    "으로",
+    "부터",
+    "까지",
+    "처럼",
+    "라도",
+    "보다",
+    "이고",
+    "이며",
+    "이면",
+    "한테",
+    "로",
+    "은",
+    "는",
+    "이",
+    "가",
+    "을",
+    "를",
+    "에",
+    "도",
+    "만",
+    "와",
+    "과",
+    "요",
+)
+TOKEN_CACHE_SIZE = 65536
+
+
+# 이 함수는 조사/어미 목록을 글자 수별 사전({어미: 우선순위})으로 묶습니다.
+# 토큰마다 목록 전체를 훑는 대신, 글자 수마다 토큰 끝 부분을 사전에서 한 번씩만 찾으면 됩니다.
+def build_suffix_buckets(suffixes):
+    buckets = {}
+    for priority, suffix in enumerate(suffixes):
+        buckets.setdefault(len(suffix), {}).setdefault(suffix, priority)
+    return tuple(sorted(buckets.items(), reverse=True))
+
+
+SUFFIX_BUCKETS = build_suffix_buckets(KOREAN_SUFFIXES)
+# 저장된 색인의 어휘는 토크나이저 규칙에 묶여 있으므로, 규칙이 바뀌면 이 값도 바뀌어 색인을 다시 만들게 합니다.
+TOKENIZER_SIGNATURE = hashlib.sha256(
+    repr((TOKEN_PATTERN.pattern, KOREAN_SUFFIXES, "bigram>=3")).encode("utf-8")
+).hexdigest()[:16]
+
+
+# 이 함수는 사용자가 입력한 문장과 FAQ 질문 문장을 검색하기 좋은 형태로 정리합니다.
+# 소문자 변환, 특수문자 제거, 공백 정리 등을 통해 같은 의미의 문장이 조금 다르게 입력되어도 비교가 쉬워지도록 만듭니다.
+def preprocess_text(text):
+    normalized_text = str(text).lower().strip()
+    normalized_text = DISALLOWED_CHARACTER_PATTERN.sub(" ", normalized_text)
+    normalized_text = WHITESPACE_PATTERN.sub(" ", normalized_text)
+    return normalized_text
+
+
+# 이 함수는 토큰 하나에서 조사/어미를 떼고, 남은 단어와 한글 2-gram을 튜플로 돌려줍니다.
+# 목록에서 먼저 나오는 어미가 이기는 기존 규칙을 그대로 지키며, 현재 목록에서는 가장 긴 어미가 이기는 것과 같습니다.
+# 같은 단어가 질문과 FAQ에 반복해서 나오므로 결과를 크기 제한이 있는 캐시에 기억해 둡니다.
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def expand_token(token):
+    token_length = len(token)
+    best_priority = None
+    best_suffix_length = 0
+    for suffix_length, suffix_priorities in SUFFIX_BUCKETS:
+        if token_length <= suffix_length + 1:
+            continue
+        priority = suffix_priorities.get(token[-suffix_length:])
+        if priority is not None and (best_priority is None or priority < best_priority):
+            best_priority = priority
+            best_suffix_length = suffix_length
+
+    stripped_token = token[:-best_suffix_length] if best_suffix_length else token
+    if len(stripped_token) < 2:
+        return ()
+
+    # 한국어 질문은 띄어쓰기 차이의 영향을 줄이기 위해 문자 2-gram도 일부 함께 추가합니다.
+    # 토큰은 영숫자와 한글로만 이루어지므로, ASCII가 아니면 한글이 들어 있다는 뜻입니다.
+    if len(stripped_token) >= 3 and not stripped_token.isascii():
+        return (stripped_token,) + tuple(
+            stripped_token[index : index + 2]
+            for index in range(len(stripped_token) - 1)
+        )
+    return (stripped_token,)
+
+
+# 이 함수는 한국어 문장을 단어 단위로 잘게 나누는 간단한 토큰화 역할을 합니다.
+# 전문 형태소 분석기만큼 복잡하진 않지만, 조사와 어미 일부를 정리해 핵심 단어를 비교하기 쉽게 도와줍니다.
+# preprocess_text가 바꾸는 문자는 모두 토큰 패턴 밖의 문자라서, 소문자로 바꾼 원문에서 바로 토큰을 찾아도 결과가 같습니다.
+def tokenize_korean_text(text):
+    processed_tokens = []
+    for token in TOKEN_PATTERN.findall(str(text).lower()):
+        processed_tokens.extend(expand_token(token))
+    return processed_tokens
+
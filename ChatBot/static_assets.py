@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+# 이 클래스는 이미지 파일 하나를 화면에 넣기 좋은 형태(base64, data URL)로 한 번만 바꿔 둔 결과입니다.
+# 파일이 없으면 모든 값이 빈 문자열이라, 호출하는 쪽은 "값이 있으면 쓰고 없으면 대체 화면"만 확인하면 됩니다.
+class ImageAsset:
+    __slots__ = ("path", "sha256", "base64", "data_url")
+
+    def __init__(self, path, sha256="", base64_text="", mime_type="image/png"):
+        self.path = path
+        self.sha256 = sha256
+        self.base64 = base64_text
+        self.data_url = f"data:{mime_type};base64,{base64_text}" if base64_text else ""
+
+
+# 이 클래스는 정적 자산(이미지, 미리 그려 둔 CSS)을 프로세스당 한 번만 만들어 두는 캐시입니다.
+# 이미지는 파일 내용의 SHA-256으로 묶어 두므로, 같은 내용이면 경로가 달라도 한 벌만 보관하고 파일이 바뀌면 새로 만듭니다.
+# 다시 그리기마다 하는 일은 os.stat 한 번뿐이고, 파일 읽기와 base64 인코딩은 크기나 수정 시각이 바뀔 때만 합니다.
+class StaticAssetCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._images_by_path = {}
+        self._images_by_hash = {}
+        self._rendered = {}
+
+    # 이미지 파일을 ImageAsset으로 돌려줍니다. 처음이거나 파일이 바뀌었을 때만 읽고 인코딩합니다.
+    # 파일이 바뀌면 이전 내용은 다른 경로가 같이 쓰고 있지 않을 때 버립니다. 그래야 이미지를 고칠 때마다 base64 사본이 쌓이지 않습니다.
+    def image(self, image_path, mime_type="image/png"):
+        image_path = Path(image_path)
+        try:
+            stat_result = os.stat(image_path)
+        except OSError:
+            return ImageAsset(image_path)
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+
+        cached = self._images_by_path.get(image_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        try:
+            image_bytes = image_path.read_bytes()
+        except OSError:
+            return ImageAsset(image_path)
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        with self._lock:
+            asset = self._images_by_hash.get(digest)
+            if asset is None:
+                asset = ImageAsset(image_path, digest, base64.b64encode(image_bytes).decode("ascii"), mime_type)
+                self._images_by_hash[digest] = asset
+            previous = self._images_by_path.get(image_path)
+            self._images_by_path[image_path] = (signature, asset)
+            if previous is not None and previous[1].sha256 != digest:
+                self._evict_unused_image(previous[1].sha256)
+        return asset
+
+    # 어느 경로도 가리키지 않는 이미지 해시를, 그 해시를 키에 넣어 만든 렌더링 결과와 함께 지웁니다. 호출 전에 잠금을 잡고 있어야 합니다.
+    def _evict_unused_image(self, digest):
+        if any(asset.sha256 == digest for _, asset in self._images_by_path.values()):
+            return
+        self._images_by_hash.pop(digest, None)
+        for key in [key for key in self._rendered if isinstance(key, tuple) and digest in key]:
+            del self._rendered[key]
+
+    # key로 구분되는 렌더링 결과(CSS 묶음 등)를 한 번만 만들어 돌려줍니다.
+    # key에는 결과가 기대는 자산의 해시를 넣어, 이미지가 바뀌면 자연스럽게 새 결과를 만들게 합니다.
+    def rendered(self, key, render):
+        result = self._rendered.get(key)
+        if result is None:
+            result = render()
+            with self._lock:
+                result = self._rendered.setdefault(key, result)
+        return result
+
+    # 캐시를 비웁니다. 테스트나 디자인 작업 중 CSS 원본을 고친 뒤 다시 그리고 싶을 때 씁니다.
+    def clear(self):
+        with self._lock:
+            self._images_by_path.clear()
+            self._images_by_hash.clear()
+            self._rendered.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": len(self._images_by_hash),
+                "paths": len(self._images_by_path),
+                "rendered": len(self._rendered),
+            }
+
+
+asset_cache = StaticAssetCache()
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
-import base64
-import json
+import os
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
@@ -9,24 +8,45 @@ from typing import Optional
 
 import streamlit as st  # pyright: ignore[reportMissingImports]
 
-from faq_chatbot import get_chatbot_response, initialize_chatbot_engine
+from chat_log_writer import get_chat_log_writer
+from chat_session_store import get_session_governor
+from chat_turns import (
+    ASSISTANT_ROLE,
+    USER_ROLE,
+    assistant_text_turn,
+    assistant_turn_from_response,
+    resolve_turn_candidates,
+    resolve_turn_text,
+    user_turn,
+)
+from faq_bilingual import ENGLISH_LOCALE, KOREAN_LOCALE, BilingualFaqEngine, LazyLocaleSource
+from faq_index_reloader import FaqIndexReloader
+from faq_metrics import start_metrics_file_writer, start_metrics_server, stage_timer
+from static_assets import asset_cache
 
 
 WORKSPACE_DIR = Path(__file__).resolve().parent
 LOG_DIR = WORKSPACE_DIR / "chat_logs"
-LOG_FILE = LOG_DIR / "guidematch_chat_log.jsonl"
+SESSION_SPILL_DIR = WORKSPACE_DIR / "chat_sessions"
 ASSETS_DIR = WORKSPACE_DIR / "assets"
+ENGLISH_CSV_PATH = WORKSPACE_DIR / "faq_data_english.csv"
 COMPANY_LOGO_PATH = ASSETS_DIR / "company_logo.png"
 CHAT_ICON_PATH = ASSETS_DIR / "chat_icon.png"
-EMBED_AVATAR_CACHE = WORKSPACE_DIR / "_embed_assistant_avatar.png"
+# 단계별 지연 시간 지표를 내보낼 곳입니다. 포트를 주면 127.0.0.1:포트/metrics로, 파일 경로를 주면 그 파일로 주기적으로 씁니다.
+METRICS_PORT_ENV = "FAQ_METRICS_PORT"
+METRICS_FILE_ENV = "FAQ_METRICS_FILE"
+# 모든 세션의 대화 기록에 쓸 메모리 예산(MB)입니다. 넘으면 오래 조용했던 세션의 기록부터 SESSION_SPILL_DIR로 내립니다.
+SESSION_MEMORY_BUDGET_ENV = "FAQ_SESSION_MEMORY_BUDGET_MB"
+# 대화 기록은 마지막 HISTORY_PAGE_SIZE개 메시지만 그리고, "이전 대화 더 보기"를 누를 때마다 이만큼씩 더 펼칩니다.
+HISTORY_PAGE_SIZE = 20
+CONTACT_QUESTION = "고객센터 이메일이 어떻게 되나요?"
 
 
 # 이 함수는 이미지 파일을 base64 문자열로 바꿔 CSS 배경 이미지나 HTML img 태그에 넣기 쉽게 만듭니다.
 # 아이콘 런처와 회사 로고를 외부 링크 없이 안정적으로 화면에 표시하기 위해 사용합니다.
-def encode_image_base64(image_path):
-    if not image_path.exists():
-        return ""
-    return base64.b64encode(image_path.read_bytes()).decode("utf-8")
+# 인코딩 결과는 파일 내용 해시로 캐시되므로, 다시 그릴 때마다 파일을 읽고 인코딩하지 않습니다.
+def load_image_asset(image_path):
+    return asset_cache.image(image_path)
 
 
 def is_embed_mode() -> bool:
@@ -37,15 +57,9 @@ def is_embed_mode() -> bool:
     return str(raw).strip().lower() in ("1", "true", "yes")
 
 
-def assistant_avatar_path_from_icon(icon_base64: str) -> Optional[str]:
-    """st.chat_message(avatar=...)용 로컬 파일 경로. 기존 chat_icon.png와 동일 자산 사용."""
-    if not icon_base64:
-        return None
-    try:
-        EMBED_AVATAR_CACHE.write_bytes(base64.b64decode(icon_base64))
-        return str(EMBED_AVATAR_CACHE.resolve())
-    except (OSError, ValueError):
-        return None
+def assistant_avatar_from_icon(icon_asset) -> Optional[str]:
+    """st.chat_message(avatar=...)용 data URL. 파일을 쓰지 않고 chat_icon.png 캐시를 그대로 사용."""
+    return icon_asset.data_url or None
 
 
 # 이 함수는 현재 로그인 사용자의 아이디를 Streamlit 쿼리 파라미터에서 가져옵니다.
@@ -59,23 +73,22 @@ def get_logged_in_user_id():
 
 # 이 함수는 챗봇 사용 기록을 JSON Lines 파일에 한 줄씩 저장합니다.
 # 사용자 아이디, 세션 아이디, 이벤트 종류, 질문/답변 등을 남겨서 서버 로그처럼 추적할 수 있게 합니다.
-def log_chat_event(event_type, payload):
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
+# system=True는 색인 교체처럼 특정 사용자 세션 밖(백그라운드 스레드)에서 생기는 이벤트에 사용합니다.
+# 파일 쓰기는 백그라운드 기록기가 묶어서 하므로, 여기서는 기록을 만들어 큐에 넣기만 합니다.
+def log_chat_event(event_type, payload, system=False):
     record = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "event_type": event_type,
-        "user_id": get_logged_in_user_id(),
-        "session_id": st.session_state.get("session_id"),
+        "user_id": "system" if system else get_logged_in_user_id(),
+        "session_id": None if system else st.session_state.get("session_id"),
         **payload,
     }
-    with LOG_FILE.open("a", encoding="utf-8") as log_file:
-        log_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    get_chat_log_writer(LOG_DIR).enqueue(record)
 
 
-def apply_embed_styles():
-    """iframe 전용: 앱형 UI, 하단 입력 도크 고정."""
-    st.markdown(
-        r"""
+def build_embed_style():
+    """iframe 전용 CSS: 앱형 UI, 하단 입력 도크 고정."""
+    return r"""
         <style>
         @import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@500;600;700&family=Noto+Sans+KR:wght@400;500;600;700&display=swap');
 
@@ -282,18 +295,12 @@ def apply_embed_styles():
 
         [data-testid="stChatMessage"] img { border-radius: 12px; object-fit: cover; }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
 
 
-# 이 함수는 앱 전체에 사용할 CSS를 주입합니다.
+# 이 함수는 웹사이트 위젯용 CSS를 만듭니다.
 # 닫힌 상태에서는 아이콘 런처처럼, 열린 상태에서는 실제 상담 챗봇 팝업처럼 보이도록 상태별 스타일을 나눕니다.
-def apply_custom_style(widget_open, icon_base64):
-    if is_embed_mode():
-        apply_embed_styles()
-        return
-
+def build_custom_style(widget_open, icon_base64):
     launcher_style = f"""
         .stButton > button {{
             width: 78px;
@@ -336,8 +343,7 @@ def apply_custom_style(widget_open, icon_base64):
         }
     """
 
-    st.markdown(
-        f"""
+    return f"""
         <style>
         @import url('https://fonts.googleapis.com/css2?family=Outfit:wght@600;700;800&family=Noto+Sans+KR:wght@400;500;700&display=swap');
 
@@ -605,11 +611,41 @@ def apply_custom_style(widget_open, icon_base64):
             }}
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
+        """
+
+
+# 이 함수는 화면 상태별 CSS(열린 위젯, 닫힌 런처, iframe)를 아이콘 내용마다 한 번만 미리 만들어 둡니다.
+# 다시 그리기 때는 300줄짜리 CSS를 새로 조립하지 않고 만들어 둔 문자열을 고르기만 합니다.
+def get_style_variants(icon_asset):
+    return asset_cache.rendered(
+        ("style_variants", icon_asset.sha256),
+        lambda: {
+            "open": build_custom_style(True, icon_asset.base64),
+            "closed": build_custom_style(False, icon_asset.base64),
+            "embed": build_embed_style(),
+        },
     )
 
 
+# 이 함수는 앱 전체에 사용할 CSS를 주입합니다.
+def apply_custom_style(widget_open, icon_asset):
+    if is_embed_mode():
+        variant = "embed"
+    else:
+        variant = "open" if widget_open else "closed"
+    st.markdown(get_style_variants(icon_asset)[variant], unsafe_allow_html=True)
+
+
+# 이 함수는 세션별 대화 기록의 메모리를 관리하는 관리자를 돌려줍니다. 프로세스에 하나만 만들어집니다.
+# 대화 기록은 st.session_state.chat_history(SessionChatHistory)에 두고, 메시지 목록은 .turns로 꺼냅니다.
+def get_chat_session_governor():
+    governor_options = {}
+    memory_budget_mb = os.environ.get(SESSION_MEMORY_BUDGET_ENV, "").strip()
+    if memory_budget_mb:
+        governor_options["memory_budget_bytes"] = int(float(memory_budget_mb) * 1024 * 1024)
+    return get_session_governor(SESSION_SPILL_DIR, **governor_options)
+
+
 # 이 함수는 위젯의 열림/닫힘 상태, 세션 아이디, 대화 기록 같은 상태값을 준비합니다.
 # 새로고침이 일어나더라도 같은 세션 안에서는 사용자 동작 흐름을 유지할 수 있도록 합니다.
 def initialize_session_state():
@@ -623,23 +659,46 @@ def initialize_session_state():
         st.session_state.widget_open = True
 
     if "chat_history" not in st.session_state:
-        st.session_state.chat_history = [
-            {
-                "role": "assistant",
-                "answer": "안녕하세요! GuideMatch FAQ 챗봇입니다. 예약, 환불, 계정, 현장 이슈를 편하게 질문해 주세요.",
-                "top_matches": [],
-            }
-        ]
+        st.session_state.chat_history = get_chat_session_governor().create(
+            st.session_state.session_id,
+            [assistant_text_turn("안녕하세요! GuideMatch FAQ 챗봇입니다. 예약, 환불, 계정, 현장 이슈를 편하게 질문해 주세요.")],
+        )
 
     if "queued_question" not in st.session_state:
         st.session_state.queued_question = None
+        st.session_state.queued_question_source = None
+
+    if "history_visible_count" not in st.session_state:
+        st.session_state.history_visible_count = HISTORY_PAGE_SIZE
 
     if "expanded_candidate_key" not in st.session_state:
         st.session_state.expanded_candidate_key = None
 
 
+# 이 함수는 색인이 새로 만들어지거나 교체될 때마다 걸린 시간과 색인 버전을 로그에 남깁니다.
+def log_index_reload(snapshot, previous_snapshot, rebuild_seconds, reason):
+    log_chat_event(
+        "faq_index_reloaded",
+        {
+            "reason": reason,
+            "index_version": snapshot.index_version,
+            "previous_index_version": previous_snapshot.index_version if previous_snapshot else None,
+            "csv_sha256": snapshot.csv_sha256,
+            "row_count": len(snapshot.faq_df),
+            "rebuild_ms": round(rebuild_seconds * 1000, 2),
+        },
+        system=True,
+    )
+
+
+# 이 함수는 CSV가 잘못 저장되어 색인을 다시 만들지 못했을 때 기존 색인을 유지한 채 오류만 기록합니다.
+def log_index_reload_error(error):
+    log_chat_event("faq_index_reload_failed", {"error": str(error)}, system=True)
+
+
 # 이 함수는 FAQ CSV를 읽고 검색 엔진을 메모리에 준비합니다.
 # 앱이 다시 그려져도 매번 벡터 계산을 반복하지 않도록 캐시를 사용합니다.
+# faq_data.csv가 수정되면 백그라운드 감시 스레드가 새 색인을 만들어 교체하므로 서버를 재시작할 필요가 없습니다.
 @st.cache_resource
 def load_chatbot_resources():
     csv_path = Path("faq_data.csv")
@@ -647,7 +706,37 @@ def load_chatbot_resources():
         raise FileNotFoundError(
             "faq_data.csv 파일이 없습니다. 먼저 create_faq_data.py를 실행해 주세요."
         )
-    return initialize_chatbot_engine(csv_path)
+    reloader = FaqIndexReloader(
+        csv_path,
+        on_reload=log_index_reload,
+        on_error=log_index_reload_error,
+    )
+    reloader.start()
+    return reloader
+
+
+# 이 함수는 환경 변수에 따라 Prometheus 지표 내보내기(HTTP /metrics 또는 텍스트 파일)를 한 번만 시작합니다.
+# 둘 다 없으면 지표는 프로세스 안에만 쌓이고 밖으로 나가지 않습니다.
+@st.cache_resource
+def start_metrics_export():
+    exporters = {}
+    metrics_port = os.environ.get(METRICS_PORT_ENV, "").strip()
+    if metrics_port:
+        exporters["server"] = start_metrics_server(int(metrics_port))
+    metrics_file = os.environ.get(METRICS_FILE_ENV, "").strip()
+    if metrics_file:
+        exporters["file_writer"] = start_metrics_file_writer(metrics_file)
+    return exporters
+
+
+# 이 함수는 한국어/영어 질문을 알맞은 FAQ 색인으로 보내는 이중 언어 검색 엔진을 준비합니다.
+# 한국어는 위의 자동 교체 색인을 그대로 쓰고, 영어 색인은 영어 질문이 처음 들어올 때 만듭니다.
+@st.cache_resource
+def load_bilingual_engine():
+    sources = {KOREAN_LOCALE: lambda: load_chatbot_resources().current().as_triple()}
+    if ENGLISH_CSV_PATH.exists():
+        sources[ENGLISH_LOCALE] = LazyLocaleSource(ENGLISH_CSV_PATH)
+    return BilingualFaqEngine(sources)
 
 
 # 이 함수는 닫힌 상태에서 보이는 작은 아이콘 런처를 렌더링합니다.
@@ -702,51 +791,75 @@ def render_quick_questions(key_suffix: str = ""):
     st.markdown('<div class="quick-row">', unsafe_allow_html=True)
     col1, col2, col3 = st.columns(3, gap="small")
     with col1:
-        if st.button("예약 방법", key=f"quick_booking{key_suffix}"):
-            st.session_state.queued_question = "가이드 매칭은 어떻게 진행되나요?"
+        st.button("예약 방법", key=f"quick_booking{key_suffix}", on_click=queue_question, args=("가이드 매칭은 어떻게 진행되나요?",))
     with col2:
-        if st.button("환불 문의", key=f"quick_refund{key_suffix}"):
-            st.session_state.queued_question = "투어 전날 취소하면 환불이 되나요?"
+        st.button("환불 문의", key=f"quick_refund{key_suffix}", on_click=queue_question, args=("투어 전날 취소하면 환불이 되나요?",))
     with col3:
-        if st.button("현장 문제", key=f"quick_issue{key_suffix}"):
-            st.session_state.queued_question = "약속 장소에 가이드가 안 나타나요."
+        st.button("현장 문제", key=f"quick_issue{key_suffix}", on_click=queue_question, args=("약속 장소에 가이드가 안 나타나요.",))
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-# 이 함수는 챗봇 메시지에 포함된 추천 FAQ 후보를 최대 3개까지 뽑아 반환합니다.
+# 이 함수는 챗봇 메시지에 포함된 추천 FAQ 후보(최대 3개)를 공유 색인에서 꺼내 반환합니다.
 # 각 후보는 질문과 답변을 함께 가지고 있어, 클릭 즉시 같은 자리에서 답변을 펼쳐 보여줄 수 있습니다.
+# 메시지에는 행 번호만 저장되어 있으므로, 화면에 보이는 메시지에 대해서만 문장을 꺼냅니다.
 def get_assistant_candidates(message):
-    return message.get("top_matches", [])[:3]
+    return resolve_turn_candidates(message)
+
+
+# 이 함수는 "이전 대화 더 보기" 버튼 콜백으로, 화면에 그릴 메시지 수를 한 페이지만큼 늘립니다.
+def load_earlier_messages():
+    st.session_state.history_visible_count += HISTORY_PAGE_SIZE
+
+
+# 이 함수는 추천 FAQ 버튼 콜백으로, 누른 후보를 펼친 상태로 표시하고 로그를 남깁니다.
+# 콜백은 다시 그리기 전에 실행되므로, 이전에 펼친 후보가 같은 화면 그리기 안에서 바로 접힙니다.
+def expand_candidate(button_key, candidate):
+    st.session_state.expanded_candidate_key = button_key
+    log_chat_event(
+        "recommended_faq_opened",
+        {
+            "question": candidate["question"],
+            "answer": candidate["answer"],
+        },
+    )
 
 
 # 이 함수는 실제 채팅 메시지 목록을 렌더링합니다.
 # 추천 FAQ 버튼은 문장 길이만큼만 보이는 왼쪽 정렬 형태로 만들고, 클릭하면 바로 아래에서 답변을 펼칩니다.
+# 대화가 길어져도 다시 그리는 시간이 늘지 않도록 마지막 history_visible_count개 메시지만 그리고, 그 앞은 버튼으로 불러옵니다.
+# 버튼 키는 전체 기록에서의 위치로 만들기 때문에, 이전 대화를 더 불러와도 펼친 후보가 그대로 유지됩니다.
 def render_chat_history(assistant_avatar_path: Optional[str] = None):
     st.markdown('<div class="chat-scroll-box">', unsafe_allow_html=True)
 
-    for message_index, message in enumerate(st.session_state.chat_history):
-        if message["role"] == "user":
+    chat_history = st.session_state.chat_history.turns
+    first_visible_index = max(0, len(chat_history) - st.session_state.history_visible_count)
+    if first_visible_index:
+        st.button(
+            f"이전 대화 더 보기 ({first_visible_index}개)",
+            key="load_earlier_messages",
+            on_click=load_earlier_messages,
+        )
+
+    for message_index in range(first_visible_index, len(chat_history)):
+        message = chat_history[message_index]
+        if message.role == USER_ROLE:
             avatar = "🙋"
         else:
             avatar = assistant_avatar_path if assistant_avatar_path else "🧭"
-        with st.chat_message(message["role"], avatar=avatar):
-            st.markdown(message["answer"])
+        with st.chat_message(message.role, avatar=avatar):
+            st.markdown(resolve_turn_text(message))
 
-            if message["role"] == "assistant":
+            if message.role == ASSISTANT_ROLE:
                 candidates = get_assistant_candidates(message)
                 for candidate_index, candidate in enumerate(candidates):
                     button_key = f"candidate_{message_index}_{candidate_index}"
                     st.markdown('<div class="faq-inline-wrap">', unsafe_allow_html=True)
-                    if st.button(candidate["question"], key=button_key):
-                        st.session_state.expanded_candidate_key = button_key
-                        log_chat_event(
-                            "recommended_faq_opened",
-                            {
-                                "question": candidate["question"],
-                                "answer": candidate["answer"],
-                            },
-                        )
-                        st.rerun()
+                    st.button(
+                        candidate["question"],
+                        key=button_key,
+                        on_click=expand_candidate,
+                        args=(button_key, candidate),
+                    )
 
                     if st.session_state.expanded_candidate_key == button_key:
                         st.markdown(
@@ -764,26 +877,19 @@ def render_widget_footer():
     st.markdown('<div class="widget-bottom-actions">', unsafe_allow_html=True)
     left_col, right_col = st.columns(2, gap="small")
     with left_col:
-        if st.button("대화 초기화", key="reset_chat_button"):
-            st.session_state.chat_history = st.session_state.chat_history[:1]
-            st.session_state.expanded_candidate_key = None
-            log_chat_event("chat_reset", {"message": "chat reset"})
-            st.rerun()
+        st.button("대화 초기화", key="reset_chat_button", on_click=reset_chat)
     with right_col:
-        if st.button("자세한 문의", key="contact_button"):
-            st.session_state.queued_question = "고객센터 이메일이 어떻게 되나요?"
+        st.button("자세한 문의", key="contact_button", on_click=queue_question, args=(CONTACT_QUESTION,))
     st.markdown("</div>", unsafe_allow_html=True)
 
-    submitted_question = None
     with st.form("widget_input_form", clear_on_submit=True):
-        typed_question = st.text_input(
+        st.text_input(
             "질문 입력",
+            key="widget_question_input",
             placeholder="Type your message",
             label_visibility="collapsed",
         )
-        submitted = st.form_submit_button("메시지 보내기")
-        if submitted:
-            submitted_question = typed_question
+        st.form_submit_button("메시지 보내기", on_click=queue_typed_question, args=("widget_question_input",))
 
     st.markdown(
         """
@@ -796,7 +902,6 @@ def render_widget_footer():
         unsafe_allow_html=True,
     )
     st.markdown("</div></div></div>", unsafe_allow_html=True)
-    return submitted_question
 
 
 def render_embed_top_bar(icon_base64: str):
@@ -822,30 +927,29 @@ def render_embed_top_bar(icon_base64: str):
     with c_actions:
         a1, a2 = st.columns(2, gap="small")
         with a1:
-            if st.button("↺", key="embed_tb_reset", help="대화 초기화"):
-                st.session_state.chat_history = st.session_state.chat_history[:1]
-                st.session_state.expanded_candidate_key = None
-                log_chat_event("chat_reset", {"message": "chat reset"})
-                st.rerun()
+            st.button("↺", key="embed_tb_reset", help="대화 초기화", on_click=reset_chat)
         with a2:
-            if st.button("✉", key="embed_tb_mail", help="고객센터 이메일 안내"):
-                st.session_state.queued_question = "고객센터 이메일이 어떻게 되나요?"
-                st.rerun()
+            st.button("✉", key="embed_tb_mail", help="고객센터 이메일 안내", on_click=queue_question, args=(CONTACT_QUESTION,))
 
 
 def render_embed_input_dock():
     """하단 고정: 입력 + 전송 (CSS position:fixed)."""
-    submitted_question = None
     with st.form("embed_dock_form", clear_on_submit=True):
         row_in, row_btn = st.columns([6, 1], gap="small")
         with row_in:
-            typed_question = st.text_input(
+            st.text_input(
                 "메시지",
+                key="embed_question_input",
                 placeholder="무엇이든 물어보세요…",
                 label_visibility="collapsed",
             )
         with row_btn:
-            submitted = st.form_submit_button("➤", use_container_width=True)
+            st.form_submit_button(
+                "➤",
+                use_container_width=True,
+                on_click=queue_typed_question,
+                args=("embed_question_input",),
+            )
         st.markdown(
             """
             <p class="embed-dock-foot">
@@ -854,29 +958,20 @@ def render_embed_input_dock():
             """,
             unsafe_allow_html=True,
         )
-        if submitted:
-            submitted_question = typed_question
 
-    return submitted_question
 
-
-def render_embed_chat(icon_base64, faq_df, vectorizer, question_matrix):
+def render_embed_chat(icon_asset, faq_df, vectorizer, question_matrix):
     """iframe 전체 UI: 상단 바 · 스크롤 영역 · 하단 고정 입력."""
-    assistant_av = assistant_avatar_path_from_icon(icon_base64)
-    render_embed_top_bar(icon_base64)
+    handle_queued_question(faq_df, vectorizer, question_matrix)
+    assistant_av = assistant_avatar_from_icon(icon_asset)
+    render_embed_top_bar(icon_asset.base64)
     st.markdown(
         '<p class="embed-intro">예약·환불·이용 안내를 검색합니다. 아래 칩을 눌러 빠르게 시작할 수 있어요.</p>',
         unsafe_allow_html=True,
     )
     render_quick_questions(key_suffix="_embed")
     render_chat_history(assistant_avatar_path=assistant_av)
-    submitted_question = render_embed_input_dock()
-    handle_pending_or_submitted_question(
-        faq_df,
-        vectorizer,
-        question_matrix,
-        submitted_question=submitted_question,
-    )
+    render_embed_input_dock()
 
 
 # 이 함수는 사용자 질문을 FAQ 엔진에 전달하고, 결과를 대화 기록과 로그에 함께 저장합니다.
@@ -886,109 +981,120 @@ def process_user_question(user_question, faq_df, vectorizer, question_matrix, so
     if not cleaned_question:
         return
 
-    response = get_chatbot_response(
-        user_question=cleaned_question,
-        faq_df=faq_df,
-        vectorizer=vectorizer,
-        question_matrix=question_matrix,
+    # 한국어 색인은 이번 화면 그리기에서 꺼낸 스냅샷을 그대로 쓰도록 고정합니다.
+    response = load_bilingual_engine().respond(
+        cleaned_question,
+        pinned_triples={KOREAN_LOCALE: (faq_df, vectorizer, question_matrix)},
     )
 
     st.session_state.expanded_candidate_key = None
-    st.session_state.chat_history.append(
-        {"role": "user", "answer": cleaned_question, "top_matches": []}
-    )
-    st.session_state.chat_history.append(
-        {
-            "role": "assistant",
-            "answer": response["answer"],
-            "top_matches": response.get("top_matches", []),
-        }
-    )
+    st.session_state.chat_history.append(user_turn(cleaned_question), assistant_turn_from_response(response))
+
+    with stage_timer("log_event"):
+        log_chat_event(
+            "chat_message",
+            {
+                "source": source,
+                "question": cleaned_question,
+                "matched_question": response.get("matched_question"),
+                "similarity_score": response.get("similarity_score"),
+                "locale": response.get("locale"),
+                "answer": response.get("answer"),
+            },
+        )
+
+
+# 이 함수는 빠른 질문·문의 버튼 콜백으로, 질문을 대기열에 올립니다.
+# 콜백은 스크립트가 다시 실행되기 전에 불리므로, 이어지는 화면 그리기에서 대화 기록보다 먼저 답변이 처리되어 st.rerun이 필요 없습니다.
+def queue_question(question, source="quick_button"):
+    st.session_state.queued_question = question
+    st.session_state.queued_question_source = source
 
-    log_chat_event(
-        "chat_message",
-        {
-            "source": source,
-            "question": cleaned_question,
-            "matched_question": response.get("matched_question"),
-            "similarity_score": response.get("similarity_score"),
-            "answer": response.get("answer"),
-        },
-    )
+
+# 이 함수는 입력 폼 제출 콜백으로, 입력창에 적힌 질문을 대기열에 올립니다.
+def queue_typed_question(input_key):
+    queue_question(st.session_state.get(input_key, ""), source="text_input")
+
+
+# 이 함수는 대화 초기화 버튼 콜백으로, 첫 인사 메시지만 남기고 펼친 후보와 기록 창 크기도 처음으로 돌립니다.
+def reset_chat():
+    chat_history = st.session_state.chat_history
+    chat_history.replace(chat_history.turns[:1])
+    st.session_state.expanded_candidate_key = None
+    st.session_state.history_visible_count = HISTORY_PAGE_SIZE
+    log_chat_event("chat_reset", {"message": "chat reset"})
 
 
 # 이 함수는 버튼 질문과 입력 폼 질문을 한 곳에서 처리합니다.
 # 어떤 경로로 들어온 질문이든 동일한 검색 로직과 로그 저장 로직을 타도록 구성합니다.
-def handle_pending_or_submitted_question(faq_df, vectorizer, question_matrix, submitted_question=None):
-    if st.session_state.queued_question:
-        queued_question = st.session_state.queued_question
-        st.session_state.queued_question = None
-        process_user_question(
-            queued_question,
-            faq_df,
-            vectorizer,
-            question_matrix,
-            source="quick_button",
-        )
-        st.rerun()
-
-    if submitted_question:
-        process_user_question(
-            submitted_question,
-            faq_df,
-            vectorizer,
-            question_matrix,
-            source="text_input",
-        )
-        st.rerun()
+# 대화 기록을 그리기 전에 호출해, 새 질문과 답변이 같은 화면 그리기 안에서 바로 보이게 합니다.
+def handle_queued_question(faq_df, vectorizer, question_matrix):
+    queued_question = st.session_state.queued_question
+    if not queued_question:
+        return
+    source = st.session_state.get("queued_question_source") or "quick_button"
+    st.session_state.queued_question = None
+    st.session_state.queued_question_source = None
+    process_user_question(
+        queued_question,
+        faq_df,
+        vectorizer,
+        question_matrix,
+        source=source,
+    )
 
 
 # 이 함수는 열린 챗봇 위젯 전체를 렌더링합니다.
 # 상단 헤더, 빠른 질문, 대화 영역, 문의 메일, 입력 폼을 순서대로 하나의 floating 팝업으로 묶습니다.
 def render_open_widget(logo_base64, faq_df, vectorizer, question_matrix):
+    handle_queued_question(faq_df, vectorizer, question_matrix)
     render_widget_header(logo_base64)
     render_quick_questions()
     render_chat_history()
-    submitted_question = render_widget_footer()
-    handle_pending_or_submitted_question(
-        faq_df,
-        vectorizer,
-        question_matrix,
-        submitted_question=submitted_question,
-    )
+    render_widget_footer()
+
+
+# 이 함수는 화면 한 번 그리기 전체 시간을 "render" 단계로 기록합니다.
+# st.rerun은 예외로 스크립트를 멈추므로, 다시 그리기 직전까지의 시간도 그대로 남습니다.
+def main():
+    with stage_timer("render"):
+        render_page()
 
 
 # 이 함수는 앱 전체 실행 흐름을 담당합니다.
 # 닫힌 상태에서는 아이콘만, 열린 상태에서는 실제 상담창처럼 동작하는 floating 위젯만 표시합니다.
-def main():
+def render_page():
     st.set_page_config(
         page_title="GuideMatch Floating FAQ Chatbot",
         page_icon=":speech_balloon:",
         layout="wide",
         initial_sidebar_state="collapsed",
     )
+    start_metrics_export()
 
     initialize_session_state()
-    icon_base64 = encode_image_base64(CHAT_ICON_PATH)
-    logo_base64 = encode_image_base64(COMPANY_LOGO_PATH)
-    apply_custom_style(st.session_state.widget_open, icon_base64)
+    with stage_timer("assets"):
+        icon_asset = load_image_asset(CHAT_ICON_PATH)
+        logo_asset = load_image_asset(COMPANY_LOGO_PATH)
+        apply_custom_style(st.session_state.widget_open, icon_asset)
 
     try:
-        faq_df, vectorizer, question_matrix = load_chatbot_resources()
+        # 이번 화면 그리기는 끝날 때까지 지금 꺼낸 스냅샷만 사용합니다.
+        faq_df, vectorizer, question_matrix = load_chatbot_resources().current().as_triple()
     except Exception as error:
         st.error(f"챗봇 데이터를 불러오지 못했습니다: {error}")
         st.info("필요하면 먼저 `python create_faq_data.py`를 실행해 주세요.")
         return
 
     if is_embed_mode():
-        render_embed_chat(icon_base64, faq_df, vectorizer, question_matrix)
+        render_embed_chat(icon_asset, faq_df, vectorizer, question_matrix)
         return
 
     if not st.session_state.widget_open:
         render_launcher()
         return
 
-    render_open_widget(logo_base64, faq_df, vectorizer, question_matrix)
+    render_open_widget(logo_asset.base64, faq_df, vectorizer, question_matrix)
 
 
 if __name__ == "__main__":